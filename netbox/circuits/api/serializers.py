@@ -48,7 +48,7 @@ class CircuitCircuitTerminationSerializer(WritableNestedSerializer, ConnectedEnd
         model = CircuitTermination
         fields = [
             'id', 'url', 'site', 'port_speed', 'upstream_speed', 'xconnect_id', 'connected_endpoint',
-            'connected_endpoint_type', 'connected_endpoint_reachable',
+            'connected_endpoint_type', 'connected_endpoint_reachable', 'connected_endpoint_pending',
         ]
 
 
@@ -80,5 +80,5 @@ class CircuitTerminationSerializer(CableTerminationSerializer, ConnectedEndpoint
         fields = [
             'id', 'url', 'circuit', 'term_side', 'site', 'port_speed', 'upstream_speed', 'xconnect_id', 'pp_info',
             'description', 'cable', 'cable_peer', 'cable_peer_type', 'connected_endpoint', 'connected_endpoint_type',
-            'connected_endpoint_reachable'
+            'connected_endpoint_reachable', 'connected_endpoint_pending',
         ]
@@ -54,6 +54,7 @@ class ConnectedEndpointSerializer(ValidatedModelSerializer):
     connected_endpoint_type = serializers.SerializerMethodField(read_only=True)
     connected_endpoint = serializers.SerializerMethodField(read_only=True)
     connected_endpoint_reachable = serializers.SerializerMethodField(read_only=True)
+    connected_endpoint_pending = serializers.SerializerMethodField(read_only=True)
 
     def get_connected_endpoint_type(self, obj):
         if obj._path is not None and obj._path.destination is not None:
@@ -77,6 +78,12 @@ class ConnectedEndpointSerializer(ValidatedModelSerializer):
             return obj._path.is_active
         return None
 
+    @swagger_serializer_method(serializer_or_field=serializers.BooleanField)
+    def get_connected_endpoint_pending(self, obj):
+        if obj._path is not None:
+            return obj._path.is_pending
+        return None
+
 
 #
 # Regions/sites
@@ -489,7 +496,8 @@ class ConsoleServerPortSerializer(TaggedObjectSerializer, CableTerminationSerial
         model = ConsoleServerPort
         fields = [
             'id', 'url', 'device', 'name', 'label', 'type', 'description', 'cable', 'cable_peer', 'cable_peer_type',
-            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable', 'tags',
+            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable',
+            'connected_endpoint_pending', 'tags',
         ]
 
 
@@ -507,7 +515,8 @@ class ConsolePortSerializer(TaggedObjectSerializer, CableTerminationSerializer,
         model = ConsolePort
         fields = [
             'id', 'url', 'device', 'name', 'label', 'type', 'description', 'cable', 'cable_peer', 'cable_peer_type',
-            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable', 'tags',
+            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable',
+            'connected_endpoint_pending', 'tags',
         ]
 
 
@@ -536,7 +545,7 @@ class PowerOutletSerializer(TaggedObjectSerializer, CableTerminationSerializer,
         fields = [
             'id', 'url', 'device', 'name', 'label', 'type', 'power_port', 'feed_leg', 'description', 'cable',
             'cable_peer', 'cable_peer_type', 'connected_endpoint', 'connected_endpoint_type',
-            'connected_endpoint_reachable', 'tags',
+            'connected_endpoint_reachable', 'connected_endpoint_pending', 'tags',
         ]
 
 
@@ -555,7 +564,7 @@ class PowerPortSerializer(TaggedObjectSerializer, CableTerminationSerializer, Co
         fields = [
             'id', 'url', 'device', 'name', 'label', 'type', 'maximum_draw', 'allocated_draw', 'description', 'cable',
             'cable_peer', 'cable_peer_type', 'connected_endpoint', 'connected_endpoint_type',
-            'connected_endpoint_reachable', 'tags',
+            'connected_endpoint_reachable', 'connected_endpoint_pending', 'tags',
         ]
 
 
@@ -580,8 +589,8 @@ class InterfaceSerializer(TaggedObjectSerializer, CableTerminationSerializer, Co
         fields = [
             'id', 'url', 'device', 'name', 'label', 'type', 'enabled', 'lag', 'mtu', 'mac_address', 'mgmt_only',
             'description', 'mode', 'untagged_vlan', 'tagged_vlans', 'cable', 'cable_peer', 'cable_peer_type',
-            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable', 'tags',
-            'count_ipaddresses',
+            'connected_endpoint', 'connected_endpoint_type', 'connected_endpoint_reachable',
+            'connected_endpoint_pending', 'tags', 'count_ipaddresses',
         ]
 
     def validate(self, data):
@@ -741,6 +750,7 @@ class CablePathSerializer(serializers.ModelSerializer):
         model = CablePath
         fields = [
             'id', 'origin_type', 'origin', 'destination_type', 'destination', 'path', 'is_active', 'is_split',
+            'is_pending',
         ]
 
     @swagger_serializer_method(serializer_or_field=serializers.DictField)
@@ -867,6 +877,6 @@ class PowerFeedSerializer(
         fields = [
             'id', 'url', 'power_panel', 'rack', 'name', 'status', 'type', 'supply', 'phase', 'voltage', 'amperage',
             'max_utilization', 'comments', 'cable', 'cable_peer', 'cable_peer_type', 'connected_endpoint',
-            'connected_endpoint_type', 'connected_endpoint_reachable', 'tags', 'custom_fields', 'created',
-            'last_updated',
+            'connected_endpoint_type', 'connected_endpoint_reachable', 'connected_endpoint_pending', 'tags',
+            'custom_fields', 'created', 'last_updated',
         ]
@@ -1,10 +1,15 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
 from django.core.management.color import no_style
-from django.db import connection
+from django.db import connection, transaction
 
 from circuits.models import CircuitTermination
 from dcim.models import CablePath, ConsolePort, ConsoleServerPort, Interface, PowerFeed, PowerOutlet, PowerPort
 from dcim.signals import create_cablepath
+from dcim.topology import CableTopology
 
 ENDPOINT_MODELS = (
     CircuitTermination,
@@ -16,6 +21,16 @@ ENDPOINT_MODELS = (
     PowerPort
 )
 
+# The CableTopology shared with worker processes (inherited on fork)
+_topology = None
+
+
+def _trace_chunk(origins):
+    """
+    Trace a chunk of origins using the shared CableTopology. Executed within a worker process.
+    """
+    return [_topology.trace(origin) for origin in origins]
+
 
 class Command(BaseCommand):
     help = "Generate any missing cable paths among all cable termination objects in NetBox"
@@ -29,6 +44,18 @@ class Command(BaseCommand):
             "--no-input", action='store_true', dest='no_input',
             help="Do not prompt user for any input/confirmation"
         )
+        parser.add_argument(
+            "--bulk", action='store_true', dest='bulk',
+            help="Trace all paths in memory and write them in bulk"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of paths to write per query in bulk mode (default: 1000)"
+        )
+        parser.add_argument(
+            "--processes", type=int, default=1, dest='processes',
+            help="Number of worker processes to trace paths with in bulk mode (default: 1)"
+        )
 
     def draw_progress_bar(self, percentage):
         """
@@ -37,7 +64,66 @@ class Command(BaseCommand):
         bar_size = int(percentage / 5)
         self.stdout.write(f"\r  [{'#' * bar_size}{' ' * (20-bar_size)}] {int(percentage)}%", ending='')
 
+    def save_paths(self, model, traced_paths, batch_size):
+        """
+        Write a batch of TracedPaths originating from the specified model, replacing any existing CablePaths for the
+        same origins, and record the new CablePaths on their origins.
+        """
+        traced_paths = [tp for tp in traced_paths if tp is not None]
+        origin_type = ContentType.objects.get_for_model(model)
+        origin_ids = [tp.origin[1] for tp in traced_paths]
+
+        with transaction.atomic():
+            CablePath.objects.filter(origin_type=origin_type, origin_id__in=origin_ids).delete()
+            cable_paths = CablePath.objects.bulk_create([
+                CablePath(
+                    origin_type_id=origin_type.pk,
+                    origin_id=tp.origin[1],
+                    destination_type_id=tp.destination[0] if tp.destination else None,
+                    destination_id=tp.destination[1] if tp.destination else None,
+                    path=tp.path,
+                    is_active=tp.is_active,
+                    is_split=tp.is_split
+                ) for tp in traced_paths
+            ], batch_size=batch_size)
+            model.objects.bulk_update([
+                model(pk=cp.origin_id, _path_id=cp.pk) for cp in cable_paths
+            ], ['_path'], batch_size=batch_size)
+
+        return len(cable_paths)
+
+    def trace_bulk(self, model, origins, topology, pool, batch_size):
+        """
+        Trace all paths originating from the given instances of a model using the in-memory topology, and write them
+        to the database in batches.
+        """
+        origin_type_id = ContentType.objects.get_for_model(model).pk
+        origin_ids = list(origins.order_by('pk').values_list('pk', flat=True))
+        origins_count = len(origin_ids)
+        chunks = [
+            [(origin_type_id, pk) for pk in origin_ids[i:i + batch_size]]
+            for i in range(0, origins_count, batch_size)
+        ]
+        if pool is not None:
+            results = pool.imap(_trace_chunk, chunks)
+        else:
+            results = ([topology.trace(origin) for origin in chunk] for chunk in chunks)
+
+        count = traced = 0
+        for traced_paths in results:
+            count += self.save_paths(model, traced_paths, batch_size)
+            traced += len(traced_paths)
+            self.draw_progress_bar(traced * 100 / origins_count)
+
+        return count
+
     def handle(self, *model_names, **options):
+        global _topology
+
+        if options['processes'] < 1:
+            raise CommandError("The number of processes must be at least 1.")
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be at least 1.")
 
         # If --force was passed, first delete all existing CablePaths
         if options['force']:
@@ -67,7 +153,22 @@ class Command(BaseCommand):
                 for sql in sequence_sql:
                     cursor.execute(sql)
 
+        # Load the complete cable topology for bulk tracing
+        topology = pool = None
+        if options['bulk']:
+            self.stdout.write('Loading cable topology...')
+            topology = _topology = CableTopology.load()
+            self.stdout.write(self.style.SUCCESS(
+                f'  Loaded {len(topology.cables)} cables, {len(topology.front_ports)} front ports and '
+                f'{len(topology.rear_ports)} rear ports'
+            ))
+            if options['processes'] > 1:
+                # Workers inherit the topology on fork and never touch the database; all writes happen here
+                pool = multiprocessing.get_context('fork').Pool(options['processes'])
+
         # Retrace paths
+        start_time = time.monotonic()
+        total_count = 0
         for model in ENDPOINT_MODELS:
             origins = model.objects.filter(cable__isnull=False)
             if not options['force']:
@@ -78,11 +179,22 @@ class Command(BaseCommand):
                 continue
             self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
             i = 0
-            for i, obj in enumerate(origins, start=1):
-                create_cablepath(obj)
-                if not i % 100:
-                    self.draw_progress_bar(i * 100 / origins_count)
+            if options['bulk']:
+                i = self.trace_bulk(model, origins, topology, pool, options['batch_size'])
+            else:
+                for i, obj in enumerate(origins, start=1):
+                    create_cablepath(obj)
+                    if not i % 100:
+                        self.draw_progress_bar(i * 100 / origins_count)
             self.draw_progress_bar(100)
             self.stdout.write(self.style.SUCCESS(f'\n  Retraced {i} {model._meta.verbose_name_plural}'))
+            total_count += i
+
+        if pool is not None:
+            pool.close()
+            pool.join()
 
+        elapsed = time.monotonic() - start_time
+        rate = total_count / elapsed if elapsed else 0
+        self.stdout.write(f'Traced {total_count} paths in {elapsed:.2f} seconds ({rate:.1f} paths/second)')
         self.stdout.write(self.style.SUCCESS('Finished.'))
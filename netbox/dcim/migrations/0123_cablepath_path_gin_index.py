@@ -0,0 +1,18 @@
+# Generated by Django 3.1.3 on 2026-10-18 04:53
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0122_standardize_name_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cablepath',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['path'], name='dcim_cablepath_path_gin'),
+        ),
+    ]
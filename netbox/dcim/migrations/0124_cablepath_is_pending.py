@@ -0,0 +1,18 @@
+# Generated by Django 3.1.3 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0123_cablepath_path_gin_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cablepath',
+            name='is_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
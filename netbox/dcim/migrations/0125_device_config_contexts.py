@@ -0,0 +1,19 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:00
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0124_cablepath_is_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='_config_contexts',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), blank=True, editable=False, null=True, size=None),
+        ),
+    ]
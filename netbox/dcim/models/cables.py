@@ -2,6 +2,7 @@ from collections import defaultdict
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models
 from django.db.models import Sum
@@ -328,6 +329,9 @@ class CablePath(models.Model):
 
     `is_active` is set to True only if 1) `destination` is not null, and 2) every Cable within the path has a status of
     "connected".
+
+    `is_pending` indicates that the path has been affected by a change to the cable topology and is awaiting
+    recalculation by a background task (see the ASYNC_CABLE_PATHS configuration parameter).
     """
     origin_type = models.ForeignKey(
         to=ContentType,
@@ -361,12 +365,22 @@ class CablePath(models.Model):
     is_split = models.BooleanField(
         default=False
     )
+    is_pending = models.BooleanField(
+        default=False
+    )
 
     class Meta:
         unique_together = ('origin_type', 'origin_id')
+        indexes = (
+            # Enables index lookups for paths traversing a given node (path__contains)
+            GinIndex(fields=['path'], name='dcim_cablepath_path_gin'),
+        )
 
     def __str__(self):
-        status = ' (active)' if self.is_active else ' (split)' if self.is_split else ''
+        if self.is_pending:
+            status = ' (pending)'
+        else:
+            status = ' (active)' if self.is_active else ' (split)' if self.is_split else ''
         return f"Path #{self.pk}: {self.origin} to {self.destination} via {len(self.path)} nodes{status}"
 
     def save(self, *args, **kwargs):
@@ -470,11 +484,12 @@ class CablePath(models.Model):
                 obj.id: obj for obj in queryset
             }
 
-        # Replicate the path using the prefetched objects.
+        # Replicate the path using the prefetched objects. A pending path may reference objects which have since been
+        # deleted; these are represented as None.
         path = []
         for node in self.path:
             ct_id, object_id = decompile_path_node(node)
-            path.append(prefetched[ct_id][object_id])
+            path.append(prefetched[ct_id].get(object_id))
 
         return path
 
@@ -466,12 +466,17 @@ class BaseInterface(models.Model):
     class Meta:
         abstract = True
 
-    def save(self, *args, **kwargs):
-
+    def presave(self):
+        """
+        Normalize the interface's VLAN assignment prior to saving (see can_bulk_create()).
+        """
         # Remove untagged VLAN assignment for non-802.1Q interfaces
         if not self.mode:
             self.untagged_vlan = None
 
+    def save(self, *args, **kwargs):
+        self.presave()
+
         # Only "tagged" interfaces may have tagged VLANs assigned. ("tagged all" implies all VLANs are assigned.)
         if self.pk and self.mode != InterfaceModeChoices.MODE_TAGGED:
             self.tagged_vlans.clear()
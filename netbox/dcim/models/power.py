@@ -187,8 +187,10 @@ class PowerFeed(ChangeLoggedModel, PathEndpoint, CableTermination, CustomFieldMo
                 "voltage": "Voltage cannot be negative for AC supply"
             })
 
-    def save(self, *args, **kwargs):
-
+    def presave(self):
+        """
+        Calculate available_power; bulk imports call this in place of save().
+        """
         # Cache the available_power property on the instance
         kva = abs(self.voltage) * self.amperage * (self.max_utilization / 100)
         if self.phase == PowerFeedPhaseChoices.PHASE_3PHASE:
@@ -196,6 +198,8 @@ class PowerFeed(ChangeLoggedModel, PathEndpoint, CableTermination, CustomFieldMo
         else:
             self.available_power = round(kva)
 
+    def save(self, *args, **kwargs):
+        self.presave()
         super().save(*args, **kwargs)
 
     @property
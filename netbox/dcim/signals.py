@@ -1,13 +1,21 @@
 import logging
 
 from cacheops import invalidate_obj
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.db import transaction
 from django.dispatch import receiver
+from django_rq import get_queue
 
 from .choices import CableStatusChoices
 from .models import Cable, CablePath, Device, PathEndpoint, PowerPanel, Rack, RackGroup, VirtualChassis
+from .topology import CableTopology
+from .utils import object_to_path_node
+
+# Redis key indicating that a retrace of pending CablePaths has been queued but not yet started. The key expires after
+# RQ_DEFAULT_TIMEOUT, so that a lost job cannot prevent further retraces from being queued.
+RETRACE_PENDING_KEY = 'netbox:dcim:retrace_pending_paths'
 
 
 def create_cablepath(node):
@@ -23,17 +31,108 @@ def create_cablepath(node):
             raise e
 
 
-def rebuild_paths(obj):
+def retrace_paths(cable_paths):
     """
-    Rebuild all CablePaths which traverse the specified node
+    Retrace the given CablePaths in place and write any changes in bulk. All paths are traced through a single
+    CableTopology, prefetched from the nodes of their existing paths, so that each cable and port involved is loaded
+    only once no matter how many of the paths traverse it. CablePaths whose origin is no longer cabled are deleted.
     """
-    cable_paths = CablePath.objects.filter(path__contains=obj)
+    cable_paths = list(cable_paths)
+    if not cable_paths:
+        return
+
+    topology = CableTopology()
+    topology.prefetch(node for cp in cable_paths for node in cp.path)
+
+    to_update = []
+    to_delete = []
+    for cp in cable_paths:
+        traced = topology.trace((cp.origin_type_id, cp.origin_id))
+        if traced is None:
+            to_delete.append(cp)
+            continue
+        destination_type_id, destination_id = traced.destination or (None, None)
+        if cp.is_pending or (cp.path, cp.destination_type_id, cp.destination_id, cp.is_active, cp.is_split) != (
+            traced.path, destination_type_id, destination_id, traced.is_active, traced.is_split
+        ):
+            invalidate_obj(cp)
+            cp.path = traced.path
+            cp.destination_type_id = destination_type_id
+            cp.destination_id = destination_id
+            cp.is_active = traced.is_active
+            cp.is_split = traced.is_split
+            cp.is_pending = False
+            to_update.append(cp)
 
     with transaction.atomic():
-        for cp in cable_paths:
-            invalidate_obj(cp.origin)
+        if to_update:
+            CablePath.objects.bulk_update(
+                to_update, ('path', 'destination_type', 'destination_id', 'is_active', 'is_split', 'is_pending')
+            )
+            for cp in to_update:
+                invalidate_obj(cp)
+        for cp in to_delete:
+            if cp.origin is not None:
+                invalidate_obj(cp.origin)
             cp.delete()
-            create_cablepath(cp.origin)
+
+
+def retrace_pending_paths():
+    """
+    Retrace all CablePaths flagged as pending. This is executed as a background task when ASYNC_CABLE_PATHS is enabled.
+    """
+    # Clear the queued flag before reading any paths, so that changes made from here on enqueue a new retrace
+    get_queue('default').connection.delete(RETRACE_PENDING_KEY)
+
+    # Lock the pending paths: concurrent changes affecting them will wait for us to finish, then flag them again
+    with transaction.atomic():
+        retrace_paths(CablePath.objects.filter(is_pending=True).select_for_update())
+
+
+def enqueue_pending_paths():
+    """
+    Enqueue a background retrace of pending CablePaths once the current transaction has been committed, unless one is
+    already queued.
+    """
+    def enqueue():
+        queue = get_queue('default')
+        if queue.connection.set(RETRACE_PENDING_KEY, 1, nx=True, ex=settings.RQ_DEFAULT_TIMEOUT):
+            queue.enqueue('dcim.signals.retrace_pending_paths')
+
+    transaction.on_commit(enqueue)
+
+
+def create_pending_cablepath(node, cable):
+    """
+    Create or reset the CablePath originating from the specified node as a pending path comprising only its cable.
+    """
+    CablePath.objects.update_or_create(
+        origin_type=ContentType.objects.get_for_model(node),
+        origin_id=node.pk,
+        defaults={
+            'path': [object_to_path_node(cable)],
+            'destination_type': None,
+            'destination_id': None,
+            'is_active': False,
+            'is_split': False,
+            'is_pending': True,
+        }
+    )
+    enqueue_pending_paths()
+
+
+def rebuild_paths(obj):
+    """
+    Rebuild all CablePaths which traverse the specified node. If ASYNC_CABLE_PATHS is enabled, the paths are instead
+    flagged as pending and retraced by a background task.
+    """
+    cable_paths = CablePath.objects.filter(path__contains=obj)
+
+    if settings.ASYNC_CABLE_PATHS:
+        if cable_paths.invalidated_update(is_pending=True):
+            enqueue_pending_paths()
+    else:
+        retrace_paths(cable_paths)
 
 
 #
@@ -128,7 +227,10 @@ def update_connected_endpoints(instance, created, raw=False, **kwargs):
     if created:
         for termination in (instance.termination_a, instance.termination_b):
             if isinstance(termination, PathEndpoint):
-                create_cablepath(termination)
+                if settings.ASYNC_CABLE_PATHS:
+                    create_pending_cablepath(termination, instance)
+                else:
+                    create_cablepath(termination)
             else:
                 rebuild_paths(termination)
     elif instance.status != instance._orig_status:
@@ -160,16 +262,5 @@ def nullify_connected_endpoints(instance, **kwargs):
         instance.termination_b._cable_peer = None
         instance.termination_b.save()
 
-    # Delete and retrace any dependent cable paths
-    for cablepath in CablePath.objects.filter(path__contains=instance):
-        cp = CablePath.from_origin(cablepath.origin)
-        if cp:
-            CablePath.objects.filter(pk=cablepath.pk).update(
-                path=cp.path,
-                destination_type=ContentType.objects.get_for_model(cp.destination) if cp.destination else None,
-                destination_id=cp.destination.pk if cp.destination else None,
-                is_active=cp.is_active,
-                is_split=cp.is_split
-            )
-        else:
-            cablepath.delete()
+    # Retrace any dependent cable paths, deleting those which no longer have a cabled origin
+    rebuild_paths(instance)
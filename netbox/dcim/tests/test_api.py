@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
@@ -958,6 +960,27 @@ class DeviceTest(APIViewTestCases.APIViewTestCase):
 
         self.assertFalse('config_context' in response.data['results'][0])
 
+    def test_config_contexts_streamed(self):
+        """
+        Check that the rendered config contexts of all devices are streamed as newline-delimited JSON.
+        """
+        self.add_permissions('dcim.view_device')
+        url = reverse('dcim-api:device-config-contexts')
+        response = self.client.get(url, HTTP_ACCEPT='application/x-ndjson', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{str(device.pk): device.local_context_data} for device in Device.objects.all()]
+        )
+
+        # Objects are filtered as for the list endpoint
+        device = Device.objects.get(name='Device 2')
+        response = self.client.get(f'{url}?name=Device 2', **self.header)
+        self.assertEqual(b''.join(response.streaming_content), b'{"%d": {"B": 2}}\n' % device.pk)
+
     def test_unique_name_per_site_constraint(self):
         """
         Check that creating a device with a duplicate name within a site fails.
@@ -1,9 +1,19 @@
+from io import StringIO
+from unittest.mock import patch
+
+import django_rq
+
 from django.contrib.contenttypes.models import ContentType
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from circuits.models import *
 from dcim.choices import CableStatusChoices
 from dcim.models import *
+from dcim.signals import RETRACE_PENDING_KEY, enqueue_pending_paths, rebuild_paths, retrace_pending_paths
+from dcim.topology import CableTopology
 from dcim.utils import object_to_path_node
 
 
@@ -921,3 +931,192 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
         self.assertEqual(CablePath.objects.count(), 2)
+
+    @override_settings(ASYNC_CABLE_PATHS=True)
+    def test_303_async_path_recalculation(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+
+        # Create cable 1; the path is created as pending
+        cable1 = Cable(termination_a=interface1, termination_b=frontport1)
+        cable1.save()
+        path1 = self.assertPathExists(
+            origin=interface1,
+            destination=None,
+            path=(cable1,),
+            is_active=False
+        )
+        self.assertTrue(path1.is_pending)
+        interface1.refresh_from_db()
+        self.assertPathIsSet(interface1, path1)
+
+        # Retrace pending paths
+        retrace_pending_paths()
+        path1 = self.assertPathExists(
+            origin=interface1,
+            destination=None,
+            path=(cable1, frontport1, rearport1),
+            is_active=False
+        )
+        self.assertFalse(path1.is_pending)
+
+        # Create cable 2; the existing path is flagged as pending
+        cable2 = Cable(termination_a=rearport1, termination_b=interface2)
+        cable2.save()
+        self.assertTrue(CablePath.objects.get(pk=path1.pk).is_pending)
+        retrace_pending_paths()
+        path1 = self.assertPathExists(
+            origin=interface1,
+            destination=interface2,
+            path=(cable1, frontport1, rearport1, cable2),
+            is_active=True
+        )
+        self.assertPathExists(
+            origin=interface2,
+            destination=interface1,
+            path=(cable2, rearport1, frontport1, cable1),
+            is_active=True
+        )
+        self.assertFalse(CablePath.objects.filter(is_pending=True).exists())
+
+        # Delete cable 1; the dependent paths are flagged as pending until retraced
+        cable1.delete()
+        self.assertEqual(CablePath.objects.filter(is_pending=True).count(), 2)
+        retrace_pending_paths()
+        self.assertPathExists(
+            origin=interface2,
+            destination=None,
+            path=(cable2, rearport1, frontport1),
+            is_active=False
+        )
+        self.assertEqual(CablePath.objects.count(), 1)
+
+    @override_settings(RQ_DEFAULT_TIMEOUT=60)
+    def test_304_async_retrace_expiry(self):
+        """
+        Only one retrace is queued at a time, and the flag indicating that one has been queued expires.
+        """
+        queue = django_rq.get_queue('default')
+        queue.empty()
+        queue.connection.delete(RETRACE_PENDING_KEY)
+
+        # Enqueue immediately rather than once the (test case's) transaction has been committed
+        with patch('dcim.signals.transaction.on_commit', lambda func: func()):
+            enqueue_pending_paths()
+            enqueue_pending_paths()
+        self.assertEqual(queue.count, 1)
+        self.assertTrue(0 < queue.connection.ttl(RETRACE_PENDING_KEY) <= 60)
+
+        queue.empty()
+        queue.connection.delete(RETRACE_PENDING_KEY)
+
+
+class CableTopologyTestCase(TestCase):
+    """
+    Test that paths traced through an in-memory CableTopology are identical to those traced by CablePath.from_origin().
+    """
+    @classmethod
+    def setUpTestData(cls):
+
+        site = Site.objects.create(name='Site', slug='site')
+        manufacturer = Manufacturer.objects.create(name='Generic', slug='generic')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device')
+        device_role = DeviceRole.objects.create(name='Device Role', slug='device-role')
+        device = Device.objects.create(site=site, device_type=device_type, device_role=device_role, name='Test Device')
+
+        """
+        [IF1] --C1-- [FP1:1] [RP1] --C3-- [RP2] [FP2:1] --C4-- [FP3:1] [RP3] --C6-- [RP4] [FP4:1] --C7-- [IF3]
+        [IF2] --C2-- [FP1:2]                    [FP2:2] --C5-- [FP3:2]                    [FP4:2] --C8-- [IF4]
+        [IF5] --C9-- [RP5] [FP5:1] --C10-- [IF6]
+                           [FP5:2]
+        [IF7] --C11-- [IF8] (planned)
+        """
+        interfaces = [
+            Interface.objects.create(device=device, name=f'Interface {i}') for i in range(1, 9)
+        ]
+        rearports = [
+            RearPort.objects.create(device=device, name=f'Rear Port {i}', positions=4) for i in range(1, 6)
+        ]
+        frontports = {
+            (i, position): FrontPort.objects.create(
+                device=device, name=f'Front Port {i}:{position}', rear_port=rearports[i - 1],
+                rear_port_position=position
+            ) for i in range(1, 6) for position in (1, 2)
+        }
+        for termination_a, termination_b, status in (
+            (interfaces[0], frontports[(1, 1)], CableStatusChoices.STATUS_CONNECTED),
+            (interfaces[1], frontports[(1, 2)], CableStatusChoices.STATUS_CONNECTED),
+            (rearports[0], rearports[1], CableStatusChoices.STATUS_CONNECTED),
+            (frontports[(2, 1)], frontports[(3, 1)], CableStatusChoices.STATUS_CONNECTED),
+            (frontports[(2, 2)], frontports[(3, 2)], CableStatusChoices.STATUS_CONNECTED),
+            (rearports[2], rearports[3], CableStatusChoices.STATUS_CONNECTED),
+            (interfaces[2], frontports[(4, 1)], CableStatusChoices.STATUS_CONNECTED),
+            (interfaces[3], frontports[(4, 2)], CableStatusChoices.STATUS_CONNECTED),
+            (interfaces[4], rearports[4], CableStatusChoices.STATUS_CONNECTED),
+            (frontports[(5, 1)], interfaces[5], CableStatusChoices.STATUS_CONNECTED),
+            (interfaces[6], interfaces[7], CableStatusChoices.STATUS_PLANNED),
+        ):
+            Cable(termination_a=termination_a, termination_b=termination_b, status=status).save()
+
+        cls.interfaces = interfaces
+        cls.rearports = rearports
+
+    def assertTraceMatches(self, topology):
+        interface_ct = ContentType.objects.get_for_model(Interface).pk
+        for interface in Interface.objects.all():
+            expected = CablePath.from_origin(interface)
+            traced = topology.trace((interface_ct, interface.pk))
+            if expected is None:
+                self.assertIsNone(traced)
+                continue
+            destination = (
+                ContentType.objects.get_for_model(expected.destination).pk, expected.destination.pk
+            ) if expected.destination else None
+            self.assertEqual(traced.path, expected.path, msg=f"Path mismatch for {interface}")
+            self.assertEqual(traced.destination, destination, msg=f"Destination mismatch for {interface}")
+            self.assertEqual(traced.is_active, expected.is_active)
+            self.assertEqual(traced.is_split, expected.is_split)
+
+    def test_trace_loaded_topology(self):
+        self.assertTraceMatches(CableTopology.load())
+
+    def test_trace_lazy_topology(self):
+        self.assertTraceMatches(CableTopology())
+
+    def get_paths(self):
+        return {
+            (cp.origin_type_id, cp.origin_id, cp.destination_type_id, cp.destination_id, tuple(cp.path), cp.is_active,
+             cp.is_split) for cp in CablePath.objects.all()
+        }
+
+    def test_trace_paths_bulk(self):
+        expected = self.get_paths()
+        for processes in (1, 2):
+            call_command('trace_paths', force=True, no_input=True, bulk=True, processes=processes, stdout=StringIO())
+            self.assertEqual(self.get_paths(), expected)
+            for interface in Interface.objects.filter(cable__isnull=False):
+                self.assertEqual(interface._path.origin, interface)
+
+    def test_rebuild_paths_query_count(self):
+        """
+        Rebuilding paths should require a fixed number of queries regardless of how many paths are affected.
+        """
+        self.assertEqual(CablePath.objects.filter(path__contains=self.rearports[0]).count(), 4)
+        expected = self.get_paths()
+        CablePath.objects.update(destination_type=None, destination_id=None, is_active=False)
+
+        with CaptureQueriesContext(connection) as context:
+            rebuild_paths(self.rearports[0])
+        self.assertLessEqual(len(context.captured_queries), 8)
+        origin_ids = [interface.pk for interface in self.interfaces[:4]]
+        self.assertEqual(
+            {p for p in self.get_paths() if p[1] in origin_ids},
+            {p for p in expected if p[1] in origin_ids}
+        )
@@ -540,7 +540,7 @@ device-bays:
 
         response = self.client.get('{}?export'.format(url))
         self.assertEqual(response.status_code, 200)
-        data = list(yaml.load_all(response.content, Loader=yaml.SafeLoader))
+        data = list(yaml.load_all(b''.join(response.streaming_content), Loader=yaml.SafeLoader))
         self.assertEqual(len(data), 3)
         self.assertEqual(data[0]['manufacturer'], 'Manufacturer 1')
         self.assertEqual(data[0]['model'], 'Device Type 1')
@@ -1691,6 +1691,19 @@ class CableTestCase(
             'length_unit': CableLengthUnitChoices.UNIT_METER,
         }
 
+    def test_interface_connections_export(self):
+        self.add_permissions('dcim.view_interface')
+
+        response = self.client.get('{}?export'.format(reverse('dcim:interface_connections_list')))
+        self.assertHttpStatus(response, 200)
+        lines = b''.join(response.streaming_content).decode('utf-8').split('\n')
+        self.assertEqual(lines[0], 'device_a,interface_a,device_b,interface_b,reachable')
+        self.assertEqual(sorted(lines[1:]), [
+            'Device 2,Interface 1,Device 1,Interface 1,True',
+            'Device 2,Interface 2,Device 1,Interface 2,True',
+            'Device 2,Interface 3,Device 1,Interface 3,True',
+        ])
+
 
 class VirtualChassisTestCase(ViewTestCases.PrimaryObjectViewTestCase):
     model = VirtualChassis
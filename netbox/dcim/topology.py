@@ -0,0 +1,259 @@
+from collections import namedtuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from .choices import CableStatusChoices
+from .models import Cable, FrontPort, RearPort
+from .utils import compile_path_node
+
+__all__ = (
+    'CableTopology',
+    'TracedPath',
+)
+
+
+TracedPath = namedtuple('TracedPath', ('origin', 'destination', 'path', 'is_active', 'is_split'))
+TracedPath.__doc__ = """
+The result of tracing a path through a CableTopology. `origin` and `destination` are (ContentType ID, object ID) tuples
+(`destination` may be None), and `path` is a list of compiled path nodes suitable for assignment to CablePath.path.
+"""
+
+
+class CableTopology:
+    """
+    An in-memory index of cables and pass-through port mappings, used to trace CablePaths without querying the database
+    for each hop.
+
+    A topology created with `CableTopology.load()` holds the complete cable graph, loaded using a handful of queries. A
+    topology instantiated directly starts out empty and loads the nodes it encounters on demand; use `prefetch()` to
+    load many nodes at once. Every node is loaded at most once per topology, so tracing many paths which share the
+    same cables and ports costs no more queries than tracing one of them.
+    """
+    def __init__(self):
+        self.complete = False
+
+        # Cable ID -> (status, termination A node, termination B node)
+        self.cables = {}
+        # Termination node -> Cable ID (or None, for a termination known to be uncabled)
+        self.cable_ends = {}
+        # FrontPort ID -> (RearPort ID, RearPort position)
+        self.front_ports = {}
+        # RearPort ID -> number of positions
+        self.rear_ports = {}
+        # (RearPort ID, position) -> FrontPort ID
+        self.rear_port_map = {}
+        # RearPorts for which all FrontPort mappings have been loaded
+        self._mapped_rear_ports = set()
+
+        self.cable_ct = ContentType.objects.get_for_model(Cable).pk
+        self.frontport_ct = ContentType.objects.get_for_model(FrontPort).pk
+        self.rearport_ct = ContentType.objects.get_for_model(RearPort).pk
+
+    @classmethod
+    def load(cls):
+        """
+        Return a CableTopology holding all cables and pass-through ports.
+        """
+        topology = cls()
+        topology._load_cables(Cable.objects.all())
+        topology._load_front_ports(FrontPort.objects.all())
+        topology._load_rear_ports(RearPort.objects.all())
+        topology.complete = True
+
+        return topology
+
+    #
+    # Loading
+    #
+
+    def _load_cables(self, queryset):
+        for pk, status, a_type, a_id, b_type, b_id in queryset.values_list(
+            'pk', 'status', 'termination_a_type_id', 'termination_a_id', 'termination_b_type_id', 'termination_b_id'
+        ):
+            termination_a = (a_type, a_id)
+            termination_b = (b_type, b_id)
+            self.cables[pk] = (status, termination_a, termination_b)
+            self.cable_ends[termination_a] = pk
+            self.cable_ends[termination_b] = pk
+
+    def _load_front_ports(self, queryset):
+        for pk, rear_port_id, position in queryset.values_list('pk', 'rear_port_id', 'rear_port_position'):
+            self.front_ports[pk] = (rear_port_id, position)
+            self.rear_port_map[(rear_port_id, position)] = pk
+
+    def _load_rear_ports(self, queryset):
+        for pk, positions in queryset.values_list('pk', 'positions'):
+            self.rear_ports[pk] = positions
+
+    def prefetch(self, nodes):
+        """
+        Load the cables and pass-through ports among the given nodes, along with the cables attached to those ports,
+        using one query per object type. Nodes are compiled path node strings or (ContentType ID, object ID) tuples.
+        """
+        if self.complete:
+            return
+
+        cable_ids, front_port_ids, rear_port_ids = set(), set(), set()
+        for node in nodes:
+            if isinstance(node, str):
+                ct_id, object_id = (int(x) for x in node.split(':'))
+            else:
+                ct_id, object_id = node
+            if ct_id == self.cable_ct:
+                cable_ids.add(object_id)
+            elif ct_id == self.frontport_ct:
+                front_port_ids.add(object_id)
+            elif ct_id == self.rearport_ct:
+                rear_port_ids.add(object_id)
+
+        # Pass-through ports (including the FrontPorts mapped to each RearPort)
+        front_port_ids -= self.front_ports.keys()
+        rear_port_ids -= self._mapped_rear_ports
+        port_cables = {}
+        if front_port_ids or rear_port_ids:
+            for pk, cable_id, rear_port_id, position in FrontPort.objects.filter(
+                Q(pk__in=front_port_ids) | Q(rear_port_id__in=rear_port_ids)
+            ).values_list('pk', 'cable_id', 'rear_port_id', 'rear_port_position'):
+                self.front_ports[pk] = (rear_port_id, position)
+                self.rear_port_map[(rear_port_id, position)] = pk
+                port_cables[(self.frontport_ct, pk)] = cable_id
+                rear_port_ids.add(rear_port_id)
+            rear_port_ids -= self.rear_ports.keys()
+            for pk, cable_id, positions in RearPort.objects.filter(pk__in=rear_port_ids).values_list(
+                'pk', 'cable_id', 'positions'
+            ):
+                self.rear_ports[pk] = positions
+                port_cables[(self.rearport_ct, pk)] = cable_id
+        self._mapped_rear_ports.update(rear_port_ids)
+
+        # Cables, including those attached to the pass-through ports loaded above
+        cable_ids.update(pk for pk in port_cables.values() if pk is not None)
+        cable_ids -= self.cables.keys()
+        if cable_ids:
+            self._load_cables(Cable.objects.filter(pk__in=cable_ids))
+        for node, cable_id in port_cables.items():
+            if cable_id is None:
+                self.cable_ends.setdefault(node, None)
+
+    #
+    # Lookups
+    #
+
+    def get_cable(self, node):
+        """
+        Return the ID of the Cable attached to the given node, if any.
+        """
+        if node not in self.cable_ends:
+            if self.complete:
+                return None
+            ct_id, object_id = node
+            self._load_cables(Cable.objects.filter(
+                Q(termination_a_type_id=ct_id, termination_a_id=object_id) |
+                Q(termination_b_type_id=ct_id, termination_b_id=object_id)
+            ))
+            self.cable_ends.setdefault(node, None)
+        return self.cable_ends[node]
+
+    def get_front_port(self, front_port_id):
+        """
+        Return the (RearPort ID, position) to which the given FrontPort maps.
+        """
+        if front_port_id not in self.front_ports and not self.complete:
+            self._load_front_ports(FrontPort.objects.filter(pk=front_port_id))
+        return self.front_ports[front_port_id]
+
+    def get_rear_port_positions(self, rear_port_id):
+        """
+        Return the number of positions on the given RearPort.
+        """
+        if rear_port_id not in self.rear_ports and not self.complete:
+            self._load_rear_ports(RearPort.objects.filter(pk=rear_port_id))
+        return self.rear_ports[rear_port_id]
+
+    def get_peer_front_port(self, rear_port_id, position):
+        """
+        Return the ID of the FrontPort mapped to the given position on a RearPort, if any.
+        """
+        if rear_port_id not in self._mapped_rear_ports and not self.complete:
+            self._load_front_ports(FrontPort.objects.filter(rear_port_id=rear_port_id))
+            self._mapped_rear_ports.add(rear_port_id)
+        return self.rear_port_map.get((rear_port_id, position))
+
+    #
+    # Tracing
+    #
+
+    def trace(self, origin):
+        """
+        Trace the path originating from the given (ContentType ID, object ID) node and return it as a TracedPath, or
+        None if the origin has no cable attached. This mirrors the logic of CablePath.from_origin().
+        """
+        cable_id = self.get_cable(origin)
+        if cable_id is None:
+            return None
+
+        destination = None
+        path = []
+        position_stack = []
+        is_active = True
+        is_split = False
+
+        node = origin
+        while cable_id is not None:
+            status, termination_a, termination_b = self.cables[cable_id]
+            if status != CableStatusChoices.STATUS_CONNECTED:
+                is_active = False
+
+            # Follow the cable to its far-end termination
+            path.append(compile_path_node(self.cable_ct, cable_id))
+            peer_termination = termination_b if termination_a == node else termination_a
+            peer_type, peer_id = peer_termination
+
+            # Follow a FrontPort to its corresponding RearPort
+            if peer_type == self.frontport_ct:
+                path.append(compile_path_node(*peer_termination))
+                rear_port_id, position = self.get_front_port(peer_id)
+                node = (self.rearport_ct, rear_port_id)
+                if self.get_rear_port_positions(rear_port_id) > 1:
+                    position_stack.append(position)
+                path.append(compile_path_node(*node))
+
+            # Follow a RearPort to its corresponding FrontPort (if any)
+            elif peer_type == self.rearport_ct:
+                path.append(compile_path_node(*peer_termination))
+
+                # Determine the peer FrontPort's position
+                if self.get_rear_port_positions(peer_id) == 1:
+                    position = 1
+                elif position_stack:
+                    position = position_stack.pop()
+                else:
+                    # No position indicated: path has split, so we stop at the RearPort
+                    is_split = True
+                    break
+
+                front_port_id = self.get_peer_front_port(peer_id, position)
+                if front_port_id is None:
+                    # No corresponding FrontPort found for the RearPort
+                    break
+                node = (self.frontport_ct, front_port_id)
+                path.append(compile_path_node(*node))
+
+            # Anything else marks the end of the path
+            else:
+                destination = peer_termination
+                break
+
+            cable_id = self.get_cable(node)
+
+        if destination is None:
+            is_active = False
+
+        return TracedPath(
+            origin=origin,
+            destination=destination,
+            path=path,
+            is_active=is_active,
+            is_split=is_split
+        )
@@ -20,6 +20,7 @@ from secrets.models import Secret
 from utilities.forms import ConfirmationForm
 from utilities.paginator import EnhancedPaginator, get_paginate_count
 from utilities.permissions import get_permission_for_model
+from utilities.querysets import iterate_queryset
 from utilities.utils import csv_format, count_related
 from utilities.views import GetReturnURLMixin, ObjectPermissionRequiredMixin
 from virtualization.models import VirtualMachine
@@ -2241,21 +2242,17 @@ class ConsoleConnectionsListView(generic.ObjectListView):
     template_name = 'dcim/connections_list.html'
 
     def queryset_to_csv(self):
-        csv_data = [
-            # Headers
-            ','.join(['console_server', 'port', 'device', 'console_port', 'reachable'])
-        ]
-        for obj in self.queryset:
-            csv = csv_format([
+        # Headers
+        yield ','.join(['console_server', 'port', 'device', 'console_port', 'reachable'])
+        queryset = self.queryset.select_related('device', '_path').prefetch_related('_path__destination__device')
+        for obj in iterate_queryset(queryset):
+            yield csv_format([
                 obj._path.destination.device.identifier if obj._path.destination else None,
                 obj._path.destination.name if obj._path.destination else None,
                 obj.device.identifier,
                 obj.name,
                 obj._path.is_active
             ])
-            csv_data.append(csv)
-
-        return '\n'.join(csv_data)
 
     def extra_context(self):
         return {
@@ -2271,21 +2268,17 @@ class PowerConnectionsListView(generic.ObjectListView):
     template_name = 'dcim/connections_list.html'
 
     def queryset_to_csv(self):
-        csv_data = [
-            # Headers
-            ','.join(['pdu', 'outlet', 'device', 'power_port', 'reachable'])
-        ]
-        for obj in self.queryset:
-            csv = csv_format([
+        # Headers
+        yield ','.join(['pdu', 'outlet', 'device', 'power_port', 'reachable'])
+        queryset = self.queryset.select_related('device', '_path').prefetch_related('_path__destination__device')
+        for obj in iterate_queryset(queryset):
+            yield csv_format([
                 obj._path.destination.device.identifier if obj._path.destination else None,
                 obj._path.destination.name if obj._path.destination else None,
                 obj.device.identifier,
                 obj.name,
                 obj._path.is_active
             ])
-            csv_data.append(csv)
-
-        return '\n'.join(csv_data)
 
     def extra_context(self):
         return {
@@ -2305,23 +2298,19 @@ class InterfaceConnectionsListView(generic.ObjectListView):
     template_name = 'dcim/connections_list.html'
 
     def queryset_to_csv(self):
-        csv_data = [
-            # Headers
-            ','.join([
-                'device_a', 'interface_a', 'device_b', 'interface_b', 'reachable'
-            ])
-        ]
-        for obj in self.queryset:
-            csv = csv_format([
+        # Headers
+        yield ','.join([
+            'device_a', 'interface_a', 'device_b', 'interface_b', 'reachable'
+        ])
+        queryset = self.queryset.select_related('device', '_path').prefetch_related('_path__destination__device')
+        for obj in iterate_queryset(queryset):
+            yield csv_format([
                 obj._path.destination.device.identifier if obj._path.destination else None,
                 obj._path.destination.name if obj._path.destination else None,
                 obj.device.identifier,
                 obj.name,
                 obj._path.is_active
             ])
-            csv_data.append(csv)
-
-        return '\n'.join(csv_data)
 
     def extra_context(self):
         return {
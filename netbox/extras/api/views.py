@@ -1,16 +1,19 @@
 from django.contrib.contenttypes.models import ContentType
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django_rq.queues import get_connection
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.routers import APIRootView
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ReadOnlyModelViewSet, ViewSet
 from rq import Worker
 
 from extras import filters
 from extras.choices import JobResultStatusChoices
+from extras.configcontexts import iter_config_contexts
 from extras.models import (
     ConfigContext, ExportTemplate, ImageAttachment, ObjectChange, JobResult, Tag, TaggedItem,
 )
@@ -19,6 +22,7 @@ from extras.reports import get_report, get_reports, run_report
 from extras.scripts import get_script, get_scripts, run_script
 from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
 from netbox.api.metadata import ContentTypeMetadata
+from netbox.api.renderers import NDJSONRenderer
 from netbox.api.views import ModelViewSet
 from utilities.exceptions import RQWorkerNotRunningException
 from utilities.utils import copy_safe_request, count_related
@@ -37,7 +41,8 @@ class ConfigContextQuerySetMixin:
     """
     Used by views that work with config context models (device and virtual machine).
     Provides a get_queryset() method which deals with adding the config context
-    data annotation or not.
+    data annotation or not, and an endpoint which streams the rendered config
+    contexts of all objects.
     """
     def get_queryset(self):
         """
@@ -54,6 +59,23 @@ class ConfigContextQuerySetMixin:
             return queryset
         return queryset.annotate_config_context_data()
 
+    @swagger_auto_schema(responses={'200': 'A newline-delimited JSON object mapping each object ID to its context'})
+    @action(
+        detail=False,
+        url_path='config-contexts',
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    )
+    def config_contexts(self, request):
+        """
+        Stream the rendered config context of every object as newline-delimited JSON, with one {"<id>": <context>}
+        object per line. Objects may be filtered in the same manner as for the list endpoint.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        lines = (
+            '{"%s": %s}\n' % (obj.pk, rendered) for obj, rendered in iter_config_contexts(queryset)
+        )
+        return StreamingHttpResponse(lines, content_type=NDJSONRenderer.media_type)
+
 
 #
 # Custom fields
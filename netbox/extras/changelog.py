@@ -0,0 +1,138 @@
+from django.db import connections, router, transaction
+
+from .choices import ObjectChangeActionChoices
+from .models import ObjectChange
+
+
+class _CommitMarker:
+    """
+    A transaction.on_commit() callback which records whether the transaction it was registered in has been committed.
+    Django discards the callbacks registered within a transaction (or savepoint) when it is rolled back.
+    """
+    __slots__ = ('committed',)
+
+    def __init__(self):
+        self.committed = False
+
+    def __call__(self):
+        self.committed = True
+
+
+class PendingChange:
+    """
+    A change recorded by a ChangeBuffer. `action` is the first action taken on the object, and `data` holds whatever
+    the buffer records for the change.
+    """
+    __slots__ = ('instance', 'action', 'data', 'context', 'marker')
+
+    def __init__(self, instance, action, context):
+        self.instance = instance
+        self.action = action
+        self.data = None
+        self.context = context
+        self.marker = None
+
+
+class ChangeBuffer:
+    """
+    Base class for collecting the changes made to objects during a request, to be processed in bulk once the request
+    has completed.
+
+    Repeated changes to an object within the same transaction (for example, creating an object and then assigning its
+    tags) are coalesced into one change, which retains the first action taken. Changes made within a transaction or
+    savepoint which is later rolled back are discarded.
+    """
+    def __init__(self, using):
+        self.using = using
+        self._changes = []
+        # (model, pk) -> the last PendingChange recorded for a created or updated object
+        self._pending = {}
+
+    def _get_context(self):
+        """
+        Return the set of savepoints which are active on the database connection, or None when in autocommit mode.
+        """
+        connection = connections[self.using]
+        if connection.in_atomic_block:
+            return frozenset(connection.savepoint_ids)
+        return None
+
+    def record(self, instance, action):
+        """
+        Record a change to the given object, and return its PendingChange.
+        """
+        key = (instance._meta.concrete_model, instance.pk)
+        context = self._get_context()
+
+        change = self._pending.pop(key, None)
+        if change is None or action == ObjectChangeActionChoices.ACTION_DELETE or change.context != context or (
+            context is not None and change.marker.committed
+        ):
+            # This change must be recorded separately from any previous change to the object, as they may be committed
+            # or rolled back independently of one another
+            change = PendingChange(instance, action, context)
+            self._changes.append(change)
+        else:
+            change.instance = instance
+
+        # Watch the current transaction (if any) for a rollback
+        change.marker = _CommitMarker()
+        transaction.on_commit(change.marker, using=self.using)
+
+        if action != ObjectChangeActionChoices.ACTION_DELETE:
+            self._pending[key] = change
+
+        return change
+
+    def pop_changes(self):
+        """
+        Return all recorded changes which have not been rolled back, and empty the buffer.
+        """
+        connection = connections[self.using]
+        uncommitted = {id(func) for sids, func in connection.run_on_commit}
+
+        changes = [
+            change for change in self._changes
+            if change.marker.committed or id(change.marker) in uncommitted
+        ]
+        self._changes = []
+        self._pending = {}
+
+        return changes
+
+
+class ObjectChangeBuffer(ChangeBuffer):
+    """
+    Collect the ObjectChanges for a request, and write them to the database using a single query when flushed. Each
+    ObjectChange records the first action taken on an object and its state following the last change.
+
+    :param request: WSGIRequest object with a unique `id` set
+    """
+    def __init__(self, request):
+        super().__init__(using=router.db_for_write(ObjectChange))
+        self.request = request
+
+    def record(self, instance, action):
+        change = super().record(instance, action)
+        change.data = instance.to_objectchange(change.action)
+        return change
+
+    def flush(self):
+        """
+        Write the ObjectChanges for all recorded changes which have not been rolled back, and empty the buffer. Returns
+        the list of ObjectChanges created.
+        """
+        user = self.request.user
+
+        objectchanges = []
+        for change in self.pop_changes():
+            objectchange = change.data
+            objectchange.user = user
+            objectchange.user_name = user.username
+            objectchange.request_id = self.request.id
+            objectchanges.append(objectchange)
+
+        if objectchanges:
+            ObjectChange.objects.using(self.using).bulk_create(objectchanges)
+
+        return objectchanges
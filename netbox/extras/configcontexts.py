@@ -0,0 +1,247 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+
+from cacheops import invalidate_model
+from django.db.models import Q, Subquery
+
+from utilities.query_functions import EmptyGroupByArrayAgg
+from utilities.utils import deepmerge
+
+# Maximum number of rendered config contexts retained by each process
+RENDERED_CONTEXTS_CACHE_SIZE = 1024
+
+# The lookups relating devices and virtual machines to each type of object to which a ConfigContext may be assigned,
+# in the order in which they are considered by get_config_context_objects()
+CONFIG_CONTEXT_ASSIGNMENTS = {
+    'device': (
+        ('sites', 'site'),
+        ('clusters', 'cluster'),
+        ('tenants', 'tenant'),
+        ('platforms', 'platform'),
+        ('roles', 'device_role'),
+        ('cluster_groups', 'cluster__group'),
+        ('tenant_groups', 'tenant__group'),
+        ('regions', 'site__region'),
+        ('tags', 'tags'),
+    ),
+    'virtualmachine': (
+        ('sites', 'cluster__site'),
+        ('clusters', 'cluster'),
+        ('tenants', 'tenant'),
+        ('platforms', 'platform'),
+        ('roles', 'role'),
+        ('cluster_groups', 'cluster__group'),
+        ('tenant_groups', 'tenant__group'),
+        ('regions', 'cluster__site__region'),
+        ('tags', 'tags'),
+    ),
+}
+
+
+class RenderedContextCache:
+    """
+    A least-recently-used cache of rendered config contexts (serialized as JSON), keyed by a hash of the applicable
+    ConfigContexts and the local context data of an object. Objects which share the same inputs share one rendered
+    context.
+    """
+    def __init__(self, maxsize=RENDERED_CONTEXTS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+rendered_contexts = RenderedContextCache()
+
+
+def get_cache_key(contexts, local_context_data):
+    """
+    Return the key of a rendered config context.
+
+    :param contexts: A string identifying the applicable ConfigContexts and their versions, in order of precedence
+    :param local_context_data: The local context data of the object
+    """
+    key = f'{contexts}:{json.dumps(local_context_data)}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def compute_config_contexts(objects):
+    """
+    Determine the IDs of the ConfigContexts applicable to each of the given devices or virtual machines (which must
+    be of the same model) using a single query, and store them on each object and in the database.
+    """
+    if not objects:
+        return
+    from extras.models import ConfigContext
+
+    model = type(objects[0])
+    queryset = model.objects.nocache().filter(pk__in=[obj.pk for obj in objects])
+    context_ids = queryset.annotate(
+        context_ids=Subquery(
+            ConfigContext.objects.filter(
+                queryset._get_config_context_filters()
+            ).annotate(
+                _ids=EmptyGroupByArrayAgg('pk', ordering=['weight', 'name'])
+            ).values('_ids')
+        )
+    ).values_list('pk', 'context_ids')
+
+    # A ConfigContext may be matched more than once (e.g. when assigned to multiple regions)
+    mapping = {pk: list(dict.fromkeys(ids or [])) for pk, ids in context_ids}
+
+    # Update objects sharing the same ConfigContexts together, skipping any which have been updated concurrently
+    groups = defaultdict(list)
+    for pk, ids in mapping.items():
+        groups[tuple(ids)].append(pk)
+    updated = 0
+    for ids, pks in groups.items():
+        updated += model.objects.filter(pk__in=pks, _config_contexts__isnull=True).update(_config_contexts=list(ids))
+    if updated:
+        invalidate_model(model)
+
+    for obj in objects:
+        obj._config_contexts = mapping.get(obj.pk, [])
+
+
+def clear_config_contexts(queryset):
+    """
+    Discard the stored ConfigContext IDs of the devices or virtual machines in a queryset. They will be computed
+    again when next needed.
+    """
+    if queryset.filter(_config_contexts__isnull=False).update(_config_contexts=None):
+        invalidate_model(queryset.model)
+
+
+def get_config_context_objects(context, model):
+    """
+    Return a queryset including every device or virtual machine (per `model`) to which a ConfigContext may apply: those
+    whose stored ConfigContext IDs include it and, if it is active, those matching one of its assignments. (An object
+    must match every type of assignment, so those matching the first assigned type are a superset of the objects the
+    ConfigContext applies to.)
+    """
+    from dcim.models import Region
+
+    query = Q(_config_contexts__contains=[context.pk])
+    if context.is_active:
+        for field_name, lookup in CONFIG_CONTEXT_ASSIGNMENTS[model._meta.model_name]:
+            assigned = getattr(context, field_name).all()
+            if field_name == 'regions':
+                # Include objects in any child region
+                assigned = Region.objects.get_queryset_descendants(assigned, include_self=True)
+            pks = list(assigned.values_list('pk', flat=True))
+            if pks:
+                query |= Q(**{f'{lookup}__in': pks})
+                break
+        else:
+            # A ConfigContext with no assignments applies to all objects
+            return model.objects.all()
+
+    return model.objects.filter(query)
+
+
+def iter_config_contexts(queryset, batch_size=1000):
+    """
+    Yield each device or virtual machine in a queryset along with its rendered config context, serialized as JSON.
+
+    Objects are retrieved using a server-side cursor and rendered a batch at a time, so that memory use is bounded
+    regardless of the number of objects. Only the fields needed to render config contexts are retrieved.
+    """
+    queryset = queryset.select_related(None).prefetch_related(None).only('pk', 'local_context_data', '_config_contexts')
+
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield from zip(batch, render_config_contexts(batch))
+            batch = []
+    if batch:
+        yield from zip(batch, render_config_contexts(batch))
+
+
+def render_config_contexts(objects, refresh=False):
+    """
+    Return the rendered config context of each of the given devices or virtual machines (which must be of the same
+    model), serialized as JSON.
+
+    The applicable ConfigContexts are taken from the IDs stored on each object, computing any which are missing.
+    Rendered contexts are cached by a hash of the applicable ConfigContexts and the local context data, so that
+    objects sharing the same inputs are merged only once.
+
+    :param objects: A list of devices or virtual machines
+    :param refresh: Retrieve the stored ConfigContext IDs from the database rather than using those of each object
+    """
+    from extras.models import ConfigContext
+
+    if not objects:
+        return []
+    if refresh:
+        model = type(objects[0])
+        stored = dict(
+            model.objects.nocache().filter(pk__in=[obj.pk for obj in objects]).values_list('pk', '_config_contexts')
+        )
+        for obj in objects:
+            obj._config_contexts = stored.get(obj.pk)
+    compute_config_contexts([obj for obj in objects if obj._config_contexts is None])
+
+    all_ids = {pk for obj in objects for pk in obj._config_contexts}
+    last_updated = dict(ConfigContext.objects.filter(pk__in=all_ids).values_list('pk', 'last_updated'))
+
+    # Identify each distinct list of ConfigContexts by their IDs and the time at which each was last updated
+    context_lists = {}
+    for obj in objects:
+        ids = tuple(obj._config_contexts)
+        if ids not in context_lists:
+            ids_found = [pk for pk in ids if pk in last_updated]
+            context_lists[ids] = (ids_found, ','.join(f'{pk}@{last_updated[pk]}' for pk in ids_found))
+
+    # Determine the cache key of each object's rendered context, noting any which are not cached
+    keys = []
+    rendered = {}
+    missing = {}
+    for obj in objects:
+        ids, contexts = context_lists[tuple(obj._config_contexts)]
+        key = get_cache_key(contexts, obj.local_context_data)
+        keys.append(key)
+        if key not in rendered and key not in missing:
+            rendered[key] = rendered_contexts.get(key)
+            if rendered[key] is None:
+                missing[key] = (ids, obj.local_context_data)
+
+    # Render each missing context once
+    if missing:
+        data = dict(ConfigContext.objects.filter(
+            pk__in={pk for ids, _ in missing.values() for pk in ids}
+        ).values_list('pk', 'data'))
+        for key, (ids, local_context_data) in missing.items():
+            context = OrderedDict()
+            for pk in ids:
+                context = deepmerge(context, data.get(pk, {}))
+            # If the object has local config context data defined, merge it last
+            if local_context_data:
+                context = deepmerge(context, local_context_data)
+            rendered[key] = json.dumps(context)
+            rendered_contexts.set(key, rendered[key])
+
+    return [rendered[key] for key in keys]
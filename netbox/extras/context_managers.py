@@ -1,8 +1,11 @@
 from contextlib import contextmanager
 
+from django.db import connections
 from django.db.models.signals import m2m_changed, pre_delete, post_save
 
+from extras.changelog import ObjectChangeBuffer
 from extras.signals import _handle_changed_object, _handle_deleted_object
+from extras.webhooks import WebhookBuffer
 from utilities.utils import curry
 
 
@@ -10,23 +13,36 @@ from utilities.utils import curry
 def change_logging(request):
     """
     Enable change logging by connecting the appropriate signals to their receivers before code is run, and
-    disconnecting them afterward.
+    disconnecting them afterward. ObjectChanges are collected in an ObjectChangeBuffer and written to the database once
+    the code has completed (even if it raises an exception, since it may already have committed some changes);
+    likewise, webhooks are collected in a WebhookBuffer and enqueued together.
 
     :param request: WSGIRequest object with a unique `id` set
     """
-    # Curry signals receivers to pass the current request
-    handle_changed_object = curry(_handle_changed_object, request)
-    handle_deleted_object = curry(_handle_deleted_object, request)
+    changelog = ObjectChangeBuffer(request)
+    webhook_queue = WebhookBuffer(request)
+
+    # Curry signals receivers to pass the current request, changelog and webhook queue
+    handle_changed_object = curry(_handle_changed_object, request, changelog, webhook_queue)
+    handle_deleted_object = curry(_handle_deleted_object, request, changelog, webhook_queue)
 
     # Connect our receivers to the post_save and post_delete signals.
     post_save.connect(handle_changed_object, dispatch_uid='handle_changed_object')
     m2m_changed.connect(handle_changed_object, dispatch_uid='handle_changed_object')
     pre_delete.connect(handle_deleted_object, dispatch_uid='handle_deleted_object')
 
-    yield
-
-    # Disconnect change logging signals. This is necessary to avoid recording any errant
-    # changes during test cleanup.
-    post_save.disconnect(handle_changed_object, dispatch_uid='handle_changed_object')
-    m2m_changed.disconnect(handle_changed_object, dispatch_uid='handle_changed_object')
-    pre_delete.disconnect(handle_deleted_object, dispatch_uid='handle_deleted_object')
+    try:
+        try:
+            yield
+        finally:
+            # Changes made within a transaction which was rolled back have been discarded by the buffers. Skip flushing
+            # if the current transaction is broken: everything recorded within it will be rolled back.
+            if not connections[changelog.using].needs_rollback:
+                changelog.flush()
+                webhook_queue.flush()
+    finally:
+        # Disconnect change logging signals. This is necessary to avoid recording any errant
+        # changes during test cleanup.
+        post_save.disconnect(handle_changed_object, dispatch_uid='handle_changed_object')
+        m2m_changed.disconnect(handle_changed_object, dispatch_uid='handle_changed_object')
+        pre_delete.disconnect(handle_deleted_object, dispatch_uid='handle_deleted_object')
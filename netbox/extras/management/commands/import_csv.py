@@ -0,0 +1,100 @@
+import sys
+import uuid
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import NoReverseMatch, resolve, reverse
+
+from extras.context_managers import change_logging
+from utilities.csv_import import CSV_IMPORT_BATCH_SIZE
+from utilities.forms import CSVDataField
+from utilities.permissions import get_permission_for_model, get_permitted_objects
+from utilities.utils import NetBoxFakeRequest
+
+
+class Command(BaseCommand):
+    help = "Import objects from a CSV file, as the bulk import form does"
+    stealth_options = ('stdin',)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model', metavar='app_label.ModelName',
+            help="The type of object to import"
+        )
+        parser.add_argument(
+            'file',
+            help="The CSV file to import, beginning with a line of column headers ('-' to read from standard input)"
+        )
+        parser.add_argument(
+            '--user', required=True,
+            help="The user importing the objects, whose permissions are enforced and to whom changes are attributed"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=CSV_IMPORT_BATCH_SIZE, dest='batch_size',
+            help=f"Number of records validated and saved at a time (default: {CSV_IMPORT_BATCH_SIZE})"
+        )
+
+    def _get_import_view(self, name):
+        """
+        Return the model and the bulk import view for the specified model.
+        """
+        try:
+            model = apps.get_model(name)
+        except (LookupError, ValueError):
+            raise CommandError(f"Unknown model: {name}. Models must be specified in the form app_label.ModelName.")
+        try:
+            url = reverse(f'{model._meta.app_label}:{model._meta.model_name}_import')
+        except NoReverseMatch:
+            raise CommandError(f"{model._meta.verbose_name_plural.capitalize()} cannot be imported")
+
+        return model, resolve(url).func.view_class
+
+    def handle(self, *args, **options):
+        model, view_class = self._get_import_view(options['model'])
+        model_name = model._meta.verbose_name_plural
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['user']}")
+        if not user.has_perm(get_permission_for_model(model, 'add')):
+            raise CommandError(f"User {user} does not have permission to add {model_name}")
+
+        # Parse the CSV data
+        if options['file'] == '-':
+            data = options.get('stdin', sys.stdin).read()
+        else:
+            with open(options['file'], encoding='utf-8-sig') as csv_file:
+                data = csv_file.read()
+        try:
+            headers, records = CSVDataField(from_form=view_class.model_form).clean(data)
+        except ValidationError as e:
+            raise CommandError('\n'.join(e.messages))
+
+        request = NetBoxFakeRequest({
+            'id': uuid.uuid4(),
+            'user': user,
+        })
+
+        def progress(count, total):
+            if options['verbosity']:
+                self.stdout.write(f"{count}/{total} records processed")
+
+        importer = view_class().get_importer(headers, request, batch_size=options['batch_size'], progress=progress)
+        with change_logging(request):
+            try:
+                with transaction.atomic():
+                    new_objs = importer.run(records)
+
+                    # Enforce object-level permissions
+                    permitted_objs = get_permitted_objects(user, 'add', new_objs, queryset=view_class.queryset)
+                    if len(permitted_objs) != len(new_objs):
+                        raise CommandError("Object import failed due to object-level permissions violation")
+            except ValidationError as e:
+                raise CommandError('\n'.join(e.messages))
+
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(f"Imported {len(new_objs)} {model_name}"))
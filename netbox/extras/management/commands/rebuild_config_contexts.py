@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from dcim.models import Device
+from extras.configcontexts import clear_config_contexts, compute_config_contexts
+from virtualization.models import VirtualMachine
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored ConfigContext IDs of all devices and virtual machines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of objects to compute per query (default: 1000)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (Device, VirtualMachine):
+            name = model._meta.verbose_name_plural
+            if options['verbosity']:
+                self.stdout.write(f"{name.capitalize()}... ", ending='')
+                self.stdout.flush()
+
+            clear_config_contexts(model.objects.all())
+            pks = list(model.objects.nocache().order_by('pk').values_list('pk', flat=True))
+            for i in range(0, len(pks), batch_size):
+                compute_config_contexts([model(pk=pk) for pk in pks[i:i + batch_size]])
+
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(f"{len(pks)} {name} updated"))
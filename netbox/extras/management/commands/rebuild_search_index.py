@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils.text import capfirst
+
+from extras.search import SEARCH_INDEXES, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index used by the global search when SEARCH_INDEX_ENABLED is set"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing-only", action='store_true', dest='missing_only',
+            help="Index only objects which are missing from the search index"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000, dest='batch_size',
+            help="Number of objects to index per query (default: 2000)"
+        )
+
+    def handle(self, *args, **options):
+        for label in SEARCH_INDEXES:
+            model = apps.get_model(label)
+            name = model._meta.verbose_name_plural
+            if options['verbosity']:
+                self.stdout.write(f"{capfirst(name)}... ", ending='')
+                self.stdout.flush()
+
+            count = rebuild_search_index(model, missing_only=options['missing_only'], batch_size=options['batch_size'])
+
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(f"{count} {name} indexed"))
@@ -1,9 +1,28 @@
+import multiprocessing
+import time
+from collections import deque
+
+from cacheops import invalidate_model
 from django.apps import apps
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
 from utilities.fields import NaturalOrderingField
 
 
+def _naturalize_chunk(naturalize, max_length, rows):
+    """
+    Naturalize the values of a chunk of (pk, value, naturalized value) rows, returning a (pk, naturalized value) pair
+    for each row whose naturalized value has changed. May be executed within a worker process.
+    """
+    changed = []
+    for pk, value, current_value in rows:
+        naturalized_value = naturalize(value, max_length=max_length)
+        if naturalized_value != current_value:
+            changed.append((pk, naturalized_value))
+    return changed
+
+
 class Command(BaseCommand):
     help = "Recalculate natural ordering values for the specified models"
 
@@ -12,6 +31,14 @@ class Command(BaseCommand):
             'args', metavar='app_label.ModelName', nargs='*',
             help='One or more specific models (each prefixed with its app_label) to renaturalize',
         )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of objects to read and update at a time (default: 1000)"
+        )
+        parser.add_argument(
+            "--processes", type=int, default=1, dest='processes',
+            help="Number of worker processes to compute naturalized values with (default: 1)"
+        )
 
     def _get_models(self, names):
         """
@@ -62,18 +89,97 @@ class Command(BaseCommand):
 
         return models
 
+    def _read_chunks(self, model, field, batch_size):
+        """
+        Yield chunks of (pk, value, naturalized value) rows for all instances of the model, read using a server-side
+        cursor.
+        """
+        rows = model.objects.order_by('pk').values_list('pk', field.target_field, field.name).iterator(
+            chunk_size=batch_size
+        )
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _update_values(self, model, field, values):
+        """
+        Update the field of each object from a list of (pk, value) pairs using a single query, joining the table to
+        the list of values. (Unlike bulk_update(), this does not need to evaluate a CASE expression for every row.)
+        """
+        table = connection.ops.quote_name(model._meta.db_table)
+        column = connection.ops.quote_name(field.column)
+        pk_column = connection.ops.quote_name(model._meta.pk.column)
+        placeholders = ', '.join(['(%s, %s)'] * len(values))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {column} = v.value FROM (VALUES {placeholders}) AS v(pk, value) '
+                f'WHERE {table}.{pk_column} = v.pk',
+                [param for pair in values for param in pair]
+            )
+
+    def renaturalize_field(self, model, field, batch_size, verbosity, pool=None, processes=1):
+        """
+        Recalculate the naturalized values of a field for all instances of the model, and update those which have
+        changed in bulk. If a pool of worker processes is given, the values are computed by the workers. Returns the
+        numbers of objects processed and updated.
+        """
+        naturalize = field.naturalize_function
+        processed = updated = 0
+
+        def save_changes(changed):
+            nonlocal updated
+            if changed:
+                self._update_values(model, field, changed)
+                updated += len(changed)
+
+        # Keep a limited number of chunks in flight, so that the rows read from the cursor are not all held in memory
+        pending = deque()
+        for chunk in self._read_chunks(model, field, batch_size):
+            if pool is None:
+                save_changes(_naturalize_chunk(naturalize, field.max_length, chunk))
+            else:
+                pending.append(pool.apply_async(_naturalize_chunk, (naturalize, field.max_length, chunk)))
+                if len(pending) >= processes * 2:
+                    save_changes(pending.popleft().get())
+
+            processed += len(chunk)
+            if verbosity >= 2:
+                self.stdout.write(f"  {processed} {model._meta.verbose_name_plural} processed")
+
+        while pending:
+            save_changes(pending.popleft().get())
+
+        if updated:
+            invalidate_model(model)
+
+        return processed, updated
+
     def handle(self, *args, **options):
 
         models = self._get_models(args)
 
+        if options['processes'] < 1:
+            raise CommandError("The number of processes must be at least 1.")
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be at least 1.")
+
         if options['verbosity']:
             self.stdout.write("Renaturalizing {} models.".format(len(models)))
 
+        # Workers only compute naturalized values; all reads and writes happen here
+        pool = None
+        if options['processes'] > 1:
+            pool = multiprocessing.get_context('fork').Pool(options['processes'])
+
+        start_time = time.monotonic()
+        total_count = 0
         for model, fields in models:
             for field in fields:
-                target_field = field.target_field
-                naturalize = field.naturalize_function
-                count = 0
 
                 # Print the model and field name
                 if options['verbosity']:
@@ -83,29 +189,28 @@ class Command(BaseCommand):
                     )
                     self.stdout.flush()
 
-                # Find all unique values for the field
-                queryset = model.objects.values_list(target_field, flat=True).order_by(target_field).distinct()
-                for value in queryset:
-                    naturalized_value = naturalize(value, max_length=field.max_length)
-
-                    if options['verbosity'] >= 2:
-                        self.stdout.write("  {} -> {}".format(value, naturalized_value), ending='')
-                        self.stdout.flush()
-
-                    # Update each unique field value in bulk
-                    changed = model.objects.filter(name=value).update(**{field.name: naturalized_value})
+                field_start_time = time.monotonic()
+                processed, updated = self.renaturalize_field(
+                    model, field, options['batch_size'], options['verbosity'], pool, options['processes']
+                )
+                elapsed = time.monotonic() - field_start_time
+                total_count += processed
 
-                    if options['verbosity'] >= 2:
-                        self.stdout.write(" ({})".format(changed))
-                    count += changed
+                # Print the count of alterations for the field
+                if options['verbosity']:
+                    rate = processed / elapsed if elapsed else 0
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{updated} {model._meta.verbose_name_plural} updated ({processed} processed, "
+                        f"{rate:.0f}/second)"
+                    ))
 
-                # Print the total count of alterations for the field
-                if options['verbosity'] >= 2:
-                    self.stdout.write(self.style.SUCCESS("{} {} updated ({} unique values)".format(
-                        count, model._meta.verbose_name_plural, queryset.count()
-                    )))
-                elif options['verbosity']:
-                    self.stdout.write(self.style.SUCCESS(str(count)))
+        if pool is not None:
+            pool.close()
+            pool.join()
 
         if options['verbosity']:
-            self.stdout.write(self.style.SUCCESS("Done."))
+            elapsed = time.monotonic() - start_time
+            rate = total_count / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"Done. Processed {total_count} objects in {elapsed:.2f} seconds ({rate:.0f} objects/second)."
+            ))
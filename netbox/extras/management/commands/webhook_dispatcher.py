@@ -0,0 +1,64 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from extras.webhooks_dispatcher import WebhookDispatcher
+
+
+class Command(BaseCommand):
+    help = "Deliver queued webhooks concurrently, reusing connections to each endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help="Number of threads used to send requests (default: 8)"
+        )
+        parser.add_argument(
+            '--endpoint-concurrency', type=int, default=4,
+            help="Maximum number of jobs delivered concurrently to each endpoint (default: 4)"
+        )
+        parser.add_argument(
+            '--retries', type=int, default=3,
+            help="Number of times to retry a request which failed due to a transient error (default: 3)"
+        )
+        parser.add_argument(
+            '--backoff', type=float, default=1.0,
+            help="Seconds to wait before the first retry, doubled for each subsequent retry (default: 1)"
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=10.0,
+            help="Timeout for each request, in seconds (default: 10)"
+        )
+        parser.add_argument(
+            '--metrics-port', type=int,
+            help="Expose Prometheus metrics for webhook delivery on this port"
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help="Exit once the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        dispatcher = WebhookDispatcher(
+            workers=options['workers'],
+            endpoint_concurrency=options['endpoint_concurrency'],
+            retries=options['retries'],
+            backoff=options['backoff'],
+            timeout=options['timeout']
+        )
+
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
+
+        # Finish delivering any dequeued jobs before exiting
+        def stop(signum, frame):
+            self.stdout.write("Stopping...")
+            dispatcher.stop()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        dispatcher.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f"Finished: {dispatcher.stats}"))
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The pg_trgm extension allows substring searches of the index to use a GIN index. Installing it may require
+# privileges the NetBox database user lacks (prior to PostgreSQL 13), in which case the index is not created; searches
+# still work, by scanning the table.
+CREATE_TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'Unable to install the pg_trgm extension: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX "extras_searchentry_text_trgm" ON "extras_searchentry" USING gin ("text" gin_trgm_ops);
+    END IF;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('extras', '0053_rename_webhook_obj_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('object_id', models.PositiveIntegerField()),
+                ('primary_text', models.TextField()),
+                ('text', models.TextField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'search entries',
+                'ordering': ['content_type', 'object_id'],
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+        migrations.RunSQL(
+            sql=CREATE_TRIGRAM_INDEX,
+            reverse_sql='DROP INDEX IF EXISTS "extras_searchentry_text_trgm"',
+        ),
+    ]
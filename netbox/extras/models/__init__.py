@@ -4,6 +4,7 @@ from .models import (
     ConfigContext, ConfigContextModel, CustomLink, ExportTemplate, ImageAttachment, JobResult, Report, Script,
     Webhook,
 )
+from .search import SearchEntry
 from .tags import Tag, TaggedItem
 
 __all__ = (
@@ -19,6 +20,7 @@ __all__ = (
     'ObjectChange',
     'Report',
     'Script',
+    'SearchEntry',
     'Tag',
     'TaggedItem',
     'Webhook',
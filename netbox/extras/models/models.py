@@ -1,24 +1,26 @@
 import json
 import uuid
-from collections import OrderedDict
+from itertools import chain
 
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields import ArrayField
 from django.core.validators import ValidationError
 from django.db import models
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.utils.encoders import JSONEncoder
 
 from extras.choices import *
+from extras.configcontexts import render_config_contexts
 from extras.constants import *
 from extras.models import ChangeLoggedModel
 from extras.querysets import ConfigContextQuerySet
 from extras.utils import extras_features, FeatureQuery, image_upload
-from utilities.querysets import RestrictedQuerySet
-from utilities.utils import deepmerge, render_jinja2
+from utilities.querysets import RestrictedQuerySet, StreamingQuerySet
+from utilities.utils import render_jinja2, stream_jinja2
 
 
 #
@@ -263,15 +265,41 @@ class ExportTemplate(models.Model):
 
         return output
 
+    def render_stream(self, queryset):
+        """
+        Render the contents of the template, yielding the output in chunks. The template iterates over the queryset
+        using a server-side cursor, so that the objects need not all be held in memory at once.
+        """
+        context = {
+            'queryset': StreamingQuerySet(queryset)
+        }
+        carry = ''
+        for chunk in stream_jinja2(self.template_code, context):
+
+            # Replace CRLF-style line terminators, holding back a trailing CR which may precede a LF in the next chunk
+            chunk = (carry + chunk).replace('\r\n', '\n')
+            carry = '\r' if chunk.endswith('\r') else ''
+            if carry:
+                chunk = chunk[:-1]
+
+            if chunk:
+                yield chunk
+
+        if carry:
+            yield carry
+
     def render_to_response(self, queryset):
         """
-        Render the template to an HTTP response, delivered as a named file attachment
+        Render the template to a streaming HTTP response, delivered as a named file attachment
         """
-        output = self.render(queryset)
+        output = self.render_stream(queryset)
         mime_type = 'text/plain' if not self.mime_type else self.mime_type
 
+        # Render the first chunk before responding, so that errors in the template itself are raised to the caller
+        first_chunk = next(output, '')
+
         # Build the response
-        response = HttpResponse(output, content_type=mime_type)
+        response = StreamingHttpResponse(chain([first_chunk], output), content_type=mime_type)
         filename = 'netbox_{}{}'.format(
             queryset.model._meta.verbose_name_plural,
             '.{}'.format(self.file_extension) if self.file_extension else ''
@@ -433,9 +461,19 @@ class ConfigContext(ChangeLoggedModel):
     class Meta:
         ordering = ['weight', 'name']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Cache the original attributes which determine whether (and in what order) this ConfigContext applies to
+        # objects, so that their stored ConfigContext IDs are discarded only when these change
+        self._original_precedence = self.get_precedence()
+
     def __str__(self):
         return self.name
 
+    def get_precedence(self):
+        return self.__dict__.get('is_active'), self.__dict__.get('weight'), self.__dict__.get('name')
+
     def get_absolute_url(self):
         return reverse('extras:configcontext', kwargs={'pk': self.pk})
 
@@ -459,6 +497,14 @@ class ConfigContextModel(models.Model):
         null=True,
     )
 
+    # Cached IDs of the applicable ConfigContexts, in order of precedence (null if not yet computed)
+    _config_contexts = ArrayField(
+        base_field=models.PositiveIntegerField(),
+        blank=True,
+        null=True,
+        editable=False
+    )
+
     class Meta:
         abstract = True
 
@@ -466,25 +512,12 @@ class ConfigContextModel(models.Model):
         """
         Return the rendered configuration context for a device or VM.
         """
+        rendered = getattr(self, '_rendered_config_context', None)
+        if rendered is None:
+            # The object was not retrieved using annotate_config_context_data(), so render its context on demand
+            rendered = render_config_contexts([self], refresh=True)[0]
 
-        # Compile all config data, overwriting lower-weight values with higher-weight values where a collision occurs
-        data = OrderedDict()
-
-        if not hasattr(self, 'config_context_data'):
-            # The annotation is not available, so we fall back to manually querying for the config context objects
-            config_context_data = ConfigContext.objects.get_for_object(self, aggregate_data=True)
-        else:
-            # The attribute may exist, but the annotated value could be None if there is no config context data
-            config_context_data = self.config_context_data or []
-
-        for context in config_context_data:
-            data = deepmerge(data, context)
-
-        # If the object has local config context data defined, merge it last
-        if self.local_context_data:
-            data = deepmerge(data, self.local_context_data)
-
-        return data
+        return json.loads(rendered)
 
     def clean(self):
         super().clean()
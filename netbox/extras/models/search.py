@@ -0,0 +1,35 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+#
+# Search index
+#
+
+class SearchEntry(models.Model):
+    """
+    The searchable text of an object, used by the global search (see extras.search). Values are stored in lowercase,
+    one per line. Those of the object's identifying fields (e.g. name or serial number) are also stored separately, so
+    that matches on them can be ranked above matches on other fields.
+    """
+    content_type = models.ForeignKey(
+        to=ContentType,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    object_id = models.PositiveIntegerField()
+    object = GenericForeignKey(
+        ct_field='content_type',
+        fk_field='object_id'
+    )
+    primary_text = models.TextField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['content_type', 'object_id']
+        unique_together = ['content_type', 'object_id']
+        verbose_name_plural = 'search entries'
+
+    def __str__(self):
+        return f'{self.content_type}: {self.object_id}'
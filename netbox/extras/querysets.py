@@ -1,7 +1,8 @@
 from django.db.models import OuterRef, Subquery, Q
 
+from extras.configcontexts import render_config_contexts
 from extras.models.tags import TaggedItem
-from utilities.query_functions import EmptyGroupByJSONBAgg, OrderableJSONBAgg
+from utilities.query_functions import OrderableJSONBAgg
 from utilities.querysets import RestrictedQuerySet
 
 
@@ -57,28 +58,39 @@ class ConfigContextModelQuerySet(RestrictedQuerySet):
     """
     QuerySet manager used by models which support ConfigContext (device and virtual machine).
 
-    Includes a method which appends an annotation of aggregated config context JSON data objects. This is
-    implemented as a subquery which performs all the joins necessary to filter relevant config context objects.
-    This offers a substantial performance gain over ConfigContextQuerySet.get_for_object() when dealing with
-    multiple objects.
+    Includes a method which renders the config context of each object when the queryset is evaluated. The IDs of the
+    ConfigContexts applicable to each object are stored on the object; any which are missing are computed using a
+    subquery which performs all the joins necessary to filter relevant config context objects. This offers a
+    substantial performance gain over ConfigContextQuerySet.get_for_object() when dealing with multiple objects.
 
-    This allows the annotation to be entirely optional.
+    This allows the rendering to be entirely optional.
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._render_config_contexts = False
 
     def annotate_config_context_data(self):
         """
-        Attach the subquery annotation to the base queryset
+        Render the config context of each object once the queryset has been evaluated
         """
-        from extras.models import ConfigContext
-        return self.annotate(
-            config_context_data=Subquery(
-                ConfigContext.objects.filter(
-                    self._get_config_context_filters()
-                ).annotate(
-                    _data=EmptyGroupByJSONBAgg('data', ordering=['weight', 'name'])
-                ).values("_data")
-            )
-        ).distinct()
+        clone = self._chain()
+        clone._render_config_contexts = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._render_config_contexts = self._render_config_contexts
+        return clone
+
+    def _fetch_all(self):
+        super()._fetch_all()
+        if self._render_config_contexts:
+            objects = [
+                obj for obj in self._result_cache
+                if isinstance(obj, self.model) and not hasattr(obj, '_rendered_config_context')
+            ]
+            for obj, rendered in zip(objects, render_config_contexts(objects)):
+                obj._rendered_config_context = rendered
 
     def _get_config_context_filters(self):
         # Construct the set of Q objects for the specific object types
@@ -0,0 +1,286 @@
+from collections import OrderedDict, defaultdict
+
+import netaddr
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from utilities.querysets import ITERATOR_CHUNK_SIZE
+
+
+class SearchIndex:
+    """
+    The fields of a model included in the search index.
+
+    :param primary_fields: Fields identifying an object (e.g. name or serial number), matches on which rank highest
+    :param fields: Other searchable fields, which may span relationships (e.g. "manufacturer__name")
+    :param network_field: An IP network field; objects whose network contains or equals a searched network also match
+    """
+    def __init__(self, primary_fields, fields=(), network_field=None):
+        self.primary_fields = primary_fields
+        self.fields = fields
+        self.network_field = network_field
+
+
+# The models included in the search index, by label. These mirror the fields searched by each model's filter set.
+SEARCH_INDEXES = {
+    # Circuits
+    'circuits.provider': SearchIndex(
+        ('name', 'account'), ('noc_contact', 'admin_contact', 'comments')
+    ),
+    'circuits.circuit': SearchIndex(
+        ('cid',),
+        (
+            'terminations__xconnect_id', 'terminations__pp_info', 'terminations__description', 'description',
+            'comments',
+        )
+    ),
+    # DCIM
+    'dcim.site': SearchIndex(
+        ('name', 'facility', 'asn'),
+        (
+            'description', 'physical_address', 'shipping_address', 'contact_name', 'contact_phone', 'contact_email',
+            'comments',
+        )
+    ),
+    'dcim.rack': SearchIndex(
+        ('name', 'facility_id', 'serial', 'asset_tag'), ('comments',)
+    ),
+    'dcim.rackgroup': SearchIndex(
+        ('name', 'slug')
+    ),
+    'dcim.devicetype': SearchIndex(
+        ('model', 'part_number'), ('manufacturer__name', 'comments')
+    ),
+    'dcim.device': SearchIndex(
+        ('name', 'serial', 'asset_tag'), ('inventoryitems__serial', 'comments')
+    ),
+    'dcim.virtualchassis': SearchIndex(
+        ('name', 'domain'), ('members__name',)
+    ),
+    'dcim.cable': SearchIndex(
+        ('label',)
+    ),
+    'dcim.powerfeed': SearchIndex(
+        ('name',), ('comments',)
+    ),
+    # Virtualization
+    'virtualization.cluster': SearchIndex(
+        ('name',), ('comments',)
+    ),
+    'virtualization.virtualmachine': SearchIndex(
+        ('name',), ('comments',)
+    ),
+    # IPAM
+    'ipam.vrf': SearchIndex(
+        ('name', 'rd'), ('description',)
+    ),
+    'ipam.aggregate': SearchIndex(
+        ('prefix',), ('description',), network_field='prefix'
+    ),
+    'ipam.prefix': SearchIndex(
+        ('prefix',), ('description',), network_field='prefix'
+    ),
+    'ipam.ipaddress': SearchIndex(
+        ('address', 'dns_name'), ('description',)
+    ),
+    'ipam.vlan': SearchIndex(
+        ('name', 'vid'), ('description',)
+    ),
+    # Secrets
+    'secrets.secret': SearchIndex(
+        ('name',), ('device__name',)
+    ),
+    # Tenancy
+    'tenancy.tenant': SearchIndex(
+        ('name', 'slug'), ('description', 'comments')
+    ),
+}
+
+# Models whose changes alter the indexed text of other objects. Each is mapped to the indexed models affected, along
+# with the lookup relating them.
+SEARCH_INDEX_DEPENDENCIES = {
+    'circuits.circuittermination': (('circuits.circuit', 'terminations'),),
+    'dcim.manufacturer': (('dcim.devicetype', 'manufacturer'),),
+    'dcim.inventoryitem': (('dcim.device', 'inventoryitems'),),
+    'dcim.device': (('dcim.virtualchassis', 'members'), ('secrets.secret', 'device')),
+}
+
+
+def get_search_index(model):
+    return SEARCH_INDEXES.get(model._meta.label_lower)
+
+
+def get_dependent_objects(instance):
+    """
+    Return the model and PKs of each set of indexed objects whose text includes a field of the given instance.
+    """
+    dependents = []
+    for label, lookup in SEARCH_INDEX_DEPENDENCIES.get(instance._meta.label_lower, ()):
+        model = apps.get_model(label)
+        pks = list(model.objects.filter(**{lookup: instance.pk}).values_list('pk', flat=True))
+        if pks:
+            dependents.append((model, pks))
+    return dependents
+
+
+def _format_value(value):
+    if value is None or value == '':
+        return None
+    return str(value).lower()
+
+
+def update_search_index(model, pks):
+    """
+    Create or update the search index entries of the given objects of a model. Objects which no longer exist (or have
+    no indexed values) are removed from the index.
+    """
+    from extras.models import SearchEntry
+
+    index = get_search_index(model)
+    content_type = ContentType.objects.get_for_model(model)
+    fields = (*index.primary_fields, *index.fields)
+
+    # Collect the values of each object (related fields may yield several rows per object)
+    primary_values = defaultdict(dict)
+    values = defaultdict(dict)
+    for pk, *row in model.objects.filter(pk__in=pks).order_by().values_list('pk', *fields):
+        for i, value in enumerate(row):
+            value = _format_value(value)
+            if value is not None:
+                if i < len(index.primary_fields):
+                    primary_values[pk][value] = None
+                values[pk][value] = None
+
+    # Upsert the entries rather than replacing them, so that concurrent updates to the same objects cannot conflict.
+    # Rows are written in order of object ID to avoid deadlocks between concurrent updates.
+    entries = [
+        (
+            content_type.pk,
+            pk,
+            # Lines are delimited on both ends so that whole values can be matched
+            '\n{}\n'.format('\n'.join(primary_values[pk])),
+            '\n'.join(values[pk])
+        ) for pk in sorted(values)
+    ]
+    with transaction.atomic():
+        SearchEntry.objects.filter(content_type=content_type, object_id__in=pks).exclude(
+            object_id__in=list(values)
+        ).delete()
+        if entries:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {connection.ops.quote_name(SearchEntry._meta.db_table)} '
+                    f'(content_type_id, object_id, primary_text, text) '
+                    f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(entries))} '
+                    f'ON CONFLICT (content_type_id, object_id) '
+                    f'DO UPDATE SET primary_text = EXCLUDED.primary_text, text = EXCLUDED.text',
+                    [value for entry in entries for value in entry]
+                )
+
+
+def rebuild_search_index(model, missing_only=False, batch_size=ITERATOR_CHUNK_SIZE):
+    """
+    Index all objects of a model, returning the number indexed. If missing_only is True, only objects absent from the
+    index are indexed; otherwise, entries of objects which no longer exist are also removed.
+    """
+    from extras.models import SearchEntry
+
+    content_type = ContentType.objects.get_for_model(model)
+    entries = SearchEntry.objects.filter(content_type=content_type)
+    pks = model.objects.order_by('pk')
+    if missing_only:
+        pks = pks.exclude(pk__in=entries.values('object_id'))
+    else:
+        entries.exclude(object_id__in=model.objects.order_by().values('pk')).delete()
+    pks = list(pks.values_list('pk', flat=True))
+
+    for i in range(0, len(pks), batch_size):
+        update_search_index(model, pks[i:i + batch_size])
+
+    return len(pks)
+
+
+def search(user, query, models, limit):
+    """
+    Search the index for objects of the given models which the user is permitted to view, using a single query.
+    Return an OrderedDict mapping each model with any matching objects to the number of matches and the PKs of up to
+    `limit` of them, best matches first.
+
+    Like the filter sets, objects match when any of their indexed values contains the query (case-insensitively).
+    Matches are ranked by whether the query equals, begins or is contained within one of an object's primary values.
+    """
+    from extras.models import SearchEntry
+
+    query = query.strip().lower()
+    try:
+        network = netaddr.IPNetwork(query)
+    except (netaddr.AddrFormatError, ValueError):
+        network = None
+
+    conditions = Q()
+    content_types = ContentType.objects.get_for_models(*models)
+    for model in models:
+        permitted = model.objects.restrict(user, 'view')
+        if permitted.query.is_empty():
+            continue
+
+        model_conditions = Q(text__contains=query)
+        index = get_search_index(model)
+        if network is not None and index.network_field:
+            # Match objects whose network contains or equals the query
+            model_conditions |= Q(object_id__in=model.objects.filter(**{
+                f'{index.network_field}__net_contains_or_equals': str(network)
+            }).order_by().values('pk'))
+        model_conditions &= Q(content_type=content_types[model])
+        if permitted.query.where:
+            model_conditions &= Q(object_id__in=permitted.order_by().values('pk'))
+        conditions |= model_conditions
+
+    if not conditions:
+        return OrderedDict()
+
+    rank = Case(
+        When(primary_text__contains=f'\n{query}\n', then=Value(3)),
+        When(primary_text__contains=f'\n{query}', then=Value(2)),
+        When(primary_text__contains=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    entries = SearchEntry.objects.filter(conditions).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('content_type')],
+            order_by=[rank.desc(), F('object_id').asc()]
+        ),
+        count=Window(
+            expression=Count('*'),
+            partition_by=[F('content_type')]
+        )
+    ).order_by().values_list('content_type_id', 'object_id', 'count', 'row_number')
+
+    # Window functions cannot be filtered by the ORM, so the top results of each model are selected by wrapping the
+    # query
+    sql, params = entries.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT entries.content_type_id, entries.object_id, entries.count, entries.row_number '
+            f'FROM ({sql}) AS entries WHERE entries.row_number <= %s ORDER BY entries.row_number',
+            (*params, limit)
+        )
+        rows = cursor.fetchall()
+
+    matches = defaultdict(lambda: [0, []])
+    for content_type_id, object_id, count, row_number in rows:
+        matches[content_type_id][0] = count
+        matches[content_type_id][1].append(object_id)
+
+    results = OrderedDict()
+    for model in models:
+        content_type = content_types[model]
+        if content_type.pk in matches:
+            results[model] = tuple(matches[content_type.pk])
+
+    return results
@@ -1,27 +1,40 @@
 import random
+from collections import defaultdict
 from datetime import timedelta
 
 from cacheops.signals import cache_invalidated, cache_read
+from django.apps import apps
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import m2m_changed, pre_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.utils import timezone
 from django_prometheus.models import model_deletes, model_inserts, model_updates
 from prometheus_client import Counter
 
+from dcim.models import Device, DeviceRole, Platform, Region, Site
+from tenancy.models import Tenant, TenantGroup
+from virtualization.models import Cluster, ClusterGroup, VirtualMachine
 from .choices import ObjectChangeActionChoices
-from .models import CustomField, ObjectChange
-from .webhooks import enqueue_webhooks
+from .configcontexts import clear_config_contexts, get_config_context_objects
+from .models import ConfigContext, CustomField, ObjectChange, SearchEntry, Tag, TaggedItem, Webhook
+from .search import (
+    SEARCH_INDEX_DEPENDENCIES, SEARCH_INDEXES, get_dependent_objects, get_search_index, update_search_index,
+)
+from .webhooks import handle_webhook_changed
 
 
 #
 # Change logging/webhooks
 #
 
-def _handle_changed_object(request, sender, instance, **kwargs):
+def _handle_changed_object(request, changelog, webhook_queue, sender, instance, **kwargs):
     """
     Fires when an object is created or updated.
     """
+    # Discard any prefetched tags when the object's tags are changed, as taggit does not do so itself
+    if sender is TaggedItem and kwargs.get('action'):
+        getattr(instance, '_prefetched_objects_cache', {}).pop('tags', None)
+
     # Queue the object for processing once the request completes
     if kwargs.get('created'):
         action = ObjectChangeActionChoices.ACTION_CREATE
@@ -35,13 +48,10 @@ def _handle_changed_object(request, sender, instance, **kwargs):
 
     # Record an ObjectChange if applicable
     if hasattr(instance, 'to_objectchange'):
-        objectchange = instance.to_objectchange(action)
-        objectchange.user = request.user
-        objectchange.request_id = request.id
-        objectchange.save()
+        changelog.record(instance, action)
 
     # Enqueue webhooks
-    enqueue_webhooks(instance, request.user, request.id, action)
+    webhook_queue.record(instance, action)
 
     # Increment metric counters
     if action == ObjectChangeActionChoices.ACTION_CREATE:
@@ -55,24 +65,30 @@ def _handle_changed_object(request, sender, instance, **kwargs):
         ObjectChange.objects.filter(time__lt=cutoff).delete()
 
 
-def _handle_deleted_object(request, sender, instance, **kwargs):
+def _handle_deleted_object(request, changelog, webhook_queue, sender, instance, **kwargs):
     """
     Fires when an object is deleted.
     """
     # Record an ObjectChange if applicable
     if hasattr(instance, 'to_objectchange'):
-        objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
-        objectchange.user = request.user
-        objectchange.request_id = request.id
-        objectchange.save()
+        changelog.record(instance, ObjectChangeActionChoices.ACTION_DELETE)
 
     # Enqueue webhooks
-    enqueue_webhooks(instance, request.user, request.id, ObjectChangeActionChoices.ACTION_DELETE)
+    webhook_queue.record(instance, ObjectChangeActionChoices.ACTION_DELETE)
 
     # Increment metric counters
     model_deletes.labels(instance._meta.model_name).inc()
 
 
+#
+# Webhooks
+#
+
+post_save.connect(handle_webhook_changed, sender=Webhook)
+post_delete.connect(handle_webhook_changed, sender=Webhook)
+m2m_changed.connect(handle_webhook_changed, sender=Webhook.content_types.through)
+
+
 #
 # Custom fields
 #
@@ -96,6 +112,118 @@ m2m_changed.connect(handle_cf_removed_obj_types, sender=CustomField.content_type
 pre_delete.connect(handle_cf_deleted, sender=CustomField)
 
 
+#
+# Config contexts
+#
+
+def clear_all_config_contexts(action=None, **kwargs):
+    """
+    Discard the stored ConfigContext IDs of all devices and virtual machines.
+    """
+    # Ignore m2m_changed signals sent before the relationship has changed
+    if action and not action.startswith('post_'):
+        return
+    clear_config_contexts(Device.objects.all())
+    clear_config_contexts(VirtualMachine.objects.all())
+
+
+def clear_context_objects(context):
+    """
+    Discard the stored ConfigContext IDs of the devices and virtual machines to which a ConfigContext may apply.
+    """
+    for model in (Device, VirtualMachine):
+        clear_config_contexts(get_config_context_objects(context, model))
+
+
+def handle_config_context_saved(instance, created, **kwargs):
+    """
+    Discard the stored ConfigContext IDs of the objects to which a ConfigContext may apply when it is created, or when
+    it is activated, deactivated, or reordered. (Changes to its data need not be handled, as rendered contexts are
+    cached by the last updated time of each ConfigContext.)
+    """
+    if created or instance.get_precedence() != instance._original_precedence:
+        clear_context_objects(instance)
+    instance._original_precedence = instance.get_precedence()
+
+
+def handle_config_context_deleted(instance, **kwargs):
+    clear_config_contexts(Device.objects.filter(_config_contexts__contains=[instance.pk]))
+    clear_config_contexts(VirtualMachine.objects.filter(_config_contexts__contains=[instance.pk]))
+
+
+def handle_config_context_assigned(instance, action, **kwargs):
+    """
+    Discard the stored ConfigContext IDs of the objects to which a ConfigContext may apply (both before and after the
+    change) when its assignments are changed.
+    """
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        clear_context_objects(instance)
+
+
+def handle_config_context_object_saved(instance, **kwargs):
+    """
+    The applicable ConfigContexts must be computed again whenever a device or virtual machine is saved.
+    """
+    instance._config_contexts = None
+    instance.__dict__.pop('_rendered_config_context', None)
+
+
+def handle_config_context_object_tagged(instance, action, **kwargs):
+    """
+    Discard the stored ConfigContext IDs of a device or virtual machine when its tags are changed.
+    """
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if isinstance(instance, (Device, VirtualMachine)):
+        clear_config_contexts(type(instance).objects.filter(pk=instance.pk))
+        instance._config_contexts = None
+        instance.__dict__.pop('_rendered_config_context', None)
+    elif isinstance(instance, Tag):
+        clear_all_config_contexts()
+
+
+def handle_site_saved(instance, created, **kwargs):
+    if not created:
+        clear_config_contexts(Device.objects.filter(site=instance))
+        clear_config_contexts(VirtualMachine.objects.filter(cluster__site=instance))
+
+
+def handle_region_saved(instance, created, **kwargs):
+    # Moving a region may change the ancestors of any number of regions
+    if not created:
+        clear_all_config_contexts()
+
+
+def handle_tenant_saved(instance, created, **kwargs):
+    if not created:
+        clear_config_contexts(Device.objects.filter(tenant=instance))
+        clear_config_contexts(VirtualMachine.objects.filter(tenant=instance))
+
+
+def handle_cluster_saved(instance, created, **kwargs):
+    if not created:
+        clear_config_contexts(VirtualMachine.objects.filter(cluster=instance))
+
+
+post_save.connect(handle_config_context_saved, sender=ConfigContext)
+post_delete.connect(handle_config_context_deleted, sender=ConfigContext)
+for m2m_field in ConfigContext._meta.many_to_many:
+    m2m_changed.connect(handle_config_context_assigned, sender=m2m_field.remote_field.through)
+
+pre_save.connect(handle_config_context_object_saved, sender=Device)
+pre_save.connect(handle_config_context_object_saved, sender=VirtualMachine)
+m2m_changed.connect(handle_config_context_object_tagged, sender=TaggedItem)
+
+post_save.connect(handle_site_saved, sender=Site)
+post_save.connect(handle_region_saved, sender=Region)
+post_save.connect(handle_tenant_saved, sender=Tenant)
+post_save.connect(handle_cluster_saved, sender=Cluster)
+
+# Related objects are removed from devices and virtual machines without saving them
+for related_model in (Region, Site, DeviceRole, Platform, ClusterGroup, Cluster, TenantGroup, Tenant, Tag):
+    post_delete.connect(clear_all_config_contexts, sender=related_model)
+
+
 #
 # Caching
 #
@@ -118,3 +246,56 @@ def cache_invalidated_collector(sender, obj_dict, **kwargs):
 
 cache_read.connect(cache_read_collector)
 cache_invalidated.connect(cache_invalidated_collector)
+
+
+#
+# Search index
+#
+
+def update_search_entries(sender, instance, **kwargs):
+    """
+    Update the search index entry of a saved object, along with those of any indexed objects which include its fields.
+    """
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    if get_search_index(sender):
+        update_search_index(sender, [instance.pk])
+
+    # Update the objects which included the object's fields before it was saved (e.g. the virtual chassis a device
+    # has left), as well as those which include them now
+    dependents = defaultdict(set)
+    for model, pks in (*getattr(instance, '_search_index_dependents', ()), *get_dependent_objects(instance)):
+        dependents[model].update(pks)
+    for model, pks in dependents.items():
+        update_search_index(model, sorted(pks))
+
+
+def find_dependent_search_entries(sender, instance, **kwargs):
+    """
+    Determine the indexed objects which include the fields of an existing object before it is saved or deleted.
+    """
+    if settings.SEARCH_INDEX_ENABLED and instance.pk is not None and not instance._state.adding:
+        instance._search_index_dependents = get_dependent_objects(instance)
+
+
+def remove_search_entries(sender, instance, **kwargs):
+    """
+    Remove the search index entry of a deleted object, and update those of any indexed objects which included its
+    fields.
+    """
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    if get_search_index(sender):
+        SearchEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(sender),
+            object_id=instance.pk
+        ).delete()
+    for model, pks in getattr(instance, '_search_index_dependents', ()):
+        update_search_index(model, pks)
+
+
+for search_model in map(apps.get_model, {*SEARCH_INDEXES, *SEARCH_INDEX_DEPENDENCIES}):
+    pre_save.connect(find_dependent_search_entries, sender=search_model)
+    post_save.connect(update_search_entries, sender=search_model)
+    pre_delete.connect(find_dependent_search_entries, sender=search_model)
+    post_delete.connect(remove_search_entries, sender=search_model)
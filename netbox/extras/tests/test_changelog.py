@@ -1,13 +1,20 @@
+import uuid
+
+from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 
 from dcim.choices import SiteStatusChoices
 from dcim.models import Site
 from extras.choices import *
+from extras.context_managers import change_logging
 from extras.models import CustomField, ObjectChange, Tag
 from utilities.testing import APITestCase
 from utilities.testing.utils import post_data
+from utilities.utils import NetBoxFakeRequest
 from utilities.testing.views import ModelViewTestCase
 
 
@@ -57,17 +64,16 @@ class ChangeLogViewTest(ModelViewTestCase):
         self.assertHttpStatus(response, 302)
 
         site = Site.objects.get(name='Test Site 1')
-        # First OC is the creation; second is the tags update
-        oc_list = ObjectChange.objects.filter(
+        # The creation and the subsequent tags update are recorded as a single OC
+        oc = ObjectChange.objects.get(
             changed_object_type=ContentType.objects.get_for_model(Site),
             changed_object_id=site.pk
-        ).order_by('pk')
-        self.assertEqual(oc_list[0].changed_object, site)
-        self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
-        self.assertEqual(oc_list[0].object_data['custom_fields']['my_field'], form_data['cf_my_field'])
-        self.assertEqual(oc_list[0].object_data['custom_fields']['my_field_select'], form_data['cf_my_field_select'])
-        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
-        self.assertEqual(oc_list[1].object_data['tags'], ['Tag 1', 'Tag 2'])
+        )
+        self.assertEqual(oc.changed_object, site)
+        self.assertEqual(oc.action, ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(oc.object_data['custom_fields']['my_field'], form_data['cf_my_field'])
+        self.assertEqual(oc.object_data['custom_fields']['my_field_select'], form_data['cf_my_field_select'])
+        self.assertEqual(oc.object_data['tags'], ['Tag 1', 'Tag 2'])
 
     def test_update_object(self):
         site = Site(name='Test Site 1', slug='test-site-1')
@@ -188,16 +194,15 @@ class ChangeLogAPITest(APITestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
 
         site = Site.objects.get(pk=response.data['id'])
-        # First OC is the creation; second is the tags update
-        oc_list = ObjectChange.objects.filter(
+        # The creation and the subsequent tags update are recorded as a single OC
+        oc = ObjectChange.objects.get(
             changed_object_type=ContentType.objects.get_for_model(Site),
             changed_object_id=site.pk
-        ).order_by('pk')
-        self.assertEqual(oc_list[0].changed_object, site)
-        self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
-        self.assertEqual(oc_list[0].object_data['custom_fields'], data['custom_fields'])
-        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
-        self.assertEqual(oc_list[1].object_data['tags'], ['Tag 1', 'Tag 2'])
+        )
+        self.assertEqual(oc.changed_object, site)
+        self.assertEqual(oc.action, ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(oc.object_data['custom_fields'], data['custom_fields'])
+        self.assertEqual(oc.object_data['tags'], ['Tag 1', 'Tag 2'])
 
     def test_update_object(self):
         site = Site(name='Test Site 1', slug='test-site-1')
@@ -258,3 +263,96 @@ class ChangeLogAPITest(APITestCase):
         self.assertEqual(oc.object_data['custom_fields']['my_field'], 'ABC')
         self.assertEqual(oc.object_data['custom_fields']['my_field_select'], 'Bar')
         self.assertEqual(oc.object_data['tags'], ['Tag 1', 'Tag 2'])
+
+
+class ChangeLoggingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser')
+
+    def setUp(self):
+        self.request = NetBoxFakeRequest({
+            'id': uuid.uuid4(),
+            'user': self.user,
+        })
+
+    def test_coalesce_changes(self):
+        tags = (
+            Tag(name='Tag 1', slug='tag-1'),
+            Tag(name='Tag 2', slug='tag-2'),
+        )
+        Tag.objects.bulk_create(tags)
+
+        with change_logging(self.request):
+            with transaction.atomic():
+                site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+                site.tags.set(*tags)
+                site.description = 'Foo'
+                site.save()
+            # No ObjectChanges are written until change logging has completed
+            self.assertEqual(ObjectChange.objects.count(), 0)
+
+        oc = ObjectChange.objects.get()
+        self.assertEqual(oc.changed_object, site)
+        self.assertEqual(oc.action, ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(oc.user, self.user)
+        self.assertEqual(oc.user_name, self.user.username)
+        self.assertEqual(oc.request_id, self.request.id)
+        self.assertEqual(oc.object_data['description'], 'Foo')
+        self.assertEqual(oc.object_data['tags'], ['Tag 1', 'Tag 2'])
+
+    def test_separate_transactions(self):
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+
+        with change_logging(self.request):
+            with transaction.atomic():
+                site.description = 'Foo'
+                site.save()
+            with transaction.atomic():
+                site.description = 'Bar'
+                site.save()
+            site.delete()
+
+        oc_list = ObjectChange.objects.order_by('pk')
+        self.assertEqual(len(oc_list), 3)
+        self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_UPDATE)
+        self.assertEqual(oc_list[0].object_data['description'], 'Foo')
+        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
+        self.assertEqual(oc_list[1].object_data['description'], 'Bar')
+        self.assertEqual(oc_list[2].action, ObjectChangeActionChoices.ACTION_DELETE)
+        self.assertEqual(oc_list[2].object_data['description'], 'Bar')
+
+    def test_discard_rolled_back_changes(self):
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+
+        with change_logging(self.request):
+            with transaction.atomic():
+                site.description = 'Foo'
+                site.save()
+            try:
+                with transaction.atomic():
+                    Site.objects.create(name='Test Site 2', slug='test-site-2')
+                    site.description = 'Bar'
+                    site.save()
+                    raise ValueError()
+            except ValueError:
+                pass
+
+        oc = ObjectChange.objects.get()
+        self.assertEqual(oc.changed_object, site)
+        self.assertEqual(oc.object_data['description'], 'Foo')
+
+    def test_exception_after_commit(self):
+
+        with self.assertRaises(ValueError):
+            with change_logging(self.request):
+                with transaction.atomic():
+                    site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+                with transaction.atomic():
+                    Site.objects.create(name='Test Site 2', slug='test-site-2')
+                    raise ValueError()
+
+        oc = ObjectChange.objects.get()
+        self.assertEqual(oc.changed_object, site)
+        self.assertEqual(oc.action, ObjectChangeActionChoices.ACTION_CREATE)
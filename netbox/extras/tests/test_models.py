@@ -1,6 +1,10 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 
 from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Platform, Site, Region
+from extras.configcontexts import rendered_contexts
 from extras.models import ConfigContext, Tag
 from tenancy.models import Tenant, TenantGroup
 from virtualization.models import Cluster, ClusterGroup, ClusterType, VirtualMachine
@@ -364,3 +368,170 @@ class ConfigContextTest(TestCase):
         annotated_queryset = Device.objects.filter(name=device.name).annotate_config_context_data()
         self.assertEqual(ConfigContext.objects.get_for_object(device).count(), 2)
         self.assertEqual(device.get_config_context(), annotated_queryset[0].get_config_context())
+
+
+class ConfigContextCacheTest(TestCase):
+    """
+    These test cases deal with the stored mapping of devices and virtual machines to their applicable ConfigContexts,
+    and the caching of rendered config contexts.
+    """
+    def setUp(self):
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        self.devicetype = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        self.devicerole = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        self.regions = (
+            Region.objects.create(name='Region 1', slug='region-1'),
+            Region.objects.create(name='Region 2', slug='region-2'),
+        )
+        self.sites = (
+            Site.objects.create(name='Site 1', slug='site-1', region=self.regions[0]),
+            Site.objects.create(name='Site 2', slug='site-2', region=self.regions[1]),
+        )
+        self.tag = Tag.objects.create(name='Tag 1', slug='tag-1')
+        cluster_type = ClusterType.objects.create(name='Cluster Type 1', slug='cluster-type-1')
+        self.cluster = Cluster.objects.create(name='Cluster 1', type=cluster_type, site=self.sites[0])
+
+        for i in range(1, 6):
+            Device.objects.create(
+                name=f'Device {i}', device_type=self.devicetype, device_role=self.devicerole, site=self.sites[0]
+            )
+
+        self.region_context = ConfigContext.objects.create(name='Region 1', weight=100, data={'a': 1, 'b': 1})
+        self.region_context.regions.add(self.regions[0])
+        self.tag_context = ConfigContext.objects.create(name='Tag 1', weight=200, data={'b': 2})
+        self.tag_context.tags.add(self.tag)
+        rendered_contexts.clear()
+
+    def get_device(self, name):
+        return Device.objects.annotate_config_context_data().get(name=name)
+
+    def test_stored_context_ids(self):
+        device = Device.objects.get(name='Device 1')
+        device.tags.add(self.tag)
+        self.assertIsNone(Device.objects.get(pk=device.pk)._config_contexts)
+
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 2})
+        self.assertEqual(
+            Device.objects.get(pk=device.pk)._config_contexts,
+            list(ConfigContext.objects.get_for_object(device).values_list('pk', flat=True))
+        )
+
+    @override_settings(CACHEOPS_ENABLED=False)
+    def test_shared_rendering(self):
+        device = Device.objects.get(name='Device 5')
+        device.local_context_data = {'c': 3}
+        device.save()
+        list(Device.objects.all().annotate_config_context_data())
+
+        # Devices, stored context IDs and rendered contexts are retrieved using a fixed number of queries
+        rendered_contexts.clear()
+        with self.assertNumQueries(3):
+            devices = list(Device.objects.all().annotate_config_context_data())
+        self.assertEqual(len(rendered_contexts), 2)
+        self.assertEqual(
+            [device.get_config_context() for device in devices],
+            [{'a': 1, 'b': 1}] * 4 + [{'a': 1, 'b': 1, 'c': 3}]
+        )
+
+        # Cached contexts are reused
+        with self.assertNumQueries(2):
+            list(Device.objects.all().annotate_config_context_data())
+
+    def test_context_changed(self):
+        self.region_context.data = {'a': 2}
+        self.region_context.save()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 2})
+
+        self.region_context.regions.set([self.regions[1]])
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {})
+
+        # A ConfigContext with no tags assigned applies to all devices
+        self.tag_context.tags.clear()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'b': 2})
+
+        self.tag_context.delete()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {})
+
+    def test_context_data_changed(self):
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 1})
+
+        # The stored ConfigContext IDs are retained when only the data of a ConfigContext changes
+        self.region_context.data = {'a': 2}
+        self.region_context.save()
+        self.assertEqual(Device.objects.get(name='Device 1')._config_contexts, [self.region_context.pk])
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 2})
+
+    def test_context_precedence_changed(self):
+        device = Device.objects.create(
+            name='Device 6', device_type=self.devicetype, device_role=self.devicerole, site=self.sites[1]
+        )
+        list(Device.objects.annotate_config_context_data())
+
+        # Only the stored ConfigContext IDs of the objects to which a ConfigContext may apply are discarded
+        self.region_context.weight = 300
+        self.region_context.save()
+        self.assertIsNone(Device.objects.get(name='Device 1')._config_contexts)
+        self.assertEqual(Device.objects.get(pk=device.pk)._config_contexts, [])
+
+        self.region_context.is_active = False
+        self.region_context.save()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {})
+
+        self.region_context.is_active = True
+        self.region_context.save()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 1})
+        self.assertEqual(Device.objects.get(pk=device.pk)._config_contexts, [])
+
+    def test_device_changed(self):
+        device = self.get_device('Device 1')
+        self.assertEqual(device.get_config_context(), {'a': 1, 'b': 1})
+
+        device.site = self.sites[1]
+        device.save()
+        self.assertEqual(device.get_config_context(), {})
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {})
+
+        device.tags.add(self.tag)
+        self.assertEqual(device.get_config_context(), {'b': 2})
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'b': 2})
+
+    def test_related_objects_changed(self):
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 1})
+
+        site = Site.objects.get(pk=self.sites[0].pk)
+        site.region = self.regions[1]
+        site.save()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {})
+
+        # Moving a region may change the applicable ConfigContexts of devices in its child regions
+        region = Region.objects.get(pk=self.regions[1].pk)
+        region.parent = self.regions[0]
+        region.save()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 1})
+
+        # Deleting a tag removes it from the tagged devices without saving them
+        self.tag_context.tags.add(Tag.objects.create(name='Tag 2', slug='tag-2'))
+        device = Device.objects.get(name='Device 1')
+        device.tags.add(self.tag)
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 2})
+        self.tag.delete()
+        self.assertEqual(self.get_device('Device 1').get_config_context(), {'a': 1, 'b': 1})
+
+    def test_virtualmachine(self):
+        virtual_machine = VirtualMachine.objects.create(name='VM 1', cluster=self.cluster)
+        virtual_machine = VirtualMachine.objects.annotate_config_context_data().get(pk=virtual_machine.pk)
+        self.assertEqual(virtual_machine.get_config_context(), {'a': 1, 'b': 1})
+
+        cluster = Cluster.objects.get(pk=self.cluster.pk)
+        cluster.site = self.sites[1]
+        cluster.save()
+        virtual_machine = VirtualMachine.objects.annotate_config_context_data().get(pk=virtual_machine.pk)
+        self.assertEqual(virtual_machine.get_config_context(), {})
+
+    def test_rebuild_config_contexts(self):
+        Device.objects.update(_config_contexts=[self.tag_context.pk])
+        call_command('rebuild_config_contexts', stdout=StringIO())
+        self.assertEqual(
+            list(Device.objects.nocache().values_list('_config_contexts', flat=True)),
+            [[self.region_context.pk]] * 5
+        )
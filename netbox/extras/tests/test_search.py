@@ -0,0 +1,140 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from dcim.models import Device, DeviceRole, DeviceType, InventoryItem, Manufacturer, Site, VirtualChassis
+from extras.models import SearchEntry
+from extras.search import search
+from ipam.models import Prefix
+from users.models import ObjectPermission
+
+
+@override_settings(SEARCH_INDEX_ENABLED=True, EXEMPT_VIEW_PERMISSIONS=[])
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', is_superuser=True)
+
+        self.sites = (
+            Site.objects.create(name='Site 1', slug='site-1', facility='Building 1'),
+            Site.objects.create(name='Site 2', slug='site-2', description='Next to site 1'),
+            Site.objects.create(name='Other Site 1', slug='other-site-1'),
+        )
+        self.manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        self.devicetype = DeviceType.objects.create(manufacturer=self.manufacturer, model='Device Type 1')
+        devicerole = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        self.device = Device.objects.create(
+            name='Device 1', device_type=self.devicetype, device_role=devicerole, site=self.sites[0]
+        )
+
+    def get_entry(self, obj):
+        return SearchEntry.objects.get(content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk)
+
+    def test_index_object(self):
+        entry = self.get_entry(self.sites[0])
+        self.assertEqual(entry.primary_text, '\nsite 1\nbuilding 1\n')
+        self.assertEqual(entry.text, 'site 1\nbuilding 1')
+
+        # Entries are updated in place
+        self.sites[0].facility = 'Building 2'
+        self.sites[0].save()
+        updated_entry = self.get_entry(self.sites[0])
+        self.assertEqual(updated_entry.pk, entry.pk)
+        self.assertEqual(updated_entry.text, 'site 1\nbuilding 2')
+
+    def test_remove_object(self):
+        site = self.sites[2]
+        site.delete()
+
+        self.assertFalse(
+            SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(Site), object_id=site.pk)
+        )
+
+    def test_related_objects(self):
+        # Changes to related objects are reflected in the entries of the objects which include their fields
+        self.manufacturer.name = 'Vendor 1'
+        self.manufacturer.save()
+        self.assertIn('vendor 1', self.get_entry(self.devicetype).text)
+
+        item = InventoryItem.objects.create(device=self.device, name='Item 1', serial='ABC123')
+        self.assertIn('abc123', self.get_entry(self.device).text)
+        item.delete()
+        self.assertNotIn('abc123', self.get_entry(self.device).text)
+
+    def test_related_object_moved(self):
+        # Moving a related object updates the entries of both its old and new parents
+        device2 = Device.objects.create(
+            name='Device 2', device_type=self.devicetype, device_role=self.device.device_role, site=self.sites[0]
+        )
+        item = InventoryItem.objects.create(device=self.device, name='Item 1', serial='ABC123')
+        item.device = device2
+        item.save()
+        self.assertNotIn('abc123', self.get_entry(self.device).text)
+        self.assertIn('abc123', self.get_entry(device2).text)
+
+        virtual_chassis = VirtualChassis.objects.create(name='Virtual Chassis 1')
+        self.device.virtual_chassis = virtual_chassis
+        self.device.vc_position = 1
+        self.device.save()
+        self.assertIn('device 1', self.get_entry(virtual_chassis).text)
+        self.device.virtual_chassis = None
+        self.device.vc_position = None
+        self.device.save()
+        self.assertNotIn('device 1', self.get_entry(virtual_chassis).text)
+
+    @override_settings(SEARCH_INDEX_ENABLED=False)
+    def test_index_disabled(self):
+        site = Site.objects.create(name='Site 4', slug='site-4')
+        self.assertFalse(
+            SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(Site), object_id=site.pk)
+        )
+
+    def test_search(self):
+        results = search(self.user, ' SITE 1 ', [Site, Device], limit=10)
+
+        # Exact matches on primary fields rank first, followed by partial matches and matches on other fields
+        self.assertEqual(list(results), [Site])
+        self.assertEqual(results[Site], (3, [self.sites[0].pk, self.sites[2].pk, self.sites[1].pk]))
+
+        results = search(self.user, 'site 1', [Site], limit=2)
+        self.assertEqual(results[Site], (3, [self.sites[0].pk, self.sites[2].pk]))
+
+    def test_search_related_fields(self):
+        results = search(self.user, 'manufacturer 1', [DeviceType], limit=10)
+        self.assertEqual(results[DeviceType], (1, [self.devicetype.pk]))
+
+    def test_search_networks(self):
+        prefixes = (
+            Prefix.objects.create(prefix='10.0.0.0/8'),
+            Prefix.objects.create(prefix='10.1.0.0/16'),
+            Prefix.objects.create(prefix='192.168.0.0/16'),
+        )
+
+        # Prefixes containing a searched IP address match, in addition to those matching it as text
+        results = search(self.user, '10.1.2.3', [Prefix], limit=10)
+        self.assertEqual(sorted(results[Prefix][1]), [prefixes[0].pk, prefixes[1].pk])
+
+    def test_search_permissions(self):
+        user = User.objects.create_user(username='testuser2')
+        self.assertEqual(search(user, 'site', [Site], limit=10), {})
+
+        obj_perm = ObjectPermission(name='Test permission', constraints={'slug': 'site-2'}, actions=['view'])
+        obj_perm.save()
+        obj_perm.users.add(user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(Site))
+        user = User.objects.get(pk=user.pk)
+
+        results = search(user, 'site', [Site], limit=10)
+        self.assertEqual(results[Site], (1, [self.sites[1].pk]))
+
+    def test_rebuild_search_index(self):
+        SearchEntry.objects.filter(object_id=self.sites[0].pk).delete()
+        SearchEntry.objects.create(
+            content_type=ContentType.objects.get_for_model(Site), object_id=0, primary_text='', text='stale'
+        )
+
+        call_command('rebuild_search_index', verbosity=0)
+
+        self.assertEqual(self.get_entry(self.sites[0]).text, 'site 1\nbuilding 1')
+        self.assertFalse(SearchEntry.objects.filter(text='stale'))
@@ -8,7 +8,7 @@ from django.urls import reverse
 
 from dcim.models import Site
 from extras.choices import ObjectChangeActionChoices
-from extras.models import ConfigContext, CustomLink, ObjectChange, Tag
+from extras.models import ConfigContext, CustomLink, ExportTemplate, ObjectChange, Tag
 from utilities.testing import ViewTestCases, TestCase
 
 
@@ -147,3 +147,41 @@ class CustomLinkTest(TestCase):
         response = self.client.get(site.get_absolute_url(), follow=True)
         self.assertEqual(response.status_code, 200)
         self.assertIn(f'FOO {site.name} BAR', str(response.content))
+
+
+class ExportTemplateTest(TestCase):
+    user_permissions = ['dcim.view_site']
+
+    @classmethod
+    def setUpTestData(cls):
+        Site.objects.bulk_create([
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+            Site(name='Site 3', slug='site-3'),
+        ])
+
+    def test_export_template(self):
+        ExportTemplate.objects.create(
+            content_type=ContentType.objects.get_for_model(Site),
+            name='Test',
+            template_code='{{ queryset|length }} sites\r\n{% for site in queryset %}{{ site.name }}\r\n{% endfor %}',
+            file_extension='txt'
+        )
+
+        response = self.client.get('{}?export=Test'.format(reverse('dcim:site_list')))
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(response.get('Content-Disposition'), 'attachment; filename="netbox_sites.txt"')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content, '3 sites\nSite 1\nSite 2\nSite 3\n')
+
+    def test_export_template_error(self):
+        ExportTemplate.objects.create(
+            content_type=ContentType.objects.get_for_model(Site),
+            name='Test',
+            template_code='{% for site in queryset %}'
+        )
+
+        # An invalid template is reported without aborting the request
+        response = self.client.get('{}?export=Test'.format(reverse('dcim:site_list')))
+        self.assertHttpStatus(response, 200)
+        self.assertIn('There was an error rendering the selected export template', str(response.content))
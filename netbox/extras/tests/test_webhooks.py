@@ -1,20 +1,25 @@
 import json
+import threading
 import uuid
+from http.server import ThreadingHTTPServer
 from unittest.mock import patch
 
 import django_rq
 from django.contrib.contenttypes.models import ContentType
 from django.http import HttpResponse
+from django.test import override_settings
 from django.urls import reverse
 from requests import Session
 from rest_framework import status
 
-from dcim.models import Site
+from dcim.models import Region, Site
 from extras.choices import ObjectChangeActionChoices
-from extras.models import Webhook
-from extras.webhooks import enqueue_webhooks, generate_signature
-from extras.webhooks_worker import process_webhook
-from utilities.testing import APITestCase
+from extras.management.commands.webhook_receiver import WebhookHandler
+from extras.models import Tag, Webhook
+from extras.webhooks import enqueue_webhook_events, enqueue_webhooks, generate_signature, webhooks_cache
+from extras.webhooks_dispatcher import WebhookDispatcher
+from extras.webhooks_worker import process_webhook, process_webhooks
+from utilities.testing import APITestCase, TestCase
 
 
 class WebhookTest(APITestCase):
@@ -23,7 +28,7 @@ class WebhookTest(APITestCase):
 
         super().setUp()
 
-        self.queue = django_rq.get_queue('default')
+        self.queue = django_rq.get_queue('webhooks')
         self.queue.empty()  # Begin each test with an empty queue
 
     @classmethod
@@ -41,6 +46,12 @@ class WebhookTest(APITestCase):
         for webhook in webhooks:
             webhook.content_types.set([site_ct])
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # The test Webhooks have been rolled back
+        webhooks_cache.invalidate()
+
     def test_enqueue_webhook_create(self):
         # Create an object via the REST API
         data = {
@@ -96,6 +107,78 @@ class WebhookTest(APITestCase):
         self.assertEqual(job.args[2], 'site')
         self.assertEqual(job.args[3], ObjectChangeActionChoices.ACTION_DELETE)
 
+    def test_enqueue_webhook_create_with_tags(self):
+        # Create an object with tags via the REST API
+        tag = Tag.objects.create(name='Tag 1', slug='tag-1')
+        data = {
+            'name': 'Test Site',
+            'slug': 'test-site',
+            'tags': [tag.pk],
+        }
+        url = reverse('dcim-api:site-list')
+        self.add_permissions('dcim.add_site')
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+
+        # Verify that only the object creation webhook was queued, with the object's final state
+        self.assertEqual(self.queue.count, 1)
+        job = self.queue.jobs[0]
+        self.assertEqual(job.args[0], Webhook.objects.get(type_create=True))
+        self.assertEqual(job.args[3], ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual([t['name'] for t in job.args[1]['tags']], ['Tag 1'])
+
+    @override_settings(WEBHOOK_BATCH_SIZE=2)
+    def test_enqueue_webhooks_batched(self):
+        sites = (
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+            Site(name='Site 3', slug='site-3'),
+        )
+        Site.objects.bulk_create(sites)
+        region = Region.objects.create(name='Region 1', slug='region-1')
+
+        # Bulk edit the objects via the REST API
+        data = [{'id': site.pk, 'region': region.pk} for site in sites]
+        url = reverse('dcim-api:site-list')
+        self.add_permissions('dcim.change_site')
+        response = self.client.patch(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+
+        # Verify that the events were grouped into two jobs for the object update webhook
+        self.assertEqual(self.queue.count, 2)
+        webhook = Webhook.objects.get(type_update=True)
+        jobs = self.queue.jobs
+        for job in jobs:
+            self.assertEqual(job.func_name, 'extras.webhooks_worker.process_webhooks')
+            self.assertEqual(job.args[0], webhook)
+        events = [*jobs[0].args[1], *jobs[1].args[1]]
+        self.assertEqual(len(jobs[0].args[1]), 2)
+        self.assertEqual(sorted(event[0]['id'] for event in events), sorted(site.pk for site in sites))
+        for event in events:
+            self.assertEqual(event[0]['region']['id'], region.pk)
+            self.assertEqual(event[1], 'site')
+            self.assertEqual(event[2], ObjectChangeActionChoices.ACTION_UPDATE)
+
+    def test_webhooks_cache_invalidation(self):
+        site = Site.objects.create(name='Site 1', slug='site-1')
+        self.add_permissions('dcim.change_site')
+        url = reverse('dcim-api:site-detail', kwargs={'pk': site.pk})
+
+        # Delete the object update webhook
+        Webhook.objects.get(type_update=True).delete()
+        response = self.client.patch(url, {'comments': 'Foo'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(self.queue.count, 0)
+
+        # Assign the object creation webhook to updates
+        webhook = Webhook.objects.get(type_create=True)
+        webhook.type_update = True
+        webhook.save()
+        response = self.client.patch(url, {'comments': 'Bar'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(self.queue.count, 1)
+        self.assertEqual(self.queue.jobs[0].args[0], webhook)
+
     def test_webhooks_worker(self):
 
         request_id = uuid.uuid4()
@@ -139,3 +222,132 @@ class WebhookTest(APITestCase):
         # Patch the Session object with our dummy_send() method, then process the webhook for sending
         with patch.object(Session, 'send', dummy_send) as mock_send:
             process_webhook(*job.args)
+
+    def test_webhooks_worker_batched(self):
+
+        request_id = uuid.uuid4()
+        sent = []
+
+        def dummy_send(_, request, **kwargs):
+            sent.append(json.loads(request.body))
+            return HttpResponse()
+
+        webhook = Webhook.objects.get(type_create=True)
+        events = [
+            ({'name': f'Site {i}'}, 'site', ObjectChangeActionChoices.ACTION_CREATE, 'timestamp', 'testuser', request_id)
+            for i in range(1, 4)
+        ]
+
+        with patch.object(Session, 'send', dummy_send):
+            process_webhooks(webhook, events)
+
+        self.assertEqual([body['data']['name'] for body in sent], ['Site 1', 'Site 2', 'Site 3'])
+        for body in sent:
+            self.assertEqual(body['event'], 'created')
+            self.assertEqual(body['request_id'], str(request_id))
+
+
+class ReceiverHandler(WebhookHandler):
+    """
+    A quiet webhook receiver which supports persistent connections, responding with each of the `statuses` given in
+    turn and then with 200.
+    """
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    received = []
+
+    def log_message(self, format_str, *args):
+        pass
+
+    def do_ANY(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        status_code = self.statuses.pop(0) if self.statuses else 200
+        if status_code == 200:
+            self.received.append((self.client_address, json.loads(body)))
+
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class WebhookDispatcherTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.queue = django_rq.get_queue('webhooks')
+        self.queue.empty()
+        self.queue.finished_job_registry.cleanup(float('inf'))
+        self.queue.failed_job_registry.cleanup(float('inf'))
+
+        ReceiverHandler.statuses = []
+        ReceiverHandler.received = []
+        self.server = ThreadingHTTPServer(('localhost', 0), ReceiverHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.webhook = Webhook(
+            pk=1,
+            name='Webhook 1',
+            type_create=True,
+            payload_url=f'http://localhost:{self.server.server_port}/',
+            secret='secret'
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def enqueue(self, count):
+        return enqueue_webhook_events([
+            (self.webhook, {'id': i}, 'site', ObjectChangeActionChoices.ACTION_CREATE, 'timestamp', 'testuser', 'id')
+            for i in range(count)
+        ])
+
+    def test_deliver_webhooks(self):
+        jobs = self.enqueue(20)
+        with override_settings(WEBHOOK_BATCH_SIZE=5):
+            jobs.extend(self.enqueue(10))
+
+        dispatcher = WebhookDispatcher(workers=4, endpoint_concurrency=2)
+        dispatcher.run(burst=True)
+
+        # Verify that all events were delivered, reusing no more connections than the endpoint's concurrency limit
+        self.assertEqual(len(ReceiverHandler.received), 30)
+        self.assertEqual(sorted(body['data']['id'] for _, body in ReceiverHandler.received), sorted([*range(20), *range(10)]))
+        self.assertLessEqual(len({client_address for client_address, _ in ReceiverHandler.received}), 2)
+        self.assertEqual(dispatcher.stats.delivered, 30)
+
+        # Verify that the jobs were recorded as finished
+        self.assertEqual(self.queue.count, 0)
+        for job in jobs:
+            job.refresh()
+            self.assertEqual(job.get_status(), 'finished')
+        self.assertEqual(len(self.queue.finished_job_registry), 22)
+
+    def test_retry_webhook(self):
+        ReceiverHandler.statuses = [503, 502]
+        job, = self.enqueue(1)
+
+        dispatcher = WebhookDispatcher(retries=2, backoff=0.01)
+        dispatcher.run(burst=True)
+
+        self.assertEqual(len(ReceiverHandler.received), 1)
+        self.assertEqual(dispatcher.stats.retries, 2)
+        job.refresh()
+        self.assertEqual(job.get_status(), 'finished')
+
+    def test_failed_webhook(self):
+        ReceiverHandler.statuses = [400]
+        job, = self.enqueue(1)
+
+        dispatcher = WebhookDispatcher(retries=2, backoff=0.01)
+        dispatcher.run(burst=True)
+
+        # Verify that the request was not retried
+        self.assertEqual(len(ReceiverHandler.received), 0)
+        self.assertEqual(dispatcher.stats.retries, 0)
+        self.assertEqual(dispatcher.stats.failed, 1)
+        job.refresh()
+        self.assertEqual(job.get_status(), 'failed')
+        self.assertIn(job.id, self.queue.failed_job_registry.get_job_ids())
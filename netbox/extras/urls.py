@@ -35,6 +35,9 @@ urlpatterns = [
     path('changelog/', views.ObjectChangeListView.as_view(), name='objectchange_list'),
     path('changelog/<int:pk>/', views.ObjectChangeView.as_view(), name='objectchange'),
 
+    # Job results
+    path('job-results/<int:pk>/', views.JobResultView.as_view(), name='jobresult'),
+
     # Reports
     path('reports/', views.ReportListView.as_view(), name='report_list'),
     path('reports/<str:module>.<str:name>/', views.ReportView.as_view(), name='report'),
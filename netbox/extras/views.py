@@ -392,6 +392,25 @@ class ReportResultView(ContentTypePermissionRequiredMixin, View):
         })
 
 
+#
+# Job results
+#
+
+class JobResultView(View):
+    """
+    Display the progress and result of a background job, such as a bulk edit or bulk delete operation. Job results are
+    visible to the user who ran the job and to users permitted to view all job results.
+    """
+    def get(self, request, pk):
+        result = get_object_or_404(JobResult.objects.all(), pk=pk)
+        if result.user != request.user and not request.user.has_perm('extras.view_jobresult'):
+            raise Http404
+
+        return render(request, 'extras/jobresult.html', {
+            'result': result,
+        })
+
+
 #
 # Scripts
 #
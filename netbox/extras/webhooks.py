@@ -1,15 +1,35 @@
 import hashlib
 import hmac
+import logging
+from collections import defaultdict
 
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import router, transaction
 from django.utils import timezone
 from django_rq import get_queue
+from redis.exceptions import RedisError
 
 from utilities.api import get_serializer_for_model
+from .changelog import ChangeBuffer
 from .choices import *
 from .models import Webhook
 from .registry import registry
 
+logger = logging.getLogger('netbox.webhooks')
+
+# The RQ queue on which webhooks are enqueued
+WEBHOOKS_QUEUE = 'webhooks'
+
+# Redis key holding the version of the Webhook table, incremented whenever a Webhook is changed
+WEBHOOKS_VERSION_KEY = 'netbox:webhooks:version'
+
+ACTION_FLAGS = {
+    ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
+    ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
+    ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
+}
+
 
 def generate_signature(request_body, secret):
     """
@@ -23,44 +43,226 @@ def generate_signature(request_body, secret):
     return hmac_prep.hexdigest()
 
 
+#
+# Webhooks cache
+#
+
+class WebhooksCache:
+    """
+    An in-process cache of all enabled Webhooks, indexed by ContentType ID and action.
+
+    The cache is reloaded from the database whenever the version of the Webhook table stored in Redis changes, so that
+    changes made to Webhooks by any NetBox process take effect everywhere. Call refresh() to check the version.
+    """
+    def __init__(self):
+        self.version = None
+        self.valid = False
+        # (ContentType ID, action) -> list of Webhooks
+        self.webhooks = {}
+        # ContentType IDs with at least one Webhook assigned
+        self.content_types = set()
+
+    def refresh(self):
+        """
+        Reload the cache if the Webhook table has changed since it was loaded.
+        """
+        try:
+            version = get_queue('default').connection.get(WEBHOOKS_VERSION_KEY)
+        except RedisError as e:
+            # Without a way to detect changes, reload from the database every time
+            logger.warning(f"Unable to retrieve webhooks version: {e}")
+            version = None
+            self.valid = False
+
+        if not self.valid or version != self.version:
+            self.load()
+            self.version = version
+
+    def load(self):
+        webhooks = defaultdict(list)
+        for webhook in Webhook.objects.filter(enabled=True).prefetch_related('content_types'):
+            for content_type in webhook.content_types.all():
+                for action, flag in ACTION_FLAGS.items():
+                    if getattr(webhook, flag):
+                        webhooks[(content_type.pk, action)].append(webhook)
+
+        self.webhooks = dict(webhooks)
+        self.content_types = {content_type_id for content_type_id, action in webhooks}
+        self.valid = True
+
+    def invalidate(self):
+        self.valid = False
+
+    def get(self, content_type_id, action):
+        """
+        Return the Webhooks assigned to the given ContentType ID and action.
+        """
+        return self.webhooks.get((content_type_id, action), [])
+
+
+webhooks_cache = WebhooksCache()
+
+
+def _increment_webhooks_version():
+    try:
+        get_queue('default').connection.incr(WEBHOOKS_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"Unable to update webhooks version: {e}")
+    webhooks_cache.invalidate()
+
+
+def handle_webhook_changed(sender, **kwargs):
+    """
+    Invalidate the cache of Webhooks when a Webhook (or the assignment of its content types) is changed.
+    """
+    if kwargs.get('action', '').startswith('pre_'):
+        return
+    webhooks_cache.invalidate()
+    transaction.on_commit(_increment_webhooks_version, using=router.db_for_write(Webhook))
+
+
+#
+# Enqueueing
+#
+
+def _supports_webhooks(model):
+    return model._meta.model_name in registry['model_features']['webhooks'].get(model._meta.app_label, [])
+
+
+def serialize_for_webhook(instance):
+    """
+    Return the representation of an object included in webhook requests.
+    """
+    serializer_class = get_serializer_for_model(instance.__class__)
+    serializer = serializer_class(instance, context={'request': None})
+    return serializer.data
+
+
+def enqueue_webhook_events(events):
+    """
+    Enqueue the given webhook events for processing, using a single Redis pipeline. Each event is a tuple of (Webhook,
+    data, model name, action, timestamp, username, request ID).
+
+    Each event is enqueued as a separate process_webhook job, unless WEBHOOK_BATCH_SIZE is greater than one, in which
+    case the events for each Webhook are grouped into process_webhooks jobs of up to that many events.
+    """
+    queue = get_queue(WEBHOOKS_QUEUE)
+    batch_size = settings.WEBHOOK_BATCH_SIZE
+
+    jobs = []
+    if batch_size > 1:
+        events_by_webhook = {}
+        for webhook, *event in events:
+            events_by_webhook.setdefault(webhook.pk, (webhook, []))[1].append(tuple(event))
+        for webhook, webhook_events in events_by_webhook.values():
+            for i in range(0, len(webhook_events), batch_size):
+                jobs.append(queue.create_job(
+                    'extras.webhooks_worker.process_webhooks',
+                    args=(webhook, webhook_events[i:i + batch_size])
+                ))
+    else:
+        for event in events:
+            jobs.append(queue.create_job('extras.webhooks_worker.process_webhook', args=event))
+
+    if queue.is_async:
+        with queue.connection.pipeline() as pipeline:
+            for job in jobs:
+                queue.enqueue_job(job, pipeline=pipeline)
+            pipeline.execute()
+    else:
+        for job in jobs:
+            queue.enqueue_job(job)
+
+    return jobs
+
+
 def enqueue_webhooks(instance, user, request_id, action):
     """
     Find Webhook(s) assigned to this instance + action and enqueue them
     to be processed
     """
     # Determine whether this type of object supports webhooks
-    app_label = instance._meta.app_label
-    model_name = instance._meta.model_name
-    if model_name not in registry['model_features']['webhooks'].get(app_label, []):
+    if not _supports_webhooks(instance):
         return
 
     # Retrieve any applicable Webhooks
+    webhooks_cache.refresh()
     content_type = ContentType.objects.get_for_model(instance)
-    action_flag = {
-        ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
-        ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
-        ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
-    }[action]
-    webhooks = Webhook.objects.filter(content_types=content_type, enabled=True, **{action_flag: True})
-
-    if webhooks.exists():
-        # Get the Model's API serializer class and serialize the object
-        serializer_class = get_serializer_for_model(instance.__class__)
-        serializer_context = {
-            'request': None,
+    webhooks = webhooks_cache.get(content_type.pk, action)
+
+    if webhooks:
+        data = serialize_for_webhook(instance)
+        timestamp = str(timezone.now())
+        enqueue_webhook_events([
+            (webhook, data, instance._meta.model_name, action, timestamp, user.username, request_id)
+            for webhook in webhooks
+        ])
+
+
+class WebhookBuffer(ChangeBuffer):
+    """
+    Collect the changes made to objects during a request which may trigger webhooks, and enqueue the webhooks once the
+    request has completed.
+
+    Created and updated objects are serialized when the buffer is flushed, so their webhooks convey the state of the
+    object following the last change made to it. (Deleted objects are serialized immediately.) Objects of a type with
+    no Webhooks assigned are ignored.
+
+    :param request: WSGIRequest object with a unique `id` set
+    """
+    def __init__(self, request):
+        super().__init__(using=router.db_for_write(Webhook))
+        self.request = request
+        self._refreshed = False
+
+    def record(self, instance, action):
+        if not _supports_webhooks(instance):
+            return None
+
+        # Check for changes to Webhooks once per request
+        if not self._refreshed:
+            webhooks_cache.refresh()
+            self._refreshed = True
+        content_type = ContentType.objects.get_for_model(instance)
+        if content_type.pk not in webhooks_cache.content_types:
+            return None
+
+        change = super().record(instance, action)
+        change.data = {
+            'content_type_id': content_type.pk,
+            'timestamp': str(timezone.now()),
         }
-        serializer = serializer_class(instance, context=serializer_context)
-
-        # Enqueue the webhooks
-        webhook_queue = get_queue('default')
-        for webhook in webhooks:
-            webhook_queue.enqueue(
-                "extras.webhooks_worker.process_webhook",
-                webhook,
-                serializer.data,
-                instance._meta.model_name,
-                action,
-                str(timezone.now()),
-                user.username,
-                request_id
-            )
+        if action == ObjectChangeActionChoices.ACTION_DELETE and webhooks_cache.get(content_type.pk, action):
+            change.data['data'] = serialize_for_webhook(instance)
+
+        return change
+
+    def flush(self):
+        """
+        Enqueue the webhooks for all recorded changes which have not been rolled back, and empty the buffer. Returns
+        the list of jobs enqueued.
+        """
+        username = self.request.user.username
+
+        events = []
+        for change in self.pop_changes():
+            webhooks = webhooks_cache.get(change.data['content_type_id'], change.action)
+            if not webhooks:
+                continue
+            if 'data' not in change.data:
+                change.data['data'] = serialize_for_webhook(change.instance)
+            for webhook in webhooks:
+                events.append((
+                    webhook,
+                    change.data['data'],
+                    change.instance._meta.model_name,
+                    change.action,
+                    change.data['timestamp'],
+                    username,
+                    self.request.id
+                ))
+
+        if not events:
+            return []
+
+        return enqueue_webhook_events(events)
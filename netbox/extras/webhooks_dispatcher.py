@@ -0,0 +1,287 @@
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django_rq import get_queue
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from rq.defaults import DEFAULT_RESULT_TTL
+from rq.job import JobStatus
+from rq.queue import Queue
+from rq.utils import utcnow
+
+from .webhooks import WEBHOOKS_QUEUE
+from .webhooks_worker import _prepare_request
+
+logger = logging.getLogger('netbox.webhooks_dispatcher')
+
+webhook_deliveries = Counter(
+    'netbox_webhook_deliveries_total', 'Number of webhook requests sent, by outcome', ['outcome']
+)
+webhook_delivery_duration = Histogram(
+    'netbox_webhook_delivery_seconds', 'Time taken to deliver a webhook request, including any retries'
+)
+
+# HTTP status codes which indicate that a request may succeed if retried
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class DeliveryError(Exception):
+    """
+    A webhook request could not be delivered.
+    """
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class Endpoint:
+    """
+    A receiver of webhooks (identified by the scheme and network location of their URLs), with a pool of keep-alive
+    connections shared by all requests sent to it.
+    """
+    def __init__(self, name, concurrency):
+        self.name = name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # The number of jobs being delivered to the endpoint, and the jobs waiting for a free slot
+        self.active = 0
+        self.waiting = deque()
+
+
+class DispatcherStats:
+    """
+    Delivery statistics for the lifetime of a WebhookDispatcher.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.latency = 0.0
+
+    def record(self, outcome, latency=None):
+        with self.lock:
+            if outcome == 'success':
+                self.delivered += 1
+                self.latency += latency
+            elif outcome == 'failure':
+                self.failed += 1
+            else:
+                self.retries += 1
+        webhook_deliveries.labels(outcome).inc()
+        if latency is not None:
+            webhook_delivery_duration.observe(latency)
+
+    def __str__(self):
+        elapsed = time.monotonic() - self.started
+        mean_latency = self.latency / self.delivered if self.delivered else 0
+        return (
+            f"{self.delivered} requests delivered ({self.delivered / elapsed:.1f}/s, mean latency "
+            f"{mean_latency * 1000:.0f}ms), {self.failed} failed, {self.retries} retried"
+        )
+
+
+class WebhookDispatcher:
+    """
+    Deliver the webhook jobs enqueued on the webhooks queue concurrently, as an alternative to processing them one at
+    a time with an RQ worker.
+
+    Requests are sent from a pool of threads, using a persistent session for each endpoint. No more than
+    `endpoint_concurrency` jobs are delivered to an endpoint at a time; the events within a batched job are delivered
+    in order. Requests which fail due to a connection error, a timeout or a transient HTTP error are retried up to
+    `retries` times, waiting `backoff` seconds before the first retry and twice as long before each subsequent one.
+
+    :param workers: The number of threads used to send requests
+    :param endpoint_concurrency: The maximum number of jobs delivered concurrently to any one endpoint
+    :param retries: The number of times to retry a failed request
+    :param backoff: The delay before the first retry, in seconds
+    :param timeout: The timeout for each request, in seconds
+    """
+    def __init__(self, workers=8, endpoint_concurrency=4, retries=3, backoff=1.0, timeout=10.0):
+        self.queue = get_queue(WEBHOOKS_QUEUE)
+        self.workers = workers
+        self.endpoint_concurrency = endpoint_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.endpoints = {}
+        self.stats = DispatcherStats()
+        self._stopping = False
+        self._executor = None
+        # Guards the endpoints and the count of jobs in progress
+        self._lock = threading.Condition()
+        self._in_progress = 0
+
+    def stop(self):
+        """
+        Stop dequeuing jobs. Jobs already dequeued are delivered before run() returns.
+        """
+        self._stopping = True
+
+    def run(self, burst=False, poll_interval=1):
+        """
+        Dequeue and deliver jobs until stopped. In burst mode, return once the queue is empty and all jobs have been
+        delivered.
+        """
+        logger.info(
+            f"Dispatching webhooks from the {self.queue.name} queue with {self.workers} workers, up to "
+            f"{self.endpoint_concurrency} concurrent jobs per endpoint"
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='webhooks_dispatcher')
+        max_in_progress = self.workers * 4
+
+        try:
+            while not self._stopping:
+                # Limit the number of jobs held in memory awaiting delivery
+                with self._lock:
+                    while self._in_progress >= max_in_progress:
+                        self._lock.wait()
+
+                result = Queue.dequeue_any(
+                    [self.queue],
+                    timeout=None if burst else poll_interval,
+                    connection=self.queue.connection
+                )
+                if result is None:
+                    if burst:
+                        break
+                    continue
+                self.submit(result[0])
+        finally:
+            self._executor.shutdown(wait=True)
+            for endpoint in self.endpoints.values():
+                endpoint.session.close()
+            logger.info(f"Stopped dispatching webhooks: {self.stats}")
+
+    def submit(self, job):
+        """
+        Schedule a job for delivery, subject to the concurrency limit of its endpoint.
+        """
+        with self._lock:
+            self._in_progress += 1
+            endpoint = self.get_endpoint(job)
+            if endpoint.active < self.endpoint_concurrency:
+                endpoint.active += 1
+                self._executor.submit(self._run_job, endpoint, job)
+            else:
+                endpoint.waiting.append(job)
+
+    def get_endpoint(self, job):
+        """
+        Return the Endpoint for a job's webhook.
+        """
+        webhook = job.args[0] if job.args else None
+        url = urlsplit(getattr(webhook, 'payload_url', ''))
+        name = f'{url.scheme}://{url.netloc}'
+        if name not in self.endpoints:
+            self.endpoints[name] = Endpoint(name, self.endpoint_concurrency)
+        return self.endpoints[name]
+
+    def _run_job(self, endpoint, job):
+        while job is not None:
+            self.perform_job(endpoint, job)
+
+            # Deliver the next job waiting for the endpoint, if any
+            with self._lock:
+                self._in_progress -= 1
+                self._lock.notify_all()
+                if endpoint.waiting:
+                    job = endpoint.waiting.popleft()
+                else:
+                    endpoint.active -= 1
+                    job = None
+
+    def perform_job(self, endpoint, job):
+        """
+        Deliver a job and record its result.
+        """
+        job.started_at = utcnow()
+        job.set_status(JobStatus.STARTED)
+        try:
+            if job.func_name == 'extras.webhooks_worker.process_webhook':
+                webhook, *event = job.args
+                result = self.deliver(endpoint, webhook, [event])
+            elif job.func_name == 'extras.webhooks_worker.process_webhooks':
+                webhook, events = job.args
+                result = self.deliver(endpoint, webhook, events)
+            else:
+                result = job.perform()
+        except Exception:
+            job.ended_at = utcnow()
+            exc_string = traceback.format_exc()
+            logger.error(f"Job {job.id} failed: {exc_string}")
+            self.handle_job_failure(job, exc_string)
+        else:
+            job.ended_at = utcnow()
+            job._result = result
+            self.handle_job_success(job)
+
+    def deliver(self, endpoint, webhook, events):
+        """
+        Send a request to a Webhook for each of the given events, in order.
+        """
+        verify = webhook.ca_file_path or webhook.ssl_verification
+        for event in events:
+            prepared_request = _prepare_request(webhook, *event)
+            start = time.monotonic()
+            response = self.send(endpoint, prepared_request, verify)
+            self.stats.record('success', time.monotonic() - start)
+            logger.info(f"Request succeeded; response status {response.status_code}")
+
+        return f'{len(events)} events delivered, webhook successfully processed.'
+
+    def send(self, endpoint, prepared_request, verify):
+        """
+        Send a request, retrying it with exponential backoff if it fails due to a transient error.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = endpoint.session.send(
+                    prepared_request,
+                    verify=verify,
+                    proxies=settings.HTTP_PROXIES,
+                    timeout=self.timeout
+                )
+                if 200 <= response.status_code <= 299:
+                    return response
+                raise DeliveryError(
+                    f"Status {response.status_code} returned with content '{response.content}', webhook FAILED to "
+                    f"process.",
+                    retry=response.status_code in RETRY_STATUS_CODES
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, DeliveryError) as e:
+                if attempt == self.retries or not getattr(e, 'retry', True):
+                    self.stats.record('failure')
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"Request to {endpoint.name} failed ({e}); retrying in {delay}s")
+                self.stats.record('retry')
+                time.sleep(delay)
+
+    def handle_job_success(self, job):
+        with self.queue.connection.pipeline() as pipeline:
+            result_ttl = job.get_result_ttl(DEFAULT_RESULT_TTL)
+            if result_ttl != 0:
+                job.set_status(JobStatus.FINISHED, pipeline=pipeline)
+                job.save(pipeline=pipeline, include_meta=False)
+                self.queue.finished_job_registry.add(job, result_ttl, pipeline)
+            job.cleanup(result_ttl, pipeline=pipeline, remove_from_queue=False)
+            pipeline.execute()
+
+    def handle_job_failure(self, job, exc_string):
+        with self.queue.connection.pipeline() as pipeline:
+            job.set_status(JobStatus.FAILED, pipeline=pipeline)
+            job.save(pipeline=pipeline, include_meta=False)
+            self.queue.failed_job_registry.add(job, ttl=job.failure_ttl, exc_string=exc_string, pipeline=pipeline)
+            pipeline.execute()
@@ -11,10 +11,9 @@ from .webhooks import generate_signature
 logger = logging.getLogger('netbox.webhooks_worker')
 
 
-@job('default')
-def process_webhook(webhook, data, model_name, event, timestamp, username, request_id):
+def _prepare_request(webhook, data, model_name, event, timestamp, username, request_id):
     """
-    Make a POST request to the defined Webhook
+    Return a PreparedRequest for the delivery of an event to the defined Webhook
     """
     context = {
         'event': dict(ObjectChangeActionChoices)[event].lower(),
@@ -65,12 +64,19 @@ def process_webhook(webhook, data, model_name, event, timestamp, username, reque
     if webhook.secret != '':
         prepared_request.headers['X-Hook-Signature'] = generate_signature(prepared_request.body, webhook.secret)
 
-    # Send the request
-    with requests.Session() as session:
-        session.verify = webhook.ssl_verification
-        if webhook.ca_file_path:
-            session.verify = webhook.ca_file_path
-        response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
+    return prepared_request
+
+
+def _get_session(webhook):
+    session = requests.Session()
+    session.verify = webhook.ssl_verification
+    if webhook.ca_file_path:
+        session.verify = webhook.ca_file_path
+    return session
+
+
+def _send_request(session, prepared_request):
+    response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
 
     if 200 <= response.status_code <= 299:
         logger.info("Request succeeded; response status {}".format(response.status_code))
@@ -82,3 +88,35 @@ def process_webhook(webhook, data, model_name, event, timestamp, username, reque
                 response.status_code, response.content
             )
         )
+
+
+@job('webhooks')
+def process_webhook(webhook, data, model_name, event, timestamp, username, request_id):
+    """
+    Make a POST request to the defined Webhook
+    """
+    prepared_request = _prepare_request(webhook, data, model_name, event, timestamp, username, request_id)
+
+    # Send the request
+    with _get_session(webhook) as session:
+        return _send_request(session, prepared_request)
+
+
+@job('webhooks')
+def process_webhooks(webhook, events):
+    """
+    Make a request to the defined Webhook for each of the given events, reusing a single HTTP session. Each event is
+    a tuple of (data, model name, event, timestamp, username, request ID).
+
+    Delivery stops at the first request which fails, raising its exception.
+    """
+    with _get_session(webhook) as session:
+        for i, event in enumerate(events):
+            prepared_request = _prepare_request(webhook, *event)
+            try:
+                _send_request(session, prepared_request)
+            except Exception:
+                logger.error("Delivered {} of {} events for webhook {}".format(i, len(events), webhook))
+                raise
+
+    return '{} events delivered, webhook successfully processed.'.format(len(events))
@@ -81,15 +81,20 @@ class AggregateSerializer(TaggedObjectSerializer, CustomFieldModelSerializer):
     family = ChoiceField(choices=IPAddressFamilyChoices, read_only=True)
     rir = NestedRIRSerializer()
     tenant = NestedTenantSerializer(required=False, allow_null=True)
+    utilization = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Aggregate
         fields = [
-            'id', 'url', 'family', 'prefix', 'rir', 'tenant', 'date_added', 'description', 'tags', 'custom_fields', 'created',
-            'last_updated',
+            'id', 'url', 'family', 'prefix', 'rir', 'tenant', 'date_added', 'description', 'utilization', 'tags',
+            'custom_fields', 'created', 'last_updated',
         ]
         read_only_fields = ['family']
 
+    @swagger_serializer_method(serializer_or_field=serializers.IntegerField)
+    def get_utilization(self, obj):
+        return obj.get_utilization()
+
 
 #
 # VLANs
@@ -173,15 +178,20 @@ class PrefixSerializer(TaggedObjectSerializer, CustomFieldModelSerializer):
     vlan = NestedVLANSerializer(required=False, allow_null=True)
     status = ChoiceField(choices=PrefixStatusChoices, required=False)
     role = NestedRoleSerializer(required=False, allow_null=True)
+    utilization = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Prefix
         fields = [
             'id', 'url', 'family', 'prefix', 'site', 'vrf', 'tenant', 'vlan', 'status', 'role', 'is_pool',
-            'description', 'tags', 'custom_fields', 'created', 'last_updated',
+            'description', 'utilization', 'tags', 'custom_fields', 'created', 'last_updated',
         ]
         read_only_fields = ['family']
 
+    @swagger_serializer_method(serializer_or_field=serializers.IntegerField)
+    def get_utilization(self, obj):
+        return obj.get_utilization()
+
 
 class PrefixLengthSerializer(serializers.Serializer):
 
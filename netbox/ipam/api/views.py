@@ -1,8 +1,11 @@
+from itertools import islice
+
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
+from django.db.models.signals import post_save
 from django.shortcuts import get_object_or_404
-from django_pglocks import advisory_lock
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.decorators import action
@@ -10,8 +13,10 @@ from rest_framework.response import Response
 from rest_framework.routers import APIRootView
 
 from extras.api.views import CustomFieldModelViewSet
+from extras.models import TaggedItem
 from ipam import filters
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, Role, RouteTarget, Service, VLAN, VLANGroup, VRF
+from ipam.utils import PrefixAllocator, add_to_hierarchy, prefix_advisory_lock
 from netbox.api.views import ModelViewSet
 from utilities.constants import ADVISORY_LOCK_KEYS
 from utilities.utils import count_related
@@ -68,7 +73,7 @@ class RIRViewSet(ModelViewSet):
 #
 
 class AggregateViewSet(CustomFieldModelViewSet):
-    queryset = Aggregate.objects.prefetch_related('rir').prefetch_related('tags')
+    queryset = Aggregate.objects.prefetch_related('rir').prefetch_related('tags').annotate_utilization()
     serializer_class = serializers.AggregateSerializer
     filterset_class = filters.AggregateFilterSet
 
@@ -93,7 +98,7 @@ class RoleViewSet(ModelViewSet):
 class PrefixViewSet(CustomFieldModelViewSet):
     queryset = Prefix.objects.prefetch_related(
         'site', 'vrf__tenant', 'tenant', 'vlan', 'role', 'tags'
-    )
+    ).annotate_utilization()
     serializer_class = serializers.PrefixSerializer
     filterset_class = filters.PrefixFilterSet
 
@@ -105,15 +110,19 @@ class PrefixViewSet(CustomFieldModelViewSet):
     @swagger_auto_schema(method='get', responses={200: serializers.AvailablePrefixSerializer(many=True)})
     @swagger_auto_schema(method='post', responses={201: serializers.PrefixSerializer(many=False)})
     @action(detail=True, url_path='available-prefixes', methods=['get', 'post'])
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-prefixes'])
     def available_prefixes(self, request, pk=None):
         """
         A convenience method for returning available child prefixes within a parent.
 
-        The advisory lock decorator uses a PostgreSQL advisory lock to prevent this API from being
-        invoked in parallel, which results in a race condition where multiple insertions can occur.
+        PostgreSQL advisory locks scoped to the parent prefix prevent this API from being invoked in parallel for the
+        same prefix, which results in a race condition where multiple insertions can occur.
         """
         prefix = get_object_or_404(self.queryset, pk=pk)
+
+        with prefix_advisory_lock(prefix, ADVISORY_LOCK_KEYS['available-prefixes']):
+            return self._available_prefixes(request, prefix)
+
+    def _available_prefixes(self, request, prefix):
         available_prefixes = prefix.get_available_prefixes()
 
         if request.method == 'POST':
@@ -135,44 +144,45 @@ class PrefixViewSet(CustomFieldModelViewSet):
 
             requested_prefixes = serializer.validated_data
             # Allocate prefixes to the requested objects based on availability within the parent
-            for i, requested_prefix in enumerate(requested_prefixes):
+            allocator = PrefixAllocator(available_prefixes)
+            for requested_prefix in requested_prefixes:
 
                 # Find the first available prefix equal to or larger than the requested size
-                for available_prefix in available_prefixes.iter_cidrs():
-                    if requested_prefix['prefix_length'] >= available_prefix.prefixlen:
-                        allocated_prefix = '{}/{}'.format(available_prefix.network, requested_prefix['prefix_length'])
-                        requested_prefix['prefix'] = allocated_prefix
-                        requested_prefix['vrf'] = prefix.vrf.pk if prefix.vrf else None
-                        break
-                else:
+                allocated_prefix = allocator.allocate(requested_prefix['prefix_length'])
+                if allocated_prefix is None:
                     return Response(
                         {
                             "detail": "Insufficient space is available to accommodate the requested prefix size(s)"
                         },
                         status=status.HTTP_204_NO_CONTENT
                     )
+                requested_prefix['prefix'] = str(allocated_prefix)
+                requested_prefix['vrf'] = prefix.vrf.pk if prefix.vrf else None
 
-                # Remove the allocated prefix from the list of available prefixes
-                available_prefixes.remove(allocated_prefix)
-
-            # Initialize the serializer with a list or a single object depending on what was requested
+            # Validate the new Prefix(es)
             context = {'request': request}
-            if isinstance(request.data, list):
-                serializer = serializers.PrefixSerializer(data=requested_prefixes, many=True, context=context)
-            else:
-                serializer = serializers.PrefixSerializer(data=requested_prefixes[0], context=context)
+            serializer = serializers.PrefixSerializer(data=requested_prefixes, many=True, context=context)
+            if not serializer.is_valid():
+                errors = serializer.errors if isinstance(request.data, list) else serializer.errors[0]
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
             # Create the new Prefix(es)
-            if serializer.is_valid():
-                try:
-                    with transaction.atomic():
-                        created = serializer.save()
-                        self._validate_objects(created)
-                except ObjectDoesNotExist:
-                    raise PermissionDenied()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            try:
+                with transaction.atomic():
+                    created = self._bulk_create_prefixes(serializer.validated_data)
+                    self._validate_objects(created)
+            except ObjectDoesNotExist:
+                raise PermissionDenied()
+
+            # Re-fetch the new Prefix(es) to annotate utilization and prefetch related objects in bulk
+            created = self.queryset.filter(pk__in=[p.pk for p in created]).in_bulk()
+            created = [created[pk] for pk in sorted(created)]
+            if isinstance(request.data, list):
+                serializer = serializers.PrefixSerializer(created, many=True, context=context)
+            else:
+                serializer = serializers.PrefixSerializer(created[0], context=context)
 
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         else:
 
@@ -183,22 +193,51 @@ class PrefixViewSet(CustomFieldModelViewSet):
 
             return Response(serializer.data)
 
+    @staticmethod
+    def _bulk_create_prefixes(validated_data):
+        """
+        Create Prefixes (and assign their tags) using bulk queries, and add them to the cached hierarchy together.
+        Because bulk_create() does not send post_save, the signal is sent for each new Prefix once its tags have been
+        assigned, so that change logging and webhooks see the complete object.
+        """
+        tags = [data.pop('tags', None) or [] for data in validated_data]
+        prefixes = Prefix.objects.bulk_create([Prefix(**data) for data in validated_data])
+        add_to_hierarchy(prefixes)
+
+        content_type = ContentType.objects.get_for_model(Prefix)
+        TaggedItem.objects.bulk_create([
+            TaggedItem(content_type=content_type, object_id=prefix.pk, tag=tag)
+            for prefix, prefix_tags in zip(prefixes, tags) for tag in prefix_tags
+        ])
+
+        for prefix, prefix_tags in zip(prefixes, tags):
+            prefix._tags = prefix_tags
+            post_save.send(
+                sender=Prefix, instance=prefix, created=True, update_fields=None, raw=False, using=prefix._state.db
+            )
+
+        return prefixes
+
     @swagger_auto_schema(method='get', responses={200: serializers.AvailableIPSerializer(many=True)})
     @swagger_auto_schema(method='post', responses={201: serializers.AvailableIPSerializer(many=True)},
                          request_body=serializers.AvailableIPSerializer(many=True))
     @action(detail=True, url_path='available-ips', methods=['get', 'post'], queryset=IPAddress.objects.all())
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-ips'])
     def available_ips(self, request, pk=None):
         """
         A convenience method for returning available IP addresses within a prefix. By default, the number of IPs
         returned will be equivalent to PAGINATE_COUNT. An arbitrary limit (up to MAX_PAGE_SIZE, if set) may be passed,
         however results will not be paginated.
 
-        The advisory lock decorator uses a PostgreSQL advisory lock to prevent this API from being
-        invoked in parallel, which results in a race condition where multiple insertions can occur.
+        PostgreSQL advisory locks scoped to the prefix (and those it contains) prevent this API from being invoked in
+        parallel for overlapping prefixes, which results in a race condition where multiple insertions can occur.
         """
         prefix = get_object_or_404(Prefix.objects.restrict(request.user), pk=pk)
 
+        with prefix_advisory_lock(prefix, ADVISORY_LOCK_KEYS['available-ips']):
+            return self._available_ips(request, prefix)
+
+    def _available_ips(self, request, prefix):
+
         # Create the next available IP within the prefix
         if request.method == 'POST':
 
@@ -206,8 +245,8 @@ class PrefixViewSet(CustomFieldModelViewSet):
             requested_ips = request.data if isinstance(request.data, list) else [request.data]
 
             # Determine if the requested number of IPs is available
-            available_ips = prefix.get_available_ips()
-            if available_ips.size < len(requested_ips):
+            available_ips = list(islice(prefix.iter_available_ips(), len(requested_ips)))
+            if len(available_ips) < len(requested_ips):
                 return Response(
                     {
                         "detail": "An insufficient number of IP addresses are available within the prefix {} ({} "
@@ -217,10 +256,9 @@ class PrefixViewSet(CustomFieldModelViewSet):
                 )
 
             # Assign addresses from the list of available IPs and copy VRF assignment from the parent prefix
-            available_ips = iter(available_ips)
             prefix_length = prefix.prefix.prefixlen
-            for requested_ip in requested_ips:
-                requested_ip['address'] = '{}/{}'.format(next(available_ips), prefix_length)
+            for requested_ip, available_ip in zip(requested_ips, available_ips):
+                requested_ip['address'] = '{}/{}'.format(available_ip, prefix_length)
                 requested_ip['vrf'] = prefix.vrf.pk if prefix.vrf else None
 
             # Initialize the serializer with a list or a single object depending on what was requested
@@ -252,11 +290,7 @@ class PrefixViewSet(CustomFieldModelViewSet):
                 limit = min(limit, settings.MAX_PAGE_SIZE)
 
             # Calculate available IPs within the prefix
-            ip_list = []
-            for index, ip in enumerate(prefix.get_available_ips(), start=1):
-                ip_list.append(ip)
-                if index == limit:
-                    break
+            ip_list = list(islice(prefix.iter_available_ips(), limit if limit > 0 else None))
             serializer = serializers.AvailableIPSerializer(ip_list, many=True, context={
                 'request': request,
                 'prefix': prefix.prefix,
@@ -923,25 +923,23 @@ class IPAddressCSVForm(CustomFieldModelCSVForm):
         if is_primary and not device and not virtual_machine:
             raise forms.ValidationError("No device or virtual machine specified; cannot set as primary IP")
 
-    def save(self, *args, **kwargs):
-
         # Set interface assignment
-        if self.cleaned_data['interface']:
+        if self.cleaned_data.get('interface'):
             self.instance.assigned_object = self.cleaned_data['interface']
 
-        ipaddress = super().save(*args, **kwargs)
+    def _save_m2m(self):
+        super()._save_m2m()
 
-        # Set as primary for device/VM
+        # Set as primary for device/VM. This must follow the creation of the IP address, which may have been saved
+        # using commit=False and created in bulk.
         if self.cleaned_data['is_primary']:
             parent = self.cleaned_data['device'] or self.cleaned_data['virtual_machine']
             if self.instance.address.version == 4:
-                parent.primary_ip4 = ipaddress
+                parent.primary_ip4 = self.instance
             elif self.instance.address.version == 6:
-                parent.primary_ip6 = ipaddress
+                parent.primary_ip6 = self.instance
             parent.save()
 
-        return ipaddress
-
 
 class IPAddressBulkEditForm(BootstrapMixin, AddRemoveTagsForm, CustomFieldBulkEditForm):
     pk = forms.ModelMultipleChoiceField(
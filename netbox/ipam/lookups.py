@@ -97,7 +97,8 @@ class NetHost(Lookup):
         if rhs_params:
             rhs_params[0] = rhs_params[0].split('/')[0]
         params = lhs_params + rhs_params
-        return 'HOST(%s) = %s' % (lhs, rhs), params
+        # Compare the host as an INET (rather than as text) so that the ipam_ipaddress_host_gist index can be used.
+        return 'CAST(HOST(%s) AS INET) = %s' % (lhs, rhs), params
 
 
 class NetIn(Lookup):
@@ -143,7 +144,7 @@ class NetIn(Lookup):
 class NetHostContained(Lookup):
     """
     Check for the host portion of an IP address without regard to its mask. This allows us to find e.g. 192.0.2.1/24
-    when specifying a parent prefix of 192.0.2.0/26.
+    when specifying a parent prefix of 192.0.2.0/26. The expression matches that of the ipam_ipaddress_host_gist index.
     """
     lookup_name = 'net_host_contained'
 
@@ -0,0 +1,38 @@
+from cacheops import invalidate_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ipam.models import Prefix, VRF
+from ipam.utils import rebuild_prefixes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cached hierarchy (depth, children, and parent) of all prefixes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of prefixes to update per query (default: 1000)"
+        )
+
+    def handle(self, *args, **options):
+        vrfs = [(None, 'Global table')] + [(vrf.pk, f'VRF {vrf}') for vrf in VRF.objects.all()]
+        count = 0
+
+        for vrf_id, name in vrfs:
+            if options['verbosity']:
+                self.stdout.write(f"{name}... ", ending='')
+                self.stdout.flush()
+
+            with transaction.atomic():
+                prefixes = Prefix.objects.filter(vrf_id=vrf_id).select_for_update()
+                updated = rebuild_prefixes(prefixes, batch_size=options['batch_size'])
+            count += updated
+
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS(f"{updated} prefixes updated"))
+
+        invalidate_model(Prefix)
+
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(f"Done. {count} prefixes updated."))
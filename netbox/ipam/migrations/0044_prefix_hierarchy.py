@@ -0,0 +1,82 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_prefix_hierarchy(apps, schema_editor):
+    """
+    Calculate the depth, number of children, and immediate parent of every Prefix. Prefixes are sorted by VRF, address,
+    and mask length, so that every parent precedes its children, and swept in a single pass which tracks the current
+    chain of parents on a stack. Duplicate prefixes share one stack entry: they count as parents of one another's
+    children, but not of one another.
+    """
+    Prefix = apps.get_model('ipam', 'Prefix')
+
+    prefixes = sorted(
+        Prefix.objects.values_list('pk', 'vrf_id', 'prefix'),
+        key=lambda p: (p[1] or 0, p[2].version, p[2].value, p[2].prefixlen, p[0])
+    )
+
+    # pk -> [depth, children, parent]
+    hierarchy = {}
+    # Each entry is [vrf_id, prefix, member pks, position of first member]
+    stack = []
+    depth = 0
+
+    def pop(position):
+        nonlocal depth
+        _, _, members, start = stack.pop()
+        for pk in members:
+            hierarchy[pk][1] = position - start - len(members)
+        depth -= len(members)
+
+    for position, (pk, vrf_id, prefix) in enumerate(prefixes):
+        while stack and (stack[-1][0] != vrf_id or prefix not in stack[-1][1]):
+            pop(position)
+        if stack and stack[-1][1] == prefix:
+            # Duplicate prefix
+            stack[-1][2].append(pk)
+            hierarchy[pk] = [depth - len(stack[-1][2]) + 1, 0, hierarchy[stack[-1][2][0]][2]]
+        else:
+            hierarchy[pk] = [depth, 0, stack[-1][2][0] if stack else None]
+            stack.append([vrf_id, prefix, [pk], position])
+        depth += 1
+    while stack:
+        pop(len(prefixes))
+
+    Prefix.objects.bulk_update(
+        [
+            Prefix(pk=pk, _depth=depth, _children=children, _parent_id=parent_id)
+            for pk, (depth, children, parent_id) in hierarchy.items() if depth or children or parent_id
+        ],
+        ['_depth', '_children', '_parent'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0043_add_tenancy_to_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prefix',
+            name='_children',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='_depth',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='_parent',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ipam.prefix'),
+        ),
+        migrations.RunPython(
+            code=populate_prefix_hierarchy,
+            reverse_code=migrations.RunPython.noop
+        ),
+    ]
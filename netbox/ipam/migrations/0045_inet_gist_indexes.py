@@ -0,0 +1,31 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0044_prefix_hierarchy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prefix',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['prefix'], name='ipam_prefix_prefix_gist', opclasses=['inet_ops']
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='ipaddress',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['address'], name='ipam_ipaddress_address_gist', opclasses=['inet_ops']
+            ),
+        ),
+        # Index the host portion of each address (without its mask) for the net_host and net_host_contained lookups.
+        # The expression must match the SQL generated by those lookups exactly.
+        migrations.RunSQL(
+            sql='CREATE INDEX "ipam_ipaddress_host_gist" ON "ipam_ipaddress" '
+                'USING gist ((CAST(HOST("address") AS INET)) inet_ops)',
+            reverse_sql='DROP INDEX IF EXISTS "ipam_ipaddress_host_gist"',
+        ),
+    ]
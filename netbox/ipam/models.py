@@ -3,6 +3,7 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GistIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -20,7 +21,7 @@ from .choices import *
 from .constants import *
 from .fields import IPNetworkField, IPAddressField
 from .managers import IPAddressManager
-from .querysets import PrefixQuerySet
+from .querysets import AggregateQuerySet, PrefixQuerySet
 from .validators import DNSValidator
 
 
@@ -239,7 +240,7 @@ class Aggregate(ChangeLoggedModel, CustomFieldModel):
     )
     tags = TaggableManager(through=TaggedItem)
 
-    objects = RestrictedQuerySet.as_manager()
+    objects = AggregateQuerySet.as_manager()
 
     csv_headers = ['prefix', 'rir', 'tenant', 'date_added', 'description']
     clone_fields = [
@@ -310,8 +311,12 @@ class Aggregate(ChangeLoggedModel, CustomFieldModel):
 
     def get_utilization(self):
         """
-        Determine the prefix utilization of the aggregate and return it as a percentage.
+        Determine the prefix utilization of the aggregate and return it as a percentage. If the utilization has been
+        annotated on the instance (see AggregateQuerySet.annotate_utilization()), that value is returned instead.
         """
+        if getattr(self, 'utilization', None) is not None:
+            return self.utilization
+
         queryset = Prefix.objects.filter(prefix__net_contained_or_equal=str(self.prefix))
         child_prefixes = netaddr.IPSet([p.prefix for p in queryset])
         return int(float(child_prefixes.size) / self.prefix.size * 100)
@@ -421,6 +426,27 @@ class Prefix(ChangeLoggedModel, CustomFieldModel):
         max_length=200,
         blank=True
     )
+
+    # Cached hierarchy within the VRF (maintained by signals; see ipam.signals)
+    _depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    _children = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    _parent = models.ForeignKey(
+        to='self',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        blank=True,
+        null=True,
+        editable=False
+    )
+
     tags = TaggableManager(through=TaggedItem)
 
     objects = PrefixQuerySet.as_manager()
@@ -435,6 +461,20 @@ class Prefix(ChangeLoggedModel, CustomFieldModel):
     class Meta:
         ordering = (F('vrf').asc(nulls_first=True), 'prefix', 'pk')  # (vrf, prefix) may be non-unique
         verbose_name_plural = 'prefixes'
+        indexes = (
+            # Enables index lookups for parent and child prefixes (net_contains, net_contained, etc.)
+            GistIndex(fields=['prefix'], name='ipam_prefix_prefix_gist', opclasses=['inet_ops']),
+        )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Cache the original prefix and VRF so that we can detect a move within the hierarchy on save
+        self._original_prefix = self.__dict__.get('prefix')
+        self._original_vrf_id = self.__dict__.get('vrf_id')
+
+        # Set once a new Prefix has been added to the cached hierarchy (see ipam.utils.add_to_hierarchy())
+        self._hierarchy_updated = False
 
     def __str__(self):
         return str(self.prefix)
@@ -464,23 +504,49 @@ class Prefix(ChangeLoggedModel, CustomFieldModel):
                 })
 
             # Enforce unique IP space (if applicable)
-            if (self.vrf is None and settings.ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique):
-                duplicate_prefixes = self.get_duplicates()
-                if duplicate_prefixes:
-                    raise ValidationError({
-                        'prefix': "Duplicate prefix found in {}: {}".format(
-                            "VRF {}".format(self.vrf) if self.vrf else "global table",
-                            duplicate_prefixes.first(),
-                        )
-                    })
+            if self.get_duplicate_key() is not None:
+                self.validate_duplicates(self.get_duplicates())
 
-    def save(self, *args, **kwargs):
+    def get_duplicate_key(self):
+        """
+        Return a key shared by this Prefix and any duplicates of it, or None if duplicates are permitted. Used to find
+        duplicates among Prefixes created together.
+        """
+        if (self.vrf is None and settings.ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique):
+            return self.vrf_id, self.prefix.cidr
+        return None
 
+    def validate_duplicates(self, duplicates):
+        """
+        Raise a ValidationError if any duplicates of this Prefix exist.
+        """
+        if duplicates:
+            raise ValidationError({
+                'prefix': "Duplicate prefix found in {}: {}".format(
+                    "VRF {}".format(self.vrf) if self.vrf else "global table",
+                    duplicates[0],
+                )
+            })
+
+    def presave(self):
+        """
+        Normalize the prefix by clearing any host bits. Also invoked ahead of bulk creation.
+        """
         if isinstance(self.prefix, netaddr.IPNetwork):
 
             # Clear host bits from prefix
             self.prefix = self.prefix.cidr
 
+    @classmethod
+    def bulk_created(cls, instances):
+        """
+        Add Prefixes created using bulk_create() to the cached hierarchy together, before post_save is sent for each.
+        """
+        from .utils import add_to_hierarchy
+        add_to_hierarchy(instances)
+
+    def save(self, *args, **kwargs):
+        self.presave()
         super().save(*args, **kwargs)
 
     def to_csv(self):
@@ -548,33 +614,44 @@ class Prefix(ChangeLoggedModel, CustomFieldModel):
 
         return available_prefixes
 
-    def get_available_ips(self):
+    def get_available_ip_ranges(self):
         """
-        Return all available IPs within this prefix as an IPSet.
+        Yield each range of available IPs within the prefix as a (first, last) tuple of IPAddresses, in ascending order.
+        Ranges are computed by the database and fetched lazily (see IPAddressQuerySet.get_available_ranges()).
         """
-        prefix = netaddr.IPSet(self.prefix)
-        child_ips = netaddr.IPSet([ip.address.ip for ip in self.get_child_ips()])
-        available_ips = prefix - child_ips
-
-        # All IP addresses within a pool are considered usable
-        if self.is_pool:
-            return available_ips
-
-        # All IP addresses within a point-to-point prefix (IPv4 /31 or IPv6 /127) are considered usable
-        if (
-            self.prefix.version == 4 and self.prefix.prefixlen == 31  # RFC 3021
-        ) or (
-            self.prefix.version == 6 and self.prefix.prefixlen == 127  # RFC 6164
+        first_ip, last_ip = self.prefix.first, self.prefix.last
+
+        # All IP addresses within a pool or a point-to-point prefix (IPv4 /31 or IPv6 /127) are considered usable.
+        # Otherwise, omit the first and last IP address.
+        if not (
+            self.is_pool or
+            (self.prefix.version == 4 and self.prefix.prefixlen == 31) or  # RFC 3021
+            (self.prefix.version == 6 and self.prefix.prefixlen == 127)  # RFC 6164
         ):
-            return available_ips
+            first_ip += 1
+            last_ip -= 1
+        if first_ip > last_ip:
+            return iter(())
+
+        return self.get_child_ips().get_available_ranges(
+            netaddr.IPAddress(first_ip, self.prefix.version),
+            netaddr.IPAddress(last_ip, self.prefix.version)
+        )
 
-        # Omit first and last IP address from the available set
-        available_ips -= netaddr.IPSet([
-            netaddr.IPAddress(self.prefix.first),
-            netaddr.IPAddress(self.prefix.last),
-        ])
+    def iter_available_ips(self):
+        """
+        Yield each available IP within the prefix, in ascending order.
+        """
+        for first_ip, last_ip in self.get_available_ip_ranges():
+            yield from netaddr.iter_iprange(first_ip, last_ip)
 
-        return available_ips
+    def get_available_ips(self):
+        """
+        Return all available IPs within this prefix as an IPSet.
+        """
+        return netaddr.IPSet(
+            netaddr.IPRange(first_ip, last_ip) for first_ip, last_ip in self.get_available_ip_ranges()
+        )
 
     def get_first_available_prefix(self):
         """
@@ -589,16 +666,21 @@ class Prefix(ChangeLoggedModel, CustomFieldModel):
         """
         Return the first available IP within the prefix (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
+        available_ip = next(self.iter_available_ips(), None)
+        if available_ip is None:
             return None
-        return '{}/{}'.format(next(available_ips.__iter__()), self.prefix.prefixlen)
+        return '{}/{}'.format(available_ip, self.prefix.prefixlen)
 
     def get_utilization(self):
         """
         Determine the utilization of the prefix and return it as a percentage. For Prefixes with a status of
-        "container", calculate utilization based on child prefixes. For all others, count child IP addresses.
+        "container", calculate utilization based on child prefixes. For all others, count child IP addresses. If the
+        utilization has been annotated on the instance (see PrefixQuerySet.annotate_utilization()), that value is
+        returned instead.
         """
+        if getattr(self, 'utilization', None) is not None:
+            return self.utilization
+
         if self.status == PrefixStatusChoices.STATUS_CONTAINER:
             queryset = Prefix.objects.filter(
                 prefix__net_contained=str(self.prefix),
@@ -709,6 +791,12 @@ class IPAddress(ChangeLoggedModel, CustomFieldModel):
         ordering = ('address', 'pk')  # address may be non-unique
         verbose_name = 'IP address'
         verbose_name_plural = 'IP addresses'
+        indexes = (
+            # Enables index lookups for containing or contained networks (net_contains, net_contained, etc.). Lookups
+            # on the host portion of the address (net_host, net_host_contained) are served by the expression index
+            # ipam_ipaddress_host_gist, created in migration 0045.
+            GistIndex(fields=['address'], name='ipam_ipaddress_address_gist', opclasses=['inet_ops']),
+        )
 
     def __str__(self):
         return str(self.address)
@@ -734,18 +822,8 @@ class IPAddress(ChangeLoggedModel, CustomFieldModel):
                 })
 
             # Enforce unique IP space (if applicable)
-            if (self.vrf is None and settings.ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique):
-                duplicate_ips = self.get_duplicates()
-                if duplicate_ips and (
-                        self.role not in IPADDRESS_ROLES_NONUNIQUE or
-                        any(dip.role not in IPADDRESS_ROLES_NONUNIQUE for dip in duplicate_ips)
-                ):
-                    raise ValidationError({
-                        'address': "Duplicate IP address found in {}: {}".format(
-                            "VRF {}".format(self.vrf) if self.vrf else "global table",
-                            duplicate_ips.first(),
-                        )
-                    })
+            if self.get_duplicate_key() is not None:
+                self.validate_duplicates(self.get_duplicates())
 
         # Check for primary IP assignment that doesn't match the assigned device/VM
         if self.pk:
@@ -768,11 +846,40 @@ class IPAddress(ChangeLoggedModel, CustomFieldModel):
                 'status': "Only IPv6 addresses can be assigned SLAAC status"
             })
 
-    def save(self, *args, **kwargs):
+    def get_duplicate_key(self):
+        """
+        Return a key shared by this IPAddress and any duplicates of it, or None if duplicates are permitted. Used to
+        find duplicates among IPAddresses created together.
+        """
+        if (self.vrf is None and settings.ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique):
+            return self.vrf_id, self.address.ip
+        return None
 
+    def validate_duplicates(self, duplicates):
+        """
+        Raise a ValidationError if any duplicates of this IPAddress exist, unless all have roles which permit them
+        (e.g. VIP).
+        """
+        if duplicates and (
+                self.role not in IPADDRESS_ROLES_NONUNIQUE or
+                any(dip.role not in IPADDRESS_ROLES_NONUNIQUE for dip in duplicates)
+        ):
+            raise ValidationError({
+                'address': "Duplicate IP address found in {}: {}".format(
+                    "VRF {}".format(self.vrf) if self.vrf else "global table",
+                    duplicates[0],
+                )
+            })
+
+    def presave(self):
+        """
+        Apply any normalization required before the IP address is written to the database.
+        """
         # Force dns_name to lowercase
         self.dns_name = self.dns_name.lower()
 
+    def save(self, *args, **kwargs):
+        self.presave()
         super().save(*args, **kwargs)
 
     def to_objectchange(self, action):
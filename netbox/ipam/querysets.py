@@ -1,22 +1,149 @@
+import netaddr
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import F
+
 from utilities.querysets import RestrictedQuerySet
+from .choices import PrefixStatusChoices
+
+
+def _max_prefixlen_sql(column):
+    return f'(CASE FAMILY({column}) WHEN 4 THEN 32 ELSE 128 END)'
+
+
+def _prefix_size_sql(column):
+    return f'POWER(2::numeric, {_max_prefixlen_sql(column)} - MASKLEN({column}))'
+
+
+def _prefix_coverage_sql(condition):
+    """
+    Return SQL which sums the number of addresses covered by all prefixes matching the given condition, counting the
+    space of overlapping (nested or duplicate) prefixes only once. `condition` is a format string, the {alias} of which
+    is substituted with the alias of the ipam_prefix table being filtered.
+    """
+    child_size = _prefix_size_sql('C."prefix"')
+
+    return (
+        f'SELECT COALESCE(SUM({child_size}), 0) '
+        f'FROM (SELECT DISTINCT U0."prefix" FROM "ipam_prefix" U0 WHERE {condition.format(alias="U0")}) C '
+        f'WHERE NOT EXISTS ('
+        f'SELECT 1 FROM "ipam_prefix" U1 WHERE {condition.format(alias="U1")} AND U1."prefix" >> C."prefix"'
+        f')'
+    )
+
+
+class AggregateQuerySet(RestrictedQuerySet):
+
+    def annotate_utilization(self):
+        """
+        Annotate the utilization of each Aggregate as a percentage, calculated by the database in the same manner as
+        Aggregate.get_utilization().
+        """
+        coverage = _prefix_coverage_sql('{alias}."prefix" <<= "ipam_aggregate"."prefix"')
+        size = _prefix_size_sql('"ipam_aggregate"."prefix"')
+
+        return self.extra(
+            select={
+                'utilization': f'TRUNC(({coverage})::float8 / {size}::float8 * 100)::integer',
+            }
+        )
+
+
+class IPAddressQuerySet(RestrictedQuerySet):
+
+    def get_available_ranges(self, first, last):
+        """
+        Yield each range of addresses between `first` and `last` (inclusive) which is not occupied by the host portion
+        of any IPAddress in the queryset, as a (first, last) tuple of netaddr.IPAddress instances in ascending order.
+
+        The database sorts the unique host addresses and returns only the boundaries of the gaps between them. Rows are
+        read through a server-side cursor (where enabled), so only as many are fetched as the caller consumes.
+        """
+        version = first.version
+        first, last = int(first), int(last)
+        if first > last:
+            return
+
+        try:
+            hosts_sql, params = self.order_by().values('address').query.sql_with_params()
+        except EmptyResultSet:
+            yield netaddr.IPAddress(first, version), netaddr.IPAddress(last, version)
+            return
+        sql = (
+            f'SELECT HOST(host), HOST(next_host), is_first FROM ('
+            f'SELECT host, LEAD(host) OVER w AS next_host, LAG(host) OVER w IS NULL AS is_first '
+            f'FROM (SELECT DISTINCT CAST(HOST(U0."address") AS INET) AS host FROM ({hosts_sql}) U0) hosts '
+            f'WINDOW w AS (ORDER BY host)'
+            f') gaps '
+            f'WHERE is_first OR CASE WHEN next_host IS NULL THEN TRUE ELSE next_host > host + 1 END '
+            f'ORDER BY gaps.host'
+        )
+
+        connection = connections[self.db]
+        if connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+            cursor = connection.cursor()
+        else:
+            cursor = connection.chunked_cursor()
+
+        with cursor:
+            cursor.execute(sql, params)
+            found = False
+            for host, next_host, is_first in cursor:
+                found = True
+                host = int(netaddr.IPAddress(host))
+                gaps = [(host + 1, int(netaddr.IPAddress(next_host)) - 1 if next_host else last)]
+                if is_first:
+                    gaps.insert(0, (first, host - 1))
+                for gap_first, gap_last in gaps:
+                    gap_first, gap_last = max(gap_first, first), min(gap_last, last)
+                    if gap_first > last:
+                        return
+                    if gap_first <= gap_last:
+                        yield netaddr.IPAddress(gap_first, version), netaddr.IPAddress(gap_last, version)
+
+        if not found:
+            yield netaddr.IPAddress(first, version), netaddr.IPAddress(last, version)
 
 
 class PrefixQuerySet(RestrictedQuerySet):
 
     def annotate_tree(self):
         """
-        Annotate the number of parent and child prefixes for each Prefix. Raw SQL is needed for these subqueries
-        because we need to cast NULL VRF values to integers for comparison. (NULL != NULL).
+        Annotate the number of parent and child prefixes for each Prefix, as cached on the Prefix by
+        ipam.signals (or the rebuild_prefixes management command).
         """
+        return self.annotate(
+            parents=F('_depth'),
+            children=F('_children')
+        )
+
+    def annotate_utilization(self):
+        """
+        Annotate the utilization of each Prefix as a percentage, calculated by the database in the same manner as
+        Prefix.get_utilization(): Container prefixes count the address space covered by their child prefixes, and all
+        others count their unique child IP addresses (excluding the network and broadcast addresses of IPv4 prefixes
+        which are neither pools nor point-to-point).
+        """
+        coverage = _prefix_coverage_sql(
+            '{alias}."prefix" << "ipam_prefix"."prefix" '
+            'AND COALESCE({alias}."vrf_id", 0) = COALESCE("ipam_prefix"."vrf_id", 0)'
+        )
+        child_ips = (
+            'SELECT COUNT(DISTINCT HOST(U2."address")) FROM "ipam_ipaddress" U2 '
+            'WHERE CAST(HOST(U2."address") AS INET) << "ipam_prefix"."prefix" '
+            'AND COALESCE(U2."vrf_id", 0) = COALESCE("ipam_prefix"."vrf_id", 0)'
+        )
+        size = _prefix_size_sql('"ipam_prefix"."prefix"')
+        usable_size = (
+            f'({size} - CASE WHEN FAMILY("ipam_prefix"."prefix") = 4 AND MASKLEN("ipam_prefix"."prefix") < 31 '
+            f'AND NOT "ipam_prefix"."is_pool" THEN 2 ELSE 0 END)'
+        )
+
         return self.extra(
             select={
-                'parents': 'SELECT COUNT(U0."prefix") AS "c" '
-                           'FROM "ipam_prefix" U0 '
-                           'WHERE (U0."prefix" >> "ipam_prefix"."prefix" '
-                           'AND COALESCE(U0."vrf_id", 0) = COALESCE("ipam_prefix"."vrf_id", 0))',
-                'children': 'SELECT COUNT(U1."prefix") AS "c" '
-                            'FROM "ipam_prefix" U1 '
-                            'WHERE (U1."prefix" << "ipam_prefix"."prefix" '
-                            'AND COALESCE(U1."vrf_id", 0) = COALESCE("ipam_prefix"."vrf_id", 0))',
-            }
+                'utilization': f'TRUNC(CASE WHEN "ipam_prefix"."status" = %s '
+                               f'THEN ({coverage})::float8 / {size}::float8 '
+                               f'ELSE ({child_ips})::float8 / {usable_size}::float8 END * 100)::integer',
+            },
+            select_params=(PrefixStatusChoices.STATUS_CONTAINER,)
         )
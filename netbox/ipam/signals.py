@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Prefix
+from .utils import add_to_hierarchy, remove_from_hierarchy
+
+
+@receiver(post_save, sender=Prefix)
+def handle_prefix_saved(instance, created, **kwargs):
+    """
+    Add a new Prefix to the cached hierarchy (unless this has already been done, e.g. for Prefixes created in bulk), or
+    move a Prefix within the hierarchy if its prefix or VRF has changed.
+    """
+    moved = instance.prefix != instance._original_prefix or instance.vrf_id != instance._original_vrf_id
+    if created and not instance._hierarchy_updated:
+        add_to_hierarchy([instance])
+    elif moved and not created:
+        if instance._original_prefix is not None:
+            remove_from_hierarchy(instance.pk, instance._original_prefix, instance._original_vrf_id)
+        add_to_hierarchy([instance])
+
+    instance._original_prefix = instance.prefix
+    instance._original_vrf_id = instance.vrf_id
+
+
+@receiver(post_delete, sender=Prefix)
+def handle_prefix_deleted(instance, **kwargs):
+    """
+    Remove a deleted Prefix from the cached hierarchy.
+    """
+    remove_from_hierarchy(instance.pk, instance.prefix, instance.vrf_id)
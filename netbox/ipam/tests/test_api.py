@@ -1,10 +1,13 @@
 import json
 
+from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 from netaddr import IPNetwork
 from rest_framework import status
 
 from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
+from extras.choices import ObjectChangeActionChoices
+from extras.models import ObjectChange, Tag
 from ipam.choices import *
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, Role, RouteTarget, Service, VLAN, VLANGroup, VRF
 from utilities.testing import APITestCase, APIViewTestCases, disable_warnings
@@ -295,6 +298,48 @@ class PrefixTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 4)
 
+        # The new prefixes are added to the cached hierarchy
+        prefix.refresh_from_db()
+        self.assertEqual(prefix._children, 4)
+        for child in Prefix.objects.filter(pk__in=[p['id'] for p in response.data]):
+            self.assertEqual((child._depth, child._children, child._parent_id), (1, 0, prefix.pk))
+
+    def test_create_available_prefixes_changelog(self):
+        """
+        Test that prefixes created in bulk are recorded in the change log along with their tags.
+        """
+        prefix = Prefix.objects.create(prefix=IPNetwork('192.0.2.0/24'))
+        Prefix.objects.create(prefix=IPNetwork('192.0.2.0/26'))
+        tag = Tag.objects.create(name='Tag 1', slug='tag-1')
+        url = reverse('ipam-api:prefix-available-prefixes', kwargs={'pk': prefix.pk})
+        self.add_permissions('ipam.view_prefix', 'ipam.add_prefix')
+
+        data = [
+            {'prefix_length': 25, 'tags': [{'name': tag.name}]},
+            {'prefix_length': 27},
+            {'prefix_length': 27},
+        ]
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [p['prefix'] for p in response.data],
+            ['192.0.2.128/25', '192.0.2.64/27', '192.0.2.96/27']
+        )
+        self.assertEqual([t['name'] for t in response.data[0]['tags']], [tag.name])
+
+        objectchanges = ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_for_model(Prefix),
+            changed_object_id__in=[p['id'] for p in response.data]
+        )
+        self.assertEqual(objectchanges.count(), 3)
+        for objectchange in objectchanges:
+            self.assertEqual(objectchange.action, ObjectChangeActionChoices.ACTION_CREATE)
+            self.assertEqual(objectchange.user, self.user)
+        self.assertEqual(
+            objectchanges.get(changed_object_id=response.data[0]['id']).object_data['tags'],
+            [tag.name]
+        )
+
     def test_list_available_ips(self):
         """
         Test retrieval of all available IP addresses within a parent prefix.
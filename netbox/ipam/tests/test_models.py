@@ -4,6 +4,7 @@ from django.test import TestCase, override_settings
 
 from ipam.choices import IPAddressRoleChoices, PrefixStatusChoices
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, VLAN, VLANGroup, VRF
+from ipam.utils import rebuild_prefixes
 
 
 class TestAggregate(TestCase):
@@ -34,6 +35,30 @@ class TestAggregate(TestCase):
         ))
         self.assertEqual(aggregate.get_utilization(), 100)
 
+    def test_annotate_utilization(self):
+        rir = RIR.objects.create(name='RIR 1', slug='rir-1')
+        Aggregate.objects.bulk_create((
+            Aggregate(prefix=netaddr.IPNetwork('10.0.0.0/8'), rir=rir),
+            Aggregate(prefix=netaddr.IPNetwork('172.16.0.0/12'), rir=rir),
+            Aggregate(prefix=netaddr.IPNetwork('2001:db8::/32'), rir=rir),
+        ))
+        vrf = VRF.objects.create(name='VRF 1')
+        Prefix.objects.bulk_create((
+            # Nested and duplicate prefixes are counted only once
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/10')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/12')),
+            Prefix(prefix=netaddr.IPNetwork('10.64.0.0/12')),
+            Prefix(prefix=netaddr.IPNetwork('10.64.0.0/12'), vrf=vrf),
+            Prefix(prefix=netaddr.IPNetwork('2001:db8::/34')),
+        ))
+
+        for aggregate in Aggregate.objects.annotate_utilization():
+            self.assertEqual(aggregate.utilization, Aggregate.objects.get(pk=aggregate.pk).get_utilization())
+        self.assertListEqual(
+            list(Aggregate.objects.annotate_utilization().order_by('prefix').values_list('utilization', flat=True)),
+            [31, 0, 25]
+        )
+
 
 class TestPrefix(TestCase):
 
@@ -142,6 +167,39 @@ class TestPrefix(TestCase):
 
         self.assertEqual(available_ips, missing_ips)
 
+    def test_get_available_ip_ranges(self):
+
+        vrf = VRF.objects.create(name='VRF 1')
+        prefixes = Prefix.objects.bulk_create((
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/24')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.1.0/24'), is_pool=True),
+            Prefix(prefix=netaddr.IPNetwork('10.0.2.0/31')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.3.0/32')),
+            Prefix(prefix=netaddr.IPNetwork('2001:db8::/64')),
+        ))
+        IPAddress.objects.bulk_create((
+            # Duplicate IPs and IPs in other VRFs are ignored
+            IPAddress(address=netaddr.IPNetwork('10.0.0.0/24')),
+            IPAddress(address=netaddr.IPNetwork('10.0.0.10/24')),
+            IPAddress(address=netaddr.IPNetwork('10.0.0.10/32')),
+            IPAddress(address=netaddr.IPNetwork('10.0.0.11/24')),
+            IPAddress(address=netaddr.IPNetwork('10.0.0.20/24'), vrf=vrf),
+            IPAddress(address=netaddr.IPNetwork('10.0.0.254/24')),
+            IPAddress(address=netaddr.IPNetwork('10.0.1.255/24')),
+            IPAddress(address=netaddr.IPNetwork('10.0.2.1/31')),
+            IPAddress(address=netaddr.IPNetwork('2001:db8::1/64')),
+        ))
+
+        def ranges(prefix):
+            return [(str(first), str(last)) for first, last in prefix.get_available_ip_ranges()]
+
+        self.assertListEqual(ranges(prefixes[0]), [('10.0.0.1', '10.0.0.9'), ('10.0.0.12', '10.0.0.253')])
+        self.assertListEqual(ranges(prefixes[1]), [('10.0.1.0', '10.0.1.254')])
+        self.assertListEqual(ranges(prefixes[2]), [('10.0.2.0', '10.0.2.0')])
+        self.assertListEqual(ranges(prefixes[3]), [])
+        self.assertListEqual(ranges(prefixes[4]), [('2001:db8::2', '2001:db8::ffff:ffff:ffff:fffe')])
+        self.assertEqual(next(prefixes[4].iter_available_ips()), netaddr.IPAddress('2001:db8::2'))
+
     def test_get_first_available_prefix(self):
 
         prefixes = Prefix.objects.bulk_create((
@@ -190,6 +248,206 @@ class TestPrefix(TestCase):
         )
         self.assertEqual(prefix.get_utilization(), 12)  # ~= 12%
 
+    def test_annotate_utilization(self):
+        vrf = VRF.objects.create(name='VRF 1')
+        Prefix.objects.bulk_create((
+            # Containers
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/16'), status=PrefixStatusChoices.STATUS_CONTAINER),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/16'), vrf=vrf, status=PrefixStatusChoices.STATUS_CONTAINER),
+            Prefix(prefix=netaddr.IPNetwork('2001:db8::/48'), status=PrefixStatusChoices.STATUS_CONTAINER),
+            # Children (including nested and duplicate prefixes)
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/24')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/25')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.1.0/24')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.1.0/24'), vrf=vrf),
+            Prefix(prefix=netaddr.IPNetwork('10.0.2.0/24'), is_pool=True),
+            Prefix(prefix=netaddr.IPNetwork('10.0.3.0/31')),
+            Prefix(prefix=netaddr.IPNetwork('2001:db8::/64')),
+        ))
+        IPAddress.objects.bulk_create((
+            # Duplicate IPs are counted only once
+            *[IPAddress(address=netaddr.IPNetwork(f'10.0.0.{i}/24')) for i in range(1, 33)],
+            IPAddress(address=netaddr.IPNetwork('10.0.0.1/32')),
+            IPAddress(address=netaddr.IPNetwork('10.0.1.1/24'), vrf=vrf),
+            *[IPAddress(address=netaddr.IPNetwork(f'10.0.2.{i}/24')) for i in range(0, 64)],
+            IPAddress(address=netaddr.IPNetwork('10.0.3.0/31')),
+            IPAddress(address=netaddr.IPNetwork('2001:db8::1/64')),
+        ))
+
+        for prefix in Prefix.objects.annotate_utilization():
+            self.assertEqual(prefix.utilization, Prefix.objects.get(pk=prefix.pk).get_utilization())
+        self.assertDictEqual(
+            {
+                (str(p.prefix), p.vrf_id): p.utilization for p in Prefix.objects.annotate_utilization()
+                if p.status == PrefixStatusChoices.STATUS_CONTAINER or p.prefix.prefixlen < 25
+            },
+            {
+                ('10.0.0.0/16', None): 1,
+                ('10.0.0.0/16', vrf.pk): 0,
+                ('2001:db8::/48', None): 0,
+                ('10.0.0.0/24', None): 12,
+                ('10.0.1.0/24', None): 0,
+                ('10.0.1.0/24', vrf.pk): 0,
+                ('10.0.2.0/24', None): 25,
+            }
+        )
+
+    def assertHierarchy(self, expected):
+        """
+        Compare the cached (depth, children, parent) of each Prefix with those expected, keyed by (prefix, VRF ID).
+        """
+        prefixes = Prefix.objects.in_bulk()
+        self.assertDictEqual(
+            {
+                (str(p.prefix), p.vrf_id): (
+                    p._depth, p._children, str(prefixes[p._parent_id].prefix) if p._parent_id else None
+                ) for p in prefixes.values()
+            },
+            expected
+        )
+
+    def test_hierarchy(self):
+        vrf = VRF.objects.create(name='VRF 1')
+        for prefix, vrf_id in (
+            ('10.0.0.0/24', None),
+            ('10.0.0.0/8', None),
+            ('10.0.0.0/16', vrf.pk),
+            ('10.0.0.0/25', vrf.pk),
+            ('10.0.0.0/26', None),
+            ('10.0.0.0/16', None),
+        ):
+            Prefix.objects.create(prefix=netaddr.IPNetwork(prefix), vrf_id=vrf_id)
+        self.assertHierarchy({
+            ('10.0.0.0/8', None): (0, 3, None),
+            ('10.0.0.0/16', None): (1, 2, '10.0.0.0/8'),
+            ('10.0.0.0/24', None): (2, 1, '10.0.0.0/16'),
+            ('10.0.0.0/26', None): (3, 0, '10.0.0.0/24'),
+            ('10.0.0.0/16', vrf.pk): (0, 1, None),
+            ('10.0.0.0/25', vrf.pk): (1, 0, '10.0.0.0/16'),
+        })
+
+        # Move a prefix to a different VRF
+        prefix = Prefix.objects.get(prefix='10.0.0.0/24')
+        prefix.vrf = vrf
+        prefix.save()
+        self.assertHierarchy({
+            ('10.0.0.0/8', None): (0, 2, None),
+            ('10.0.0.0/16', None): (1, 1, '10.0.0.0/8'),
+            ('10.0.0.0/26', None): (2, 0, '10.0.0.0/16'),
+            ('10.0.0.0/16', vrf.pk): (0, 2, None),
+            ('10.0.0.0/24', vrf.pk): (1, 1, '10.0.0.0/16'),
+            ('10.0.0.0/25', vrf.pk): (2, 0, '10.0.0.0/24'),
+        })
+
+        # Change a prefix
+        prefix.prefix = netaddr.IPNetwork('10.0.0.0/30')
+        prefix.save()
+        self.assertHierarchy({
+            ('10.0.0.0/8', None): (0, 2, None),
+            ('10.0.0.0/16', None): (1, 1, '10.0.0.0/8'),
+            ('10.0.0.0/26', None): (2, 0, '10.0.0.0/16'),
+            ('10.0.0.0/16', vrf.pk): (0, 2, None),
+            ('10.0.0.0/25', vrf.pk): (1, 1, '10.0.0.0/16'),
+            ('10.0.0.0/30', vrf.pk): (2, 0, '10.0.0.0/25'),
+        })
+
+        # Delete a prefix
+        Prefix.objects.get(prefix='10.0.0.0/16', vrf__isnull=True).delete()
+        self.assertHierarchy({
+            ('10.0.0.0/8', None): (0, 1, None),
+            ('10.0.0.0/26', None): (1, 0, '10.0.0.0/8'),
+            ('10.0.0.0/16', vrf.pk): (0, 2, None),
+            ('10.0.0.0/25', vrf.pk): (1, 1, '10.0.0.0/16'),
+            ('10.0.0.0/30', vrf.pk): (2, 0, '10.0.0.0/25'),
+        })
+
+    def test_hierarchy_duplicates(self):
+        prefixes = [
+            Prefix.objects.create(prefix=netaddr.IPNetwork(prefix))
+            for prefix in ('10.0.0.0/16', '10.0.0.0/16', '10.0.0.0/24', '10.0.0.0/24', '10.0.1.0/24')
+        ]
+        expected = {
+            prefixes[0].pk: (0, 3, None),
+            prefixes[1].pk: (0, 3, None),
+            prefixes[2].pk: (2, 0, prefixes[0].pk),
+            prefixes[3].pk: (2, 0, prefixes[0].pk),
+            prefixes[4].pk: (2, 0, prefixes[0].pk),
+        }
+        self.assertDictEqual(
+            {p.pk: (p._depth, p._children, p._parent_id) for p in Prefix.objects.all()},
+            expected
+        )
+
+        # Rebuilding should find nothing to change, and restore a corrupted hierarchy
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+        Prefix.objects.update(_depth=0, _children=0, _parent=None)
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 5)
+        self.assertDictEqual(
+            {p.pk: (p._depth, p._children, p._parent_id) for p in Prefix.objects.all()},
+            expected
+        )
+
+        # Deleting the first of two duplicates reassigns its children to the other
+        prefixes[0].delete()
+        self.assertDictEqual(
+            {p.pk: (p._depth, p._children, p._parent_id) for p in Prefix.objects.all()},
+            {
+                prefixes[1].pk: (0, 3, None),
+                prefixes[2].pk: (1, 0, prefixes[1].pk),
+                prefixes[3].pk: (1, 0, prefixes[1].pk),
+                prefixes[4].pk: (1, 0, prefixes[1].pk),
+            }
+        )
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+    def test_hierarchy_incremental(self):
+        # Changes to the hierarchy are applied incrementally, yielding the same result as rebuilding it
+        vrf = VRF.objects.create(name='VRF 1')
+        prefixes = [
+            Prefix.objects.create(prefix=netaddr.IPNetwork(prefix))
+            for prefix in ('10.1.0.0/24', '10.0.0.0/24', '10.0.0.0/16', '10.0.0.0/8', '10.0.0.0/24', '10.0.0.128/25')
+        ]
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+        prefixes[2].prefix = netaddr.IPNetwork('10.0.0.0/12')
+        prefixes[2].save()
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+        prefixes[1].vrf = vrf
+        prefixes[1].save()
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+        prefixes[3].delete()
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+        # Creating a prefix queries its relatives once and adjusts their counts using a single update (along with the
+        # queries made to invalidate those cached), regardless of the number of prefixes
+        with self.assertNumQueries(8):
+            Prefix.objects.create(prefix=netaddr.IPNetwork('10.0.0.0/28'))
+        self.assertEqual(rebuild_prefixes(Prefix.objects.all()), 0)
+
+    def test_rebuild_prefixes(self):
+        vrf = VRF.objects.create(name='VRF 1')
+        for prefix, vrf_id in (
+            ('10.0.0.0/8', None),
+            ('10.0.0.0/16', None),
+            ('10.1.0.0/16', None),
+            ('10.1.0.0/24', None),
+            ('10.0.0.0/16', vrf.pk),
+            ('10.0.0.0/24', vrf.pk),
+            ('2001:db8::/32', None),
+            ('2001:db8::/48', None),
+        ):
+            Prefix.objects.create(prefix=netaddr.IPNetwork(prefix), vrf_id=vrf_id)
+        expected = {p.pk: (p._depth, p._children, p._parent_id) for p in Prefix.objects.all()}
+
+        Prefix.objects.update(_depth=0, _children=0, _parent=None)
+        rebuild_prefixes(Prefix.objects.all())
+        self.assertDictEqual(
+            {p.pk: (p._depth, p._children, p._parent_id) for p in Prefix.objects.all()},
+            expected
+        )
+
     #
     # Uniqueness enforcement tests
     #
@@ -0,0 +1,80 @@
+import netaddr
+from django.db import connection
+from django.test import TestCase
+
+from ipam.choices import PrefixStatusChoices
+from ipam.models import Prefix, VRF
+from ipam.utils import PrefixAllocator, _prefix_lock_id, prefix_advisory_lock
+from utilities.constants import ADVISORY_LOCK_KEYS
+
+
+class PrefixAllocatorTestCase(TestCase):
+
+    def test_allocate(self):
+        available_prefixes = netaddr.IPSet(['10.0.0.0/24']) - netaddr.IPSet(['10.0.0.64/26', '10.0.0.192/27'])
+        allocator = PrefixAllocator(available_prefixes)
+
+        allocated = [allocator.allocate(length) for length in (28, 26, 26, 27, 30, 25)]
+        self.assertEqual(
+            [str(p) if p else None for p in allocated],
+            ['10.0.0.0/28', '10.0.0.128/26', None, '10.0.0.32/27', '10.0.0.16/30', None]
+        )
+
+    def test_allocate_matches_first_fit(self):
+        """
+        Allocations should match those of a linear scan of the available CIDRs, removing each allocation in turn.
+        """
+        available_prefixes = netaddr.IPSet(['2001:db8::/48']) - netaddr.IPSet(['2001:db8:0:8::/61', '2001:db8:1::/52'])
+        allocator = PrefixAllocator(available_prefixes.copy())
+
+        for length in [64, 62, 64, 56, 60] * 20:
+            expected = next(
+                ('{}/{}'.format(cidr.network, length) for cidr in available_prefixes.iter_cidrs() if cidr.prefixlen <= length),
+                None
+            )
+            allocated = allocator.allocate(length)
+            self.assertEqual(str(allocated) if allocated else None, expected)
+            if expected:
+                available_prefixes.remove(expected)
+
+
+class PrefixAdvisoryLockTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vrf = VRF.objects.create(name='VRF 1')
+        Prefix.objects.bulk_create((
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/8'), status=PrefixStatusChoices.STATUS_CONTAINER),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/16')),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/16'), vrf=cls.vrf),
+            Prefix(prefix=netaddr.IPNetwork('10.0.0.0/24'), vrf=cls.vrf),
+            Prefix(prefix=netaddr.IPNetwork('10.0.1.0/24'), vrf=cls.vrf),
+        ))
+
+    def get_advisory_locks(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT classid::integer, objid::integer, mode FROM pg_locks "
+                "WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+            )
+            return {
+                # Reassemble the signed 32-bit key from its unsigned representation
+                ((classid, objid - 2 ** 32 if objid >= 2 ** 31 else objid), mode)
+                for classid, objid, mode in cursor.fetchall()
+            }
+
+    def test_prefix_advisory_lock(self):
+        namespace = ADVISORY_LOCK_KEYS['available-ips']
+        prefix = Prefix.objects.get(prefix='10.0.0.0/24')
+
+        with prefix_advisory_lock(prefix, namespace):
+            locks = self.get_advisory_locks()
+        self.assertSetEqual(self.get_advisory_locks(), set())
+
+        # Shared locks on the parent prefix in the same VRF and the global container (but not the global /16), and an
+        # exclusive lock on the prefix itself
+        self.assertSetEqual(locks, {
+            (_prefix_lock_id(namespace, None, netaddr.IPNetwork('10.0.0.0/8')), 'ShareLock'),
+            (_prefix_lock_id(namespace, self.vrf.pk, netaddr.IPNetwork('10.0.0.0/16')), 'ShareLock'),
+            (_prefix_lock_id(namespace, self.vrf.pk, netaddr.IPNetwork('10.0.0.0/24')), 'ExclusiveLock'),
+        })
@@ -1,8 +1,273 @@
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from heapq import heappop, heappush
+from zlib import crc32
+
 import netaddr
+from cacheops import invalidate_model, invalidate_obj
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django_pglocks import advisory_lock
 
+from .choices import PrefixStatusChoices
 from .constants import *
 from .models import Prefix, VLAN
 
+# Hierarchy updates affecting more than this number of existing Prefixes invalidate all cached Prefixes, rather than
+# fetching and invalidating each one
+HIERARCHY_INVALIDATION_LIMIT = 100
+
+
+def _prefix_lock_id(namespace, vrf_id, prefix):
+    """
+    Return a two-integer advisory lock ID for the given VRF ID and prefix within a namespace (one of
+    ADVISORY_LOCK_KEYS). The second integer is a signed 32-bit hash of the VRF and prefix.
+    """
+    key = crc32('{}:{}'.format(vrf_id or 0, prefix.cidr).encode('utf-8'))
+    return namespace, key - 2 ** 32 if key >= 2 ** 31 else key
+
+
+@contextmanager
+def prefix_advisory_lock(prefix, namespace):
+    """
+    Hold PostgreSQL advisory locks scoped to the given Prefix and its VRF for the duration of the context, so that
+    allocations from unrelated prefixes may proceed in parallel.
+
+    An exclusive lock is taken on the prefix itself, along with shared locks on each of its existing parent prefixes
+    (in the same VRF, or global containers). Thus, allocations from sibling prefixes do not block one another, but an
+    allocation from a prefix waits for any allocation from a prefix nested within it (and vice versa). Locks are
+    acquired in order of prefix length to avoid deadlocks.
+    """
+    parents = Prefix.objects.filter(
+        Q(vrf=prefix.vrf) | Q(vrf__isnull=True, status=PrefixStatusChoices.STATUS_CONTAINER),
+        prefix__net_contains=str(prefix.prefix)
+    ).values_list('vrf_id', 'prefix')
+    lock_ids = sorted({
+        (parent.prefixlen, _prefix_lock_id(namespace, vrf_id, parent)) for vrf_id, parent in parents
+    })
+
+    with ExitStack() as stack:
+        for _, lock_id in lock_ids:
+            stack.enter_context(advisory_lock(lock_id, shared=True))
+        stack.enter_context(advisory_lock(_prefix_lock_id(namespace, prefix.vrf_id, prefix.prefix)))
+        yield
+
+
+class PrefixAllocator:
+    """
+    Allocate child prefixes from the available space within a parent prefix. Available space is held as buddy-style
+    free lists: for each prefix length, a heap of the free CIDR blocks of that length. Each allocation takes the
+    lowest-addressed block large enough to hold the requested prefix (as a scan of IPSet.iter_cidrs() would) and
+    returns the unused halves of that block to the free lists, so a batch of k allocations costs O(k log n).
+
+    :param available_prefixes: An IPSet of the available space (e.g. from Prefix.get_available_prefixes())
+    """
+    def __init__(self, available_prefixes):
+        self.free_blocks = defaultdict(list)
+        self.version = None
+
+        for cidr in available_prefixes.iter_cidrs():
+            heappush(self.free_blocks[cidr.prefixlen], cidr.value)
+            self.version = cidr.version
+
+    def allocate(self, prefix_length):
+        """
+        Allocate and return an IPNetwork of the given prefix length, or None if no space is available.
+        """
+        candidates = [
+            (heap[0], length) for length, heap in self.free_blocks.items() if length <= prefix_length and heap
+        ]
+        if not candidates:
+            return None
+        network, length = min(candidates)
+        heappop(self.free_blocks[length])
+        max_length = 32 if self.version == 4 else 128
+
+        # Split the block, freeing the upper half at each step, until it matches the requested length
+        while length < prefix_length:
+            length += 1
+            heappush(self.free_blocks[length], network + 2 ** (max_length - length))
+
+        return netaddr.IPNetwork((network, prefix_length), version=self.version)
+
+
+def rebuild_prefixes(queryset, batch_size=1000):
+    """
+    Recalculate the cached hierarchy (_depth, _children, and _parent) of all Prefixes in the given queryset, relative
+    to the other Prefixes in the queryset, and save any which have changed. Returns the number of Prefixes updated.
+
+    Prefixes are sorted by VRF, address, and mask length, so that every parent precedes its children, and swept in a
+    single pass which tracks the current chain of parents on a stack. Duplicate prefixes share one stack entry: they
+    count as parents of one another's children, but not of one another.
+    """
+    prefixes = sorted(
+        queryset.values_list('pk', 'vrf_id', 'prefix', '_depth', '_children', '_parent_id'),
+        key=lambda p: (p[1] or 0, p[2].version, p[2].value, p[2].prefixlen, p[0])
+    )
+
+    # pk -> [depth, children, parent]
+    hierarchy = {}
+    # Each entry is [vrf_id, prefix, member pks, position of first member]
+    stack = []
+    depth = 0
+
+    def pop():
+        nonlocal depth
+        _, _, members, start = stack.pop()
+        children = position - start - len(members)
+        for pk in members:
+            hierarchy[pk][1] = children
+        depth -= len(members)
+
+    for position, (pk, vrf_id, prefix, *_) in enumerate(prefixes):
+        while stack and (stack[-1][0] != vrf_id or prefix not in stack[-1][1]):
+            pop()
+        if stack and stack[-1][1] == prefix:
+            # Duplicate prefix
+            stack[-1][2].append(pk)
+            hierarchy[pk] = [depth - len(stack[-1][2]) + 1, 0, hierarchy[stack[-1][2][0]][2]]
+        else:
+            hierarchy[pk] = [depth, 0, stack[-1][2][0] if stack else None]
+            stack.append([vrf_id, prefix, [pk], position])
+        depth += 1
+    position = len(prefixes)
+    while stack:
+        pop()
+
+    # Save only the Prefixes which have changed
+    model = queryset.model
+    updated = [
+        model(pk=pk, _depth=hierarchy[pk][0], _children=hierarchy[pk][1], _parent_id=hierarchy[pk][2])
+        for pk, _, _, *cached in prefixes if cached != hierarchy[pk]
+    ]
+    model.objects.bulk_update(updated, ['_depth', '_children', '_parent'], batch_size=batch_size)
+
+    return len(updated)
+
+
+def _is_within(network, other):
+    """
+    Return True if the network is strictly contained by the other network.
+    """
+    return network.prefixlen > other.prefixlen and network in other
+
+
+def _closeness(row):
+    # The immediate parent of a Prefix is its most specific container (the first created, among duplicates)
+    pk, network = row[:2]
+    return network.prefixlen, -pk
+
+
+def _get_related_prefixes(vrf_id, networks, exclude):
+    """
+    Return the (pk, prefix, parent ID) of each Prefix in the VRF which contains, equals, or is contained by any of the
+    given networks, excluding the given PKs.
+    """
+    query = Q()
+    for network in networks:
+        query |= Q(prefix__net_contains_or_equals=str(network)) | Q(prefix__net_contained=str(network))
+    return list(
+        Prefix.objects.filter(query, vrf_id=vrf_id).exclude(pk__in=exclude).order_by().values_list(
+            'pk', 'prefix', '_parent_id'
+        )
+    )
+
+
+def _update_prefixes(pks, **kwargs):
+    """
+    Update the given Prefixes and invalidate any cached queries which may include them.
+    """
+    if not pks:
+        return
+    queryset = Prefix.objects.filter(pk__in=pks)
+    if len(pks) <= HIERARCHY_INVALIDATION_LIMIT:
+        queryset.invalidated_update(**kwargs)
+    else:
+        queryset.update(**kwargs)
+        invalidate_model(Prefix)
+
+
+def add_to_hierarchy(prefixes):
+    """
+    Add the given new (or moved) Prefixes to the cached hierarchy. The depth, children, and parent of the Prefixes
+    related to them are adjusted incrementally (using one query for each distinct adjustment), and those of the given
+    Prefixes are calculated from their relatives.
+    """
+    by_vrf = defaultdict(list)
+    for prefix in prefixes:
+        by_vrf[prefix.vrf_id].append(prefix)
+
+    for vrf_id, new_prefixes in by_vrf.items():
+        new_rows = [(p.pk, netaddr.IPNetwork(p.prefix)) for p in new_prefixes]
+        related = _get_related_prefixes(vrf_id, [network for _, network in new_rows], [pk for pk, _ in new_rows])
+        related_by_pk = {row[0]: row for row in related}
+
+        # Count the new Prefixes containing and contained by each related Prefix, and reassign those whose immediate
+        # parent is now a new Prefix
+        adjustments = defaultdict(list)
+        new_parents = defaultdict(list)
+        for pk, network, parent_id in related:
+            containers = [row for row in new_rows if _is_within(network, row[1])]
+            children = sum(_is_within(row[1], network) for row in new_rows)
+            if containers or children:
+                adjustments[(len(containers), children)].append(pk)
+            if containers:
+                closest = max(containers, key=_closeness)
+                parent = related_by_pk.get(parent_id)
+                if parent is None or _closeness(closest) > _closeness(parent):
+                    new_parents[closest[0]].append(pk)
+
+        for (depth, children), pks in adjustments.items():
+            counts = {}
+            if depth:
+                counts['_depth'] = F('_depth') + depth
+            if children:
+                counts['_children'] = F('_children') + children
+            _update_prefixes(pks, **counts)
+        for parent_id, pks in new_parents.items():
+            _update_prefixes(pks, _parent_id=parent_id)
+
+        # Set the hierarchy of the new Prefixes
+        all_rows = [row[:2] for row in related] + new_rows
+        hierarchy = defaultdict(list)
+        for prefix, (pk, network) in zip(new_prefixes, new_rows):
+            parents = [row for row in all_rows if _is_within(network, row[1])]
+            prefix._depth = len(parents)
+            prefix._children = sum(_is_within(row[1], network) for row in all_rows)
+            prefix._parent_id = max(parents, key=_closeness)[0] if parents else None
+            prefix._hierarchy_updated = True
+            hierarchy[(prefix._depth, prefix._children, prefix._parent_id)].append(pk)
+
+        for (depth, children, parent_id), pks in hierarchy.items():
+            Prefix.objects.filter(pk__in=pks).update(_depth=depth, _children=children, _parent_id=parent_id)
+        for prefix in new_prefixes:
+            invalidate_obj(prefix)
+
+
+def remove_from_hierarchy(pk, prefix, vrf_id):
+    """
+    Remove a deleted (or moved) Prefix from the cached hierarchy at its former prefix and VRF, adjusting the depth,
+    children, and parent of its relatives incrementally.
+    """
+    network = netaddr.IPNetwork(prefix)
+    related = _get_related_prefixes(vrf_id, [network], [pk])
+    parents = [row for row in related if _is_within(network, row[1])]
+    duplicates = [row for row in related if row[1] == network]
+    children = [row for row in related if _is_within(row[1], network)]
+
+    # Counts are never decremented below zero, should the hierarchy be out of date (e.g. for Prefixes created using
+    # bulk_create()); the rebuild_prefixes management command recalculates it
+    _update_prefixes([row[0] for row in parents], _children=Greatest(F('_children') - 1, 0))
+    _update_prefixes([row[0] for row in children], _depth=Greatest(F('_depth') - 1, 0))
+
+    # Reassign the immediate children of the Prefix (whose parent has been nullified, if it was deleted) to its first
+    # duplicate, if any, or else to its own parent
+    if duplicates:
+        new_parent_id = min(row[0] for row in duplicates)
+    else:
+        new_parent_id = max(parents, key=_closeness)[0] if parents else None
+    _update_prefixes([row[0] for row in children if row[2] in (pk, None)], _parent_id=new_parent_id)
+
 
 def add_available_prefixes(parent, prefix_list):
     """
@@ -23,12 +288,10 @@ def add_available_prefixes(parent, prefix_list):
 def add_available_ipaddresses(prefix, ipaddress_list, is_pool=False):
     """
     Annotate ranges of available IP addresses within a given prefix. If is_pool is True, the first and last IP will be
-    considered usable (regardless of mask length).
+    considered usable (regardless of mask length). `ipaddress_list` must be an IPAddress queryset ordered by address;
+    the available ranges are computed from it by the database.
     """
 
-    output = []
-    prev_ip = None
-
     # Ignore the network and broadcast addresses for non-pool IPv4 prefixes larger than /31.
     if prefix.version == 4 and prefix.prefixlen < 31 and not is_pool:
         first_ip_in_prefix = netaddr.IPAddress(prefix.first + 1)
@@ -37,33 +300,20 @@ def add_available_ipaddresses(prefix, ipaddress_list, is_pool=False):
         first_ip_in_prefix = netaddr.IPAddress(prefix.first)
         last_ip_in_prefix = netaddr.IPAddress(prefix.last)
 
-    if not ipaddress_list:
-        return [(
-            int(last_ip_in_prefix - first_ip_in_prefix + 1),
-            '{}/{}'.format(first_ip_in_prefix, prefix.prefixlen)
-        )]
-
-    # Account for any available IPs before the first real IP
-    if ipaddress_list[0].address.ip > first_ip_in_prefix:
-        skipped_count = int(ipaddress_list[0].address.ip - first_ip_in_prefix)
-        first_skipped = '{}/{}'.format(first_ip_in_prefix, prefix.prefixlen)
-        output.append((skipped_count, first_skipped))
+    available_ranges = [
+        (int(last_ip - first_ip + 1), '{}/{}'.format(first_ip, prefix.prefixlen), first_ip)
+        for first_ip, last_ip in ipaddress_list.get_available_ranges(first_ip_in_prefix, last_ip_in_prefix)
+    ]
+    available_ranges.reverse()
 
-    # Iterate through existing IPs and annotate free ranges
+    # Interleave the available ranges with the existing IPs
+    output = []
     for ip in ipaddress_list:
-        if prev_ip:
-            diff = int(ip.address.ip - prev_ip.address.ip)
-            if diff > 1:
-                first_skipped = '{}/{}'.format(prev_ip.address.ip + 1, prefix.prefixlen)
-                output.append((diff - 1, first_skipped))
+        while available_ranges and available_ranges[-1][2] < ip.address.ip:
+            output.append(available_ranges.pop()[:2])
         output.append(ip)
-        prev_ip = ip
-
-    # Include any remaining available IPs
-    if prev_ip.address.ip < last_ip_in_prefix:
-        skipped_count = int(last_ip_in_prefix - prev_ip.address.ip)
-        first_skipped = '{}/{}'.format(prev_ip.address.ip + 1, prefix.prefixlen)
-        output.append((skipped_count, first_skipped))
+    while available_ranges:
+        output.append(available_ranges.pop()[:2])
 
     return output
 
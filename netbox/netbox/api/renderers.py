@@ -1,4 +1,4 @@
-from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 
 
 class FormlessBrowsableAPIRenderer(BrowsableAPIRenderer):
@@ -10,3 +10,15 @@ class FormlessBrowsableAPIRenderer(BrowsableAPIRenderer):
 
     def get_filter_form(self, data, view, request):
         return None
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    Render newline-delimited JSON. Views which stream NDJSON return their own responses; this renderer allows clients
+    to request the format, and renders any other response (such as an error) as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context) + b'\n'
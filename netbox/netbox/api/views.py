@@ -20,6 +20,7 @@ from netbox.api import BulkOperationSerializer
 from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
 from netbox.api.exceptions import SerializerNotFound
 from utilities.api import get_serializer_for_model
+from utilities.permissions import get_permitted_objects
 
 HTTP_ACTIONS = {
     'GET': 'view',
@@ -175,6 +176,8 @@ class ModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ModelViewSet_):
         # Restrict the view's QuerySet to allow only the permitted objects
         action = HTTP_ACTIONS[request.method]
         if action:
+            self.permission_action = action
+            self.base_queryset = self.queryset
             self.queryset = self.queryset.restrict(request.user, action)
 
     def dispatch(self, request, *args, **kwargs):
@@ -199,14 +202,19 @@ class ModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ModelViewSet_):
         Check that the provided instance or list of instances are matched by the current queryset. This confirms that
         any newly created or modified objects abide by the attributes granted by any applicable ObjectPermissions.
         """
-        if type(instance) is list:
-            # Check that all instances are still included in the view's queryset
-            conforming_count = self.queryset.filter(pk__in=[obj.pk for obj in instance]).count()
-            if conforming_count != len(instance):
-                raise ObjectDoesNotExist
+        instances = instance if type(instance) is list else [instance]
+
+        if hasattr(self, 'permission_action'):
+            # Check that all instances are still included in the view's queryset, querying the database only if the
+            # applicable constraints cannot be evaluated against the instances themselves
+            conforming_count = len(get_permitted_objects(
+                self.request.user, self.permission_action, instances, queryset=self.base_queryset
+            ))
         else:
-            # Check that the instance is matched by the view's queryset
-            self.queryset.get(pk=instance.pk)
+            conforming_count = self.queryset.filter(pk__in=[obj.pk for obj in instances]).count()
+
+        if conforming_count != len(instances):
+            raise ObjectDoesNotExist
 
     def perform_create(self, serializer):
         model = self.queryset.model
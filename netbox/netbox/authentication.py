@@ -1,14 +1,20 @@
 import logging
+import pickle
 from collections import defaultdict
 
+from cacheops.redis import redis_client
 from django.conf import settings
 from django.contrib.auth.backends import ModelBackend, RemoteUserBackend as _RemoteUserBackend
 from django.contrib.auth.models import Group
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Q
+from redis.exceptions import RedisError
 
 from users.models import ObjectPermission
-from utilities.permissions import permission_is_exempt, resolve_permission, resolve_permission_ct
+from utilities.permissions import (
+    compile_constraints, get_permissions_version, get_permitted_objects, permission_is_exempt, resolve_permission,
+    resolve_permission_ct,
+)
 
 
 class ObjectPermissionBackend(ModelBackend):
@@ -17,12 +23,39 @@ class ObjectPermissionBackend(ModelBackend):
         if not user_obj.is_active or user_obj.is_anonymous:
             return dict()
         if not hasattr(user_obj, '_object_perm_cache'):
-            user_obj._object_perm_cache = self.get_object_permissions(user_obj)
+            user_obj._object_perm_cache = self.get_cached_object_permissions(user_obj)
         return user_obj._object_perm_cache
 
+    def get_cached_object_permissions(self, user_obj):
+        """
+        Return the permissions granted to the user by an ObjectPermission, from the cache if possible. Cached
+        permissions are invalidated by incrementing the permissions version whenever a user's permissions may have
+        changed.
+        """
+        if not settings.CACHEOPS_ENABLED:
+            return self.get_object_permissions(user_obj)
+
+        cache_key = f'netbox:permissions:user:{user_obj.pk}'
+        try:
+            version = get_permissions_version()
+            cached = redis_client.get(cache_key)
+            if cached is not None:
+                cached_version, perms = pickle.loads(cached)
+                if cached_version == version:
+                    return perms
+
+            perms = self.get_object_permissions(user_obj)
+            redis_client.set(cache_key, pickle.dumps((version, perms), -1), ex=settings.CACHE_TIMEOUT)
+        except RedisError as e:
+            logging.getLogger('netbox.authentication').warning(f"Unable to cache permissions: {e}")
+            perms = self.get_object_permissions(user_obj)
+
+        return perms
+
     def get_object_permissions(self, user_obj):
         """
-        Return all permissions granted to the user by an ObjectPermission.
+        Return all permissions granted to the user by an ObjectPermission, mapped to a Q object matching the objects
+        to which each applies.
         """
         # Retrieve all assigned and enabled ObjectPermissions
         object_permissions = ObjectPermission.objects.filter(
@@ -38,7 +71,10 @@ class ObjectPermissionBackend(ModelBackend):
                     perm_name = f"{object_type.app_label}.{action}_{object_type.model}"
                     perms[perm_name].extend(obj_perm.list_constraints())
 
-        return perms
+        # Compile the constraints for each permission
+        return {
+            perm_name: compile_constraints(constraint_sets) for perm_name, constraint_sets in perms.items()
+        }
 
     def has_perm(self, user_obj, perm, obj=None):
         app_label, action, model_name = resolve_permission(perm)
@@ -69,21 +105,10 @@ class ObjectPermissionBackend(ModelBackend):
         if model._meta.label_lower != '.'.join((app_label, model_name)):
             raise ValueError(f"Invalid permission {perm} for model {model}")
 
-        # Compile a query filter that matches all instances of the specified model
-        obj_perm_constraints = self.get_all_permissions(user_obj)[perm]
-        constraints = Q()
-        for perm_constraints in obj_perm_constraints:
-            if perm_constraints:
-                constraints |= Q(**perm_constraints)
-            else:
-                # Found ObjectPermission with null constraints; allow model-level access
-                constraints = Q()
-                break
-
         # Permission to perform the requested action on the object depends on whether the specified object matches
-        # the specified constraints. Note that this check is made against the *database* record representing the object,
-        # not the instance itself.
-        return model.objects.filter(constraints, pk=obj.pk).exists()
+        # the specified constraints. Simple constraints are evaluated against the instance itself; otherwise, the check
+        # is made against the *database* record representing the object.
+        return bool(get_permitted_objects(user_obj, action, [obj]))
 
 
 class RemoteUserBackend(_RemoteUserBackend):
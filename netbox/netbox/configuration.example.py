@@ -71,6 +71,10 @@ ALLOWED_URL_SCHEMES = (
     'file', 'ftp', 'ftps', 'http', 'https', 'irc', 'mailto', 'sftp', 'ssh', 'tel', 'telnet', 'tftp', 'vnc', 'xmpp',
 )
 
+# Set to True to recalculate cable paths in a background task (via the RQ worker) rather than during the request which
+# modified the cable(s). Affected paths are flagged as pending until they have been recalculated.
+ASYNC_CABLE_PATHS = False
+
 # Optionally display a persistent banner at the top and/or bottom of every page. HTML is allowed. To display the same
 # content in both banners, define BANNER_TOP and set BANNER_BOTTOM = BANNER_TOP.
 BANNER_TOP = ''
@@ -83,6 +87,10 @@ BANNER_LOGIN = ''
 # BASE_PATH = 'netbox/'
 BASE_PATH = ''
 
+# Bulk edit and delete operations on at least this many objects are performed as background jobs by the RQ worker,
+# rather than within the request. Set to None to always perform them within the request. (Default: None)
+BULK_JOB_THRESHOLD = None
+
 # Cache timeout in seconds. Set to 0 to dissable caching. Defaults to 900 (15 minutes)
 CACHE_TIMEOUT = 900
 
@@ -206,6 +214,14 @@ PLUGINS = []
 # prefer IPv4 instead.
 PREFER_IPV4 = False
 
+# Record the database queries, cache reads and rendering time of each request, exported as Prometheus metrics. The
+# profiles of requests taking at least PROFILING_SLOW_REQUEST_THRESHOLD seconds are retained (up to
+# PROFILING_SLOW_REQUEST_COUNT per process, sampled at PROFILING_SLOW_REQUEST_SAMPLE_RATE) for review by staff users.
+PROFILING_ENABLED = False
+PROFILING_SLOW_REQUEST_COUNT = 100
+PROFILING_SLOW_REQUEST_SAMPLE_RATE = 1.0
+PROFILING_SLOW_REQUEST_THRESHOLD = 1.0
+
 # Rack elevation size defaults, in pixels. For best results, the ratio of width to height should be roughly 10:1.
 RACK_ELEVATION_DEFAULT_UNIT_HEIGHT = 22
 RACK_ELEVATION_DEFAULT_UNIT_WIDTH = 220
@@ -237,6 +253,13 @@ RQ_DEFAULT_TIMEOUT = 300
 # this setting is derived from the installed location.
 # SCRIPTS_ROOT = '/opt/netbox/netbox/scripts'
 
+# The number of object types searched concurrently by the global search, each using its own database connection.
+SEARCH_CONCURRENCY = 1
+
+# Search a single index of all objects, rather than each type of object separately. After enabling this, populate the
+# index by running `manage.py rebuild_search_index`.
+SEARCH_INDEX_ENABLED = False
+
 # By default, NetBox will store session data in the database. Alternatively, a file path can be specified here to use
 # local file storage instead. (This can be useful for enabling authentication on a standby instance with read-only
 # database access.) Note that the user as which NetBox runs must have read and write permissions to this path.
@@ -245,6 +268,10 @@ SESSION_FILE_PATH = None
 # Time zone (default: UTC)
 TIME_ZONE = 'UTC'
 
+# The maximum number of events to deliver in a single background job per webhook. The default of 1 enqueues a separate
+# job for each event.
+WEBHOOK_BATCH_SIZE = 1
+
 # Date/time formatting. See the following link for supported formats:
 # https://docs.djangoproject.com/en/stable/ref/templates/builtins/#date
 DATE_FORMAT = 'N j, Y'
@@ -1,4 +1,5 @@
 import uuid
+from functools import partial
 from urllib import parse
 
 from django.conf import settings
@@ -8,6 +9,7 @@ from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse
 
 from extras.context_managers import change_logging
+from netbox.profiling import RequestProfile, instrument_rendering, record_profile
 from netbox.views import server_error
 from utilities.api import is_api_request, rest_api_server_error
 
@@ -82,6 +84,44 @@ class ObjectChangeMiddleware(object):
         return response
 
 
+class ProfilingMiddleware(object):
+    """
+    If PROFILING_ENABLED is True, record the database queries, cacheops cache reads and rendering time of each request
+    and export them as Prometheus metrics labelled by view name. The profiles of slow requests are retained for review.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        instrument_rendering()
+
+        profile = RequestProfile(request)
+        profile.start()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            profile.stop()
+            raise
+        profile.status_code = response.status_code
+        profile.view_name = getattr(request.resolver_match, 'view_name', None)
+
+        # The content of a streaming response (and any queries it makes) is produced after it has been returned, so
+        # profile it until the response is closed. The server closes every response, even one which is never iterated.
+        if response.streaming:
+            response._resource_closers.append(partial(self._finish, profile))
+        else:
+            self._finish(profile)
+
+        return response
+
+    @staticmethod
+    def _finish(profile):
+        profile.stop()
+        record_profile(profile)
+
+
 class APIVersionMiddleware(object):
     """
     If the request is for an API endpoint, include the API version as a response header.
@@ -0,0 +1,219 @@
+import collections
+import functools
+import random
+import re
+import threading
+import time
+
+from cacheops.signals import cache_read
+from django.conf import settings
+from django.db import connection
+from django.template.base import Template
+from django.template.response import SimpleTemplateResponse
+from django.utils import timezone
+from prometheus_client import Counter, Histogram
+
+# Label applied to the metrics of requests which did not resolve to a view
+UNRESOLVED_VIEW = '<unresolved>'
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+request_queries = Histogram(
+    'netbox_request_queries', 'Number of database queries made by a request', ['view'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+request_duplicate_queries = Histogram(
+    'netbox_request_duplicate_queries', 'Number of database queries made by a request which repeat an earlier query',
+    ['view'], buckets=QUERY_COUNT_BUCKETS
+)
+request_db_seconds = Histogram(
+    'netbox_request_db_seconds', 'Time spent executing database queries for a request', ['view']
+)
+request_render_seconds = Histogram(
+    'netbox_request_render_seconds', 'Time spent rendering templates and API responses for a request', ['view']
+)
+request_cache_reads = Counter(
+    'netbox_request_cache_reads_total', 'Number of cacheops cache reads made by requests, by result', ['view', 'result']
+)
+
+# Lists of query parameters (e.g. "IN (%s, %s, %s)") and the names of server-side cursors
+QUERY_PARAMETER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+QUERY_CURSOR_NAME = re.compile(r'"_django_curs_\w+"')
+
+# The profile of the request being processed by each thread
+_active = threading.local()
+
+
+def get_query_fingerprint(sql):
+    """
+    Return the fingerprint of a SQL query: the query with any list of parameters or cursor name replaced by a
+    placeholder, so that queries repeated with different parameters (as in an N+1 pattern) are identified as one.
+    """
+    sql = QUERY_PARAMETER_LIST.sub('(...)', sql)
+    return QUERY_CURSOR_NAME.sub('"_django_curs"', sql)
+
+
+class RequestProfile:
+    """
+    The measurements of a single request: the database queries it made (without their parameters), its cacheops cache
+    reads and the time spent rendering its response. The profile is active in the current thread between start() and
+    stop().
+    """
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.view_name = None
+        self.status_code = None
+        self.time = timezone.now()
+        self.duration = None
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_time = 0.0
+        self._started = None
+        self._rendering = False
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        # Record the SQL and duration of each query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def start(self):
+        self._started = time.perf_counter()
+        connection.execute_wrappers.append(self.execute_wrapper)
+        _active.profile = self
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._started
+        if self.execute_wrapper in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self.execute_wrapper)
+        if getattr(_active, 'profile', None) is self:
+            _active.profile = None
+
+    @property
+    def db_time(self):
+        return sum(duration for sql, duration in self.queries)
+
+    @property
+    def duplicates(self):
+        """
+        Return the fingerprint of each query made more than once along with its count, most frequent first.
+        """
+        fingerprints = collections.Counter(get_query_fingerprint(sql) for sql, duration in self.queries)
+        return [(fingerprint, count) for fingerprint, count in fingerprints.most_common() if count > 1]
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for fingerprint, count in self.duplicates)
+
+
+def get_active_profile():
+    """
+    Return the RequestProfile active in the current thread, if any.
+    """
+    return getattr(_active, 'profile', None)
+
+
+class SlowRequestLog:
+    """
+    A thread-safe ring buffer retaining the profiles of the most recent slow requests handled by this process.
+    """
+    def __init__(self):
+        self._profiles = collections.deque()
+        self._lock = threading.Lock()
+
+    def add(self, profile, maxlen):
+        with self._lock:
+            self._profiles.append(profile)
+            while len(self._profiles) > maxlen:
+                self._profiles.popleft()
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def __iter__(self):
+        # Most recent first
+        with self._lock:
+            return iter(list(reversed(self._profiles)))
+
+    def __len__(self):
+        return len(self._profiles)
+
+
+slow_requests = SlowRequestLog()
+
+
+def record_profile(profile):
+    """
+    Export the measurements of a completed request as Prometheus metrics, and retain its profile if it was slow (subject
+    to sampling).
+    """
+    view = profile.view_name or UNRESOLVED_VIEW
+    request_queries.labels(view).observe(len(profile.queries))
+    request_duplicate_queries.labels(view).observe(profile.duplicate_count)
+    request_db_seconds.labels(view).observe(profile.db_time)
+    request_render_seconds.labels(view).observe(profile.render_time)
+    if profile.cache_hits:
+        request_cache_reads.labels(view, 'hit').inc(profile.cache_hits)
+    if profile.cache_misses:
+        request_cache_reads.labels(view, 'miss').inc(profile.cache_misses)
+
+    if (
+        settings.PROFILING_SLOW_REQUEST_COUNT and
+        profile.duration >= settings.PROFILING_SLOW_REQUEST_THRESHOLD and
+        random.random() < settings.PROFILING_SLOW_REQUEST_SAMPLE_RATE
+    ):
+        slow_requests.add(profile, settings.PROFILING_SLOW_REQUEST_COUNT)
+
+
+#
+# Instrumentation
+#
+
+def count_cache_read(sender, func, hit, **kwargs):
+    profile = get_active_profile()
+    if profile is not None:
+        if hit:
+            profile.cache_hits += 1
+        else:
+            profile.cache_misses += 1
+
+
+cache_read.connect(count_cache_read)
+
+
+def _timed_render(render):
+    """
+    Wrap a rendering method to add the time it takes to the active profile. Only the outermost call is timed, as
+    templates and responses are rendered within one another.
+    """
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        profile = get_active_profile()
+        if profile is None or profile._rendering:
+            return render(*args, **kwargs)
+        profile._rendering = True
+        start = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            profile.render_time += time.perf_counter() - start
+            profile._rendering = False
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def instrument_rendering():
+    """
+    Time the rendering of Django templates (including those rendered by views using render()) and of template and REST
+    API responses. This has effect only while a profile is active.
+    """
+    if getattr(Template.render, '_profiled', False):
+        return
+    Template.render = _timed_render(Template.render)
+    SimpleTemplateResponse.render = _timed_render(SimpleTemplateResponse.render)
@@ -63,12 +63,14 @@ ADMINS = getattr(configuration, 'ADMINS', [])
 ALLOWED_URL_SCHEMES = getattr(configuration, 'ALLOWED_URL_SCHEMES', (
     'file', 'ftp', 'ftps', 'http', 'https', 'irc', 'mailto', 'sftp', 'ssh', 'tel', 'telnet', 'tftp', 'vnc', 'xmpp',
 ))
+ASYNC_CABLE_PATHS = getattr(configuration, 'ASYNC_CABLE_PATHS', False)
 BANNER_BOTTOM = getattr(configuration, 'BANNER_BOTTOM', '')
 BANNER_LOGIN = getattr(configuration, 'BANNER_LOGIN', '')
 BANNER_TOP = getattr(configuration, 'BANNER_TOP', '')
 BASE_PATH = getattr(configuration, 'BASE_PATH', '')
 if BASE_PATH:
     BASE_PATH = BASE_PATH.strip('/') + '/'  # Enforce trailing slash only
+BULK_JOB_THRESHOLD = getattr(configuration, 'BULK_JOB_THRESHOLD', None)
 CACHE_TIMEOUT = getattr(configuration, 'CACHE_TIMEOUT', 900)
 CHANGELOG_RETENTION = getattr(configuration, 'CHANGELOG_RETENTION', 90)
 CORS_ORIGIN_ALLOW_ALL = getattr(configuration, 'CORS_ORIGIN_ALLOW_ALL', False)
@@ -101,6 +103,10 @@ PAGINATE_COUNT = getattr(configuration, 'PAGINATE_COUNT', 50)
 PLUGINS = getattr(configuration, 'PLUGINS', [])
 PLUGINS_CONFIG = getattr(configuration, 'PLUGINS_CONFIG', {})
 PREFER_IPV4 = getattr(configuration, 'PREFER_IPV4', False)
+PROFILING_ENABLED = getattr(configuration, 'PROFILING_ENABLED', False)
+PROFILING_SLOW_REQUEST_COUNT = getattr(configuration, 'PROFILING_SLOW_REQUEST_COUNT', 100)
+PROFILING_SLOW_REQUEST_SAMPLE_RATE = getattr(configuration, 'PROFILING_SLOW_REQUEST_SAMPLE_RATE', 1.0)
+PROFILING_SLOW_REQUEST_THRESHOLD = getattr(configuration, 'PROFILING_SLOW_REQUEST_THRESHOLD', 1.0)
 RACK_ELEVATION_DEFAULT_UNIT_HEIGHT = getattr(configuration, 'RACK_ELEVATION_DEFAULT_UNIT_HEIGHT', 22)
 RACK_ELEVATION_DEFAULT_UNIT_WIDTH = getattr(configuration, 'RACK_ELEVATION_DEFAULT_UNIT_WIDTH', 220)
 REMOTE_AUTH_AUTO_CREATE_USER = getattr(configuration, 'REMOTE_AUTH_AUTO_CREATE_USER', False)
@@ -114,12 +120,15 @@ RELEASE_CHECK_TIMEOUT = getattr(configuration, 'RELEASE_CHECK_TIMEOUT', 24 * 360
 REPORTS_ROOT = getattr(configuration, 'REPORTS_ROOT', os.path.join(BASE_DIR, 'reports')).rstrip('/')
 RQ_DEFAULT_TIMEOUT = getattr(configuration, 'RQ_DEFAULT_TIMEOUT', 300)
 SCRIPTS_ROOT = getattr(configuration, 'SCRIPTS_ROOT', os.path.join(BASE_DIR, 'scripts')).rstrip('/')
+SEARCH_CONCURRENCY = getattr(configuration, 'SEARCH_CONCURRENCY', 1)
+SEARCH_INDEX_ENABLED = getattr(configuration, 'SEARCH_INDEX_ENABLED', False)
 SESSION_FILE_PATH = getattr(configuration, 'SESSION_FILE_PATH', None)
 SHORT_DATE_FORMAT = getattr(configuration, 'SHORT_DATE_FORMAT', 'Y-m-d')
 SHORT_DATETIME_FORMAT = getattr(configuration, 'SHORT_DATETIME_FORMAT', 'Y-m-d H:i')
 SHORT_TIME_FORMAT = getattr(configuration, 'SHORT_TIME_FORMAT', 'H:i:s')
 TIME_FORMAT = getattr(configuration, 'TIME_FORMAT', 'g:i a')
 TIME_ZONE = getattr(configuration, 'TIME_ZONE', 'UTC')
+WEBHOOK_BATCH_SIZE = getattr(configuration, 'WEBHOOK_BATCH_SIZE', 1)
 
 # Validate update repo URL and timeout
 if RELEASE_CHECK_URL:
@@ -298,6 +307,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django_prometheus.middleware.PrometheusBeforeMiddleware',
+    'netbox.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -429,6 +439,7 @@ CACHEOPS = {
     'dcim.rackgroup': None,  # MPTT models are exempt due to raw SQL
     'dcim.*': {'ops': 'all'},
     'ipam.*': {'ops': 'all'},
+    'extras.searchentry': None,  # Search index entries are written in bulk and queried using raw SQL
     'extras.*': {'ops': 'all'},
     'secrets.*': {'ops': 'all'},
     'users.*': {'ops': 'all'},
@@ -560,8 +571,9 @@ else:
     }
 
 RQ_QUEUES = {
-    'default': RQ_PARAMS,  # Webhooks
+    'default': RQ_PARAMS,
     'check_releases': RQ_PARAMS,
+    'webhooks': RQ_PARAMS,
 }
 
 
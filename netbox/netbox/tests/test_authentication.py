@@ -351,3 +351,62 @@ class ObjectPermissionAPIViewTestCase(TestCase):
         url = reverse('ipam-api:prefix-detail', kwargs={'pk': self.prefixes[0].pk})
         response = self.client.delete(url, format='json', **self.header)
         self.assertEqual(response.status_code, 204)
+
+
+class ObjectPermissionCacheTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sites = (
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+        )
+        Site.objects.bulk_create(cls.sites)
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.obj_perm = ObjectPermission(
+            name='Test permission',
+            constraints={'name': 'Site 1'},
+            actions=['view']
+        )
+        self.obj_perm.save()
+        self.obj_perm.object_types.add(ContentType.objects.get_for_model(Site))
+        self.obj_perm.users.add(self.user)
+
+    def get_user(self):
+        # Retrieve a new instance of the user, as the user for a new request would be
+        return User.objects.get(pk=self.user.pk)
+
+    def test_cached_permissions(self):
+        user = self.get_user()
+        self.assertEqual(list(Site.objects.restrict(user, 'view')), [self.sites[0]])
+
+        # Permissions should be retrieved from the cache for subsequent requests
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('dcim.view_site'))
+            self.assertFalse(user.has_perm('dcim.change_site'))
+        self.assertEqual(list(Site.objects.restrict(user, 'view')), [self.sites[0]])
+
+    def test_invalidate_on_permission_change(self):
+        self.assertEqual(list(Site.objects.restrict(self.get_user(), 'view')), [self.sites[0]])
+
+        self.obj_perm.constraints = {'name': 'Site 2'}
+        self.obj_perm.save()
+        self.assertEqual(list(Site.objects.restrict(self.get_user(), 'view')), [self.sites[1]])
+
+        self.obj_perm.users.remove(self.user)
+        self.assertEqual(list(Site.objects.restrict(self.get_user(), 'view')), [])
+
+    def test_invalidate_on_group_membership(self):
+        self.obj_perm.users.remove(self.user)
+        group = Group.objects.create(name='Group 1')
+        self.obj_perm.groups.add(group)
+        self.assertFalse(self.get_user().has_perm('dcim.view_site'))
+
+        self.user.groups.add(group)
+        self.assertTrue(self.get_user().has_perm('dcim.view_site'))
+
+        group.delete()
+        self.assertFalse(self.get_user().has_perm('dcim.view_site'))
@@ -0,0 +1,135 @@
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from dcim.models import Site
+from netbox.profiling import RequestProfile, get_active_profile, get_query_fingerprint, slow_requests
+from utilities.testing import TestCase
+
+
+class RequestProfileTest(TestCase):
+
+    def test_parameter_lists(self):
+        self.assertEqual(
+            get_query_fingerprint('SELECT * FROM "dcim_site" WHERE ("id" IN (%s, %s, %s) AND "slug" = %s)'),
+            'SELECT * FROM "dcim_site" WHERE ("id" IN (...) AND "slug" = %s)'
+        )
+        self.assertEqual(
+            get_query_fingerprint('SELECT * FROM "dcim_site" WHERE "id" IN (%s)'),
+            'SELECT * FROM "dcim_site" WHERE "id" IN (...)'
+        )
+
+    def test_duplicates(self):
+        profile = RequestProfile(RequestFactory().get('/'))
+        profile.queries = [
+            ('SELECT * FROM "dcim_site"', 0.1),
+            ('SELECT * FROM "dcim_region" WHERE "id" = %s', 0.1),
+            ('SELECT * FROM "dcim_region" WHERE "id" = %s', 0.1),
+            ('SELECT * FROM "dcim_region" WHERE "id" = %s', 0.1),
+            ('SELECT * FROM "tenancy_tenant" WHERE "id" IN (%s)', 0.1),
+            ('SELECT * FROM "tenancy_tenant" WHERE "id" IN (%s, %s)', 0.1),
+        ]
+
+        self.assertEqual(profile.duplicates, [
+            ('SELECT * FROM "dcim_region" WHERE "id" = %s', 3),
+            ('SELECT * FROM "tenancy_tenant" WHERE "id" IN (...)', 2),
+        ])
+        self.assertEqual(profile.duplicate_count, 3)
+        self.assertAlmostEqual(profile.db_time, 0.6)
+
+    def test_cursor_names(self):
+        self.assertEqual(
+            get_query_fingerprint('DECLARE "_django_curs_140554673089408_sync_81" NO SCROLL CURSOR FOR SELECT 1'),
+            'DECLARE "_django_curs" NO SCROLL CURSOR FOR SELECT 1'
+        )
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SLOW_REQUEST_THRESHOLD=0)
+class ProfilingMiddlewareTest(TestCase):
+    user_permissions = ['dcim.view_site']
+
+    @classmethod
+    def setUpTestData(cls):
+        Site.objects.bulk_create([
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+        ])
+
+    def setUp(self):
+        super().setUp()
+        slow_requests.clear()
+
+    def get_sample_value(self, name, view):
+        return REGISTRY.get_sample_value(name, {'view': view}) or 0
+
+    def test_profile_request(self):
+        queries_count = self.get_sample_value('netbox_request_queries_count', 'dcim:site_list')
+
+        response = self.client.get(reverse('dcim:site_list'))
+        self.assertHttpStatus(response, 200)
+
+        profile, = slow_requests
+        self.assertEqual(profile.method, 'GET')
+        self.assertEqual(profile.path, reverse('dcim:site_list'))
+        self.assertEqual(profile.view_name, 'dcim:site_list')
+        self.assertEqual(profile.status_code, 200)
+        self.assertGreater(len(profile.queries), 0)
+        self.assertGreater(profile.render_time, 0)
+        self.assertLessEqual(profile.render_time + profile.db_time, profile.duration)
+        self.assertEqual(
+            self.get_sample_value('netbox_request_queries_count', 'dcim:site_list'), queries_count + 1
+        )
+
+    def test_profile_streaming_response(self):
+        response = self.client.get('{}?export'.format(reverse('dcim:site_list')))
+        self.assertHttpStatus(response, 200)
+
+        # The profile is recorded once the content has been produced
+        self.assertEqual(len(slow_requests), 0)
+        b''.join(response.streaming_content)
+        profile, = slow_requests
+        self.assertTrue(any('"dcim_site"' in sql for sql, duration in profile.queries))
+
+    def test_streaming_response_closed(self):
+        response = self.client.get('{}?export'.format(reverse('dcim:site_list')))
+        self.assertIsNotNone(get_active_profile())
+
+        # A streaming response closed without being iterated still ends its profile. (As in the test client, keep the
+        # test's database connection open.)
+        request_finished.disconnect(close_old_connections)
+        try:
+            response.close()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertIsNone(get_active_profile())
+        self.assertEqual(connection.execute_wrappers, [])
+        self.assertEqual(len(slow_requests), 1)
+
+    @override_settings(PROFILING_SLOW_REQUEST_THRESHOLD=60)
+    def test_fast_request(self):
+        response = self.client.get(reverse('dcim:site_list'))
+        self.assertHttpStatus(response, 200)
+
+        self.assertEqual(len(slow_requests), 0)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_profiling_disabled(self):
+        response = self.client.get(reverse('dcim:site_list'))
+        self.assertHttpStatus(response, 200)
+
+        self.assertEqual(len(slow_requests), 0)
+
+    def test_slow_requests_view(self):
+        self.client.get(reverse('dcim:site_list'))
+
+        # Slow requests may be reviewed only by staff users
+        response = self.client.get(reverse('slow_requests'))
+        self.assertHttpStatus(response, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('slow_requests'))
+        self.assertHttpStatus(response, 200)
+        self.assertIn(reverse('dcim:site_list'), str(response.content))
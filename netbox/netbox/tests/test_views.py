@@ -1,8 +1,23 @@
 import urllib.parse
+from unittest.mock import patch
 
-from utilities.testing import TestCase
+import django_rq
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, TransactionTestCase, override_settings
 from django.urls import reverse
 
+from dcim.choices import SiteStatusChoices
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
+from extras.choices import JobResultStatusChoices
+from extras.models import JobResult, ObjectChange
+from netbox.constants import SEARCH_MAX_RESULTS
+from netbox.views import _evaluate_search, _get_search_executor
+from tenancy.models import Tenant
+from users.models import ObjectPermission
+from utilities.testing import TestCase
+
 
 class HomeViewTestCase(TestCase):
 
@@ -22,3 +37,216 @@ class HomeViewTestCase(TestCase):
 
         response = self.client.get('{}?{}'.format(url, urllib.parse.urlencode(params)))
         self.assertHttpStatus(response, 200)
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_search_max_results(self):
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(SEARCH_MAX_RESULTS + 1)
+        ])
+
+        url = reverse('search')
+        params = {
+            'q': 'site',
+            'obj_type': 'site',
+        }
+
+        response = self.client.get('{}?{}'.format(url, urllib.parse.urlencode(params)))
+        self.assertHttpStatus(response, 200)
+        result = response.context['results'][0]
+        self.assertEqual(len(result['table'].rows), SEARCH_MAX_RESULTS)
+        self.assertTrue(result['has_more'])
+        self.assertIsNone(result['count'])
+
+    @override_settings(SEARCH_INDEX_ENABLED=True, EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_search_index(self):
+        Site.objects.create(name='Site 1', slug='site-1')
+
+        url = reverse('search')
+        params = {
+            'q': 'site 1',
+        }
+
+        response = self.client.get('{}?{}'.format(url, urllib.parse.urlencode(params)))
+        self.assertHttpStatus(response, 200)
+        self.assertIn(Site.objects.get(slug='site-1').get_absolute_url(), str(response.content))
+
+
+class SearchViewConcurrencyTestCase(TransactionTestCase):
+    """
+    Searching object types concurrently requires the test data to be committed, since each thread uses its own
+    database connection.
+    """
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_user(username='testuser'))
+
+    def tearDown(self):
+        _get_search_executor(4).shutdown(wait=True)
+        _get_search_executor.cache_clear()
+
+    @override_settings(SEARCH_CONCURRENCY=4, EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_search(self):
+        Site.objects.create(name='Site 1', slug='site-1')
+        Site.objects.create(name='Site 2', slug='site-2')
+        Tenant.objects.create(name='Tenant 1', slug='tenant-1', description='Site 1')
+
+        url = reverse('search')
+        params = {
+            'q': 'site 1',
+        }
+
+        response = self.client.get('{}?{}'.format(url, urllib.parse.urlencode(params)))
+        self.assertEqual(response.status_code, 200)
+        results = {result['name']: result for result in response.context['results']}
+        self.assertEqual(list(results), ['sites', 'tenants'])
+        self.assertEqual(results['sites']['count'], 1)
+        self.assertFalse(results['sites']['has_more'])
+
+    @override_settings(SEARCH_CONCURRENCY=4, EXEMPT_VIEW_PERMISSIONS=['*'])
+    @patch.dict(connections.databases[DEFAULT_DB_ALIAS], CONN_MAX_AGE=300)
+    def test_search_connections(self):
+        Site.objects.create(name='Site 1', slug='site-1')
+        worker_connections = set()
+
+        def evaluate_search(queryset):
+            objects = _evaluate_search(queryset)
+            worker_connections.add(connections[DEFAULT_DB_ALIAS])
+            return objects
+
+        with patch('netbox.views._evaluate_search', evaluate_search):
+            self.client.get('{}?{}'.format(reverse('search'), urllib.parse.urlencode({'q': 'site 1'})))
+
+        # Each thread keeps its connection open between searches (subject to CONN_MAX_AGE) until it is shut down
+        self.assertTrue(any(worker_connection.connection for worker_connection in worker_connections))
+        _get_search_executor(4).shutdown(wait=True)
+        _get_search_executor.cache_clear()
+        for worker_connection in worker_connections:
+            self.assertIsNone(worker_connection.connection)
+
+
+@override_settings(BULK_JOB_THRESHOLD=3, EXEMPT_VIEW_PERMISSIONS=['*'])
+@patch('netbox.views.generic.BULK_JOB_CHUNK_SIZE', 2)
+class BulkJobTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.queue = django_rq.get_queue('default')
+        self.queue.empty()
+
+        self.sites = (
+            Site.objects.create(name='Site 1', slug='site-1'),
+            Site.objects.create(name='Site 2', slug='site-2'),
+            Site.objects.create(name='Site 3', slug='site-3'),
+        )
+
+    def run_job(self, response):
+        """
+        Run the job enqueued by a bulk view, returning its JobResult.
+        """
+        job_result = JobResult.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('extras:jobresult', kwargs={'pk': job_result.pk}))
+        job = self.queue.fetch_job(str(job_result.job_id))
+        # Bulk jobs run to completion, however many objects they process
+        self.assertEqual(job.timeout, -1)
+        job.perform()
+        return JobResult.objects.get(pk=job_result.pk)
+
+    def test_bulk_edit(self):
+        self.add_permissions('dcim.change_site')
+        data = {
+            'pk': [site.pk for site in self.sites],
+            'status': SiteStatusChoices.STATUS_PLANNED,
+            '_apply': True,
+        }
+
+        response = self.client.post(reverse('dcim:site_bulk_edit'), data)
+        self.assertEqual(Site.objects.filter(status=SiteStatusChoices.STATUS_PLANNED).count(), 0)
+
+        # The changes made by each chunk are logged once it has been committed, before the job records its progress
+        logged_changes = []
+
+        def save_job_result(job_result, *args, **kwargs):
+            logged_changes.append(ObjectChange.objects.filter(changed_object_type__model='site').count())
+            return save(job_result, *args, **kwargs)
+
+        save = JobResult.save
+        with patch.object(JobResult, 'save', autospec=True, side_effect=save_job_result):
+            job_result = self.run_job(response)
+        self.assertEqual(logged_changes, [0, 2, 3, 3])
+
+        self.assertEqual(job_result.status, JobResultStatusChoices.STATUS_COMPLETED)
+        self.assertEqual(job_result.data['processed'], 3)
+        self.assertEqual(job_result.data['message'], 'Updated 3 sites')
+        self.assertEqual(Site.objects.filter(status=SiteStatusChoices.STATUS_PLANNED).count(), 3)
+        self.assertEqual(ObjectChange.objects.filter(user=self.user, changed_object_type__model='site').count(), 3)
+
+        # Edits of fewer objects are performed within the request
+        response = self.client.post(reverse('dcim:site_bulk_edit'), {
+            'pk': [self.sites[0].pk],
+            'status': SiteStatusChoices.STATUS_RETIRED,
+            '_apply': True,
+        })
+        self.assertHttpStatus(response, 302)
+        self.assertEqual(Site.objects.get(pk=self.sites[0].pk).status, SiteStatusChoices.STATUS_RETIRED)
+
+    def test_bulk_edit_permissions(self):
+        obj_perm = ObjectPermission(name='Test permission', constraints={'status': 'active'}, actions=['change'])
+        obj_perm.save()
+        obj_perm.users.add(self.user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(Site))
+        data = {
+            'pk': [site.pk for site in self.sites],
+            'status': SiteStatusChoices.STATUS_PLANNED,
+            '_apply': True,
+        }
+
+        # The edited sites no longer satisfy the permission's constraints, so the first chunk is rolled back
+        job_result = self.run_job(self.client.post(reverse('dcim:site_bulk_edit'), data))
+
+        self.assertEqual(job_result.status, JobResultStatusChoices.STATUS_FAILED)
+        self.assertEqual(job_result.data['processed'], 0)
+        self.assertEqual(Site.objects.filter(status=SiteStatusChoices.STATUS_PLANNED).count(), 0)
+
+    def test_bulk_delete(self):
+        self.add_permissions('dcim.delete_site')
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        Device.objects.create(
+            name='Device 1',
+            device_type=DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1'),
+            device_role=DeviceRole.objects.create(name='Device Role 1', slug='device-role-1'),
+            site=self.sites[2]
+        )
+        data = {
+            'pk': [site.pk for site in self.sites],
+            'confirm': True,
+            '_confirm': True,
+        }
+
+        job_result = self.run_job(self.client.post(reverse('dcim:site_bulk_delete'), data))
+
+        # The chunk deleted before the protected site was reached remains committed
+        self.assertEqual(job_result.status, JobResultStatusChoices.STATUS_FAILED)
+        self.assertEqual(job_result.data['processed'], 2)
+        self.assertEqual(job_result.data['message'], 'Deleted 2 sites')
+        self.assertIn('Device 1', job_result.data['errors'][0])
+        self.assertEqual(list(Site.objects.all()), [self.sites[2]])
+
+    def test_jobresult_view(self):
+        self.add_permissions('dcim.delete_site')
+        data = {
+            'pk': [site.pk for site in self.sites],
+            'confirm': True,
+            '_confirm': True,
+        }
+        job_result = self.run_job(self.client.post(reverse('dcim:site_bulk_delete'), data))
+        url = reverse('extras:jobresult', kwargs={'pk': job_result.pk})
+
+        response = self.client.get(url)
+        self.assertHttpStatus(response, 200)
+        self.assertIn('Deleted 3 sites', response.content.decode())
+
+        # Job results are not visible to other users, unless they are permitted to view all job results
+        self.client.force_login(User.objects.create_user(username='testuser2'))
+        with override_settings(EXEMPT_VIEW_PERMISSIONS=[]):
+            self.assertHttpStatus(self.client.get(url), 404)
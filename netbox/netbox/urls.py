@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.conf.urls import include
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import path, re_path
 from django.views.static import serve
 from drf_yasg import openapi
@@ -7,7 +8,7 @@ from drf_yasg.views import get_schema_view
 
 from extras.plugins.urls import plugin_admin_patterns, plugin_patterns, plugin_api_patterns
 from netbox.api.views import APIRootView, StatusView
-from netbox.views import HomeView, StaticMediaFailureView, SearchView
+from netbox.views import HomeView, SlowRequestsAdminView, StaticMediaFailureView, SearchView
 from users.views import LoginView, LogoutView
 from .admin import admin_site
 
@@ -67,6 +68,7 @@ _patterns = [
     # Admin
     path('admin/', admin_site.urls),
     path('admin/background-tasks/', include('django_rq.urls')),
+    path('admin/slow-requests/', staff_member_required(SlowRequestsAdminView.as_view()), name='slow_requests'),
 
     # Errors
     path('media-failure/', StaticMediaFailureView.as_view(), name='media_failure'),
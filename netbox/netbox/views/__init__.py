@@ -1,8 +1,12 @@
 import platform
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, connections
 from django.db.models import F
 from django.http import HttpResponseServerError
 from django.shortcuts import render
@@ -20,9 +24,11 @@ from dcim.models import (
 )
 from extras.choices import JobResultStatusChoices
 from extras.models import ObjectChange, JobResult
+from extras.search import search
 from ipam.models import Aggregate, IPAddress, Prefix, VLAN, VRF
 from netbox.constants import SEARCH_MAX_RESULTS, SEARCH_TYPES
 from netbox.forms import SearchForm
+from netbox.profiling import slow_requests
 from netbox.releases import get_latest_release
 from secrets.models import Secret
 from tenancy.models import Tenant
@@ -112,6 +118,41 @@ class HomeView(View):
         })
 
 
+class SearchExecutor(ThreadPoolExecutor):
+    """
+    A pool of threads which evaluate search querysets. Each thread keeps its own database connection between searches
+    (subject to CONN_MAX_AGE, as a request thread would), and closes it when the executor is shut down.
+    """
+    def shutdown(self, wait=True, **kwargs):
+        # Each task waits for all of the others to start, so every thread runs exactly one of them
+        barrier = threading.Barrier(self._max_workers)
+
+        def close_connections():
+            connections.close_all()
+            barrier.wait()
+
+        for _ in range(self._max_workers):
+            self.submit(close_connections)
+        super().shutdown(wait, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _get_search_executor(workers):
+    return SearchExecutor(max_workers=workers, thread_name_prefix='search')
+
+
+def _evaluate_search(queryset):
+    """
+    Evaluate a search queryset within a search executor thread. As for a request, the thread's database connection is
+    closed beforehand and afterward only if it has become unusable or has exceeded CONN_MAX_AGE.
+    """
+    close_old_connections()
+    try:
+        return list(queryset)
+    finally:
+        close_old_connections()
+
+
 class SearchView(View):
 
     def get(self, request):
@@ -134,30 +175,94 @@ class SearchView(View):
                 # Searching all object types
                 obj_types = SEARCH_TYPES.keys()
 
-            for obj_type in obj_types:
-
-                queryset = SEARCH_TYPES[obj_type]['queryset'].restrict(request.user, 'view')
-                filterset = SEARCH_TYPES[obj_type]['filterset']
-                table = SEARCH_TYPES[obj_type]['table']
-                url = SEARCH_TYPES[obj_type]['url']
-
-                # Construct the results table for this object type
-                filtered_queryset = filterset({'q': form.cleaned_data['q']}, queryset=queryset).qs
-                table = table(filtered_queryset, orderable=False)
-                table.paginate(per_page=SEARCH_MAX_RESULTS)
-
-                if table.page:
-                    results.append({
-                        'name': queryset.model._meta.verbose_name_plural,
-                        'table': table,
-                        'url': f"{reverse(url)}?q={form.cleaned_data.get('q')}"
-                    })
+            if settings.SEARCH_INDEX_ENABLED:
+                results = self.search_index(request, form.cleaned_data['q'], obj_types)
+            else:
+                results = self.search_filtersets(request, form.cleaned_data['q'], obj_types)
 
         return render(request, 'search.html', {
             'form': form,
             'results': results,
         })
 
+    def search_filtersets(self, request, query, obj_types):
+        """
+        Search each type of object using its filter set. Up to SEARCH_CONCURRENCY types are searched concurrently.
+        """
+        results = []
+
+        querysets = []
+        for obj_type in obj_types:
+            queryset = SEARCH_TYPES[obj_type]['queryset'].restrict(request.user, 'view')
+            filterset = SEARCH_TYPES[obj_type]['filterset'](queryset=queryset)
+            # Apply only the search filter, rather than binding and validating every filter of the filter set. Retrieve
+            # one more than the maximum number of results to determine whether there are more, rather than counting all
+            # matches (which evaluates any annotations for every matching object).
+            queryset = filterset.filters['q'].filter(queryset, query)
+            querysets.append(queryset[:SEARCH_MAX_RESULTS + 1])
+
+        if settings.SEARCH_CONCURRENCY > 1 and len(querysets) > 1:
+            matches = _get_search_executor(settings.SEARCH_CONCURRENCY).map(_evaluate_search, querysets)
+        else:
+            matches = map(list, querysets)
+
+        for obj_type, objects in zip(obj_types, matches):
+
+            if not objects:
+                continue
+            model = SEARCH_TYPES[obj_type]['queryset'].model
+            table = SEARCH_TYPES[obj_type]['table']
+            url = SEARCH_TYPES[obj_type]['url']
+
+            # Construct the results table for this object type
+            has_more = len(objects) > SEARCH_MAX_RESULTS
+            table = table(objects[:SEARCH_MAX_RESULTS], orderable=False)
+            table.paginate(per_page=SEARCH_MAX_RESULTS)
+
+            results.append({
+                'name': model._meta.verbose_name_plural,
+                'table': table,
+                # The total number of matches is unknown when there are more than are shown
+                'count': None if has_more else len(objects),
+                'has_more': has_more,
+                'url': f"{reverse(url)}?q={query}"
+            })
+
+        return results
+
+    def search_index(self, request, query, obj_types):
+        """
+        Search all types of object at once using the search index, then retrieve only the best matching objects of
+        each type.
+        """
+        results = []
+        models = [SEARCH_TYPES[obj_type]['queryset'].model for obj_type in obj_types]
+        matches = search(request.user, query, models, SEARCH_MAX_RESULTS)
+
+        for obj_type in obj_types:
+
+            queryset = SEARCH_TYPES[obj_type]['queryset']
+            if queryset.model not in matches:
+                continue
+            count, pks = matches[queryset.model]
+            table = SEARCH_TYPES[obj_type]['table']
+            url = SEARCH_TYPES[obj_type]['url']
+
+            # Construct the results table for this object type, retaining the order of the matches
+            objects = queryset.in_bulk(pks)
+            table = table([objects[pk] for pk in pks if pk in objects], orderable=False)
+            table.paginate(per_page=SEARCH_MAX_RESULTS)
+
+            results.append({
+                'name': queryset.model._meta.verbose_name_plural,
+                'table': table,
+                'count': count,
+                'has_more': count > len(pks),
+                'url': f"{reverse(url)}?q={query}"
+            })
+
+        return results
+
 
 class StaticMediaFailureView(View):
     """
@@ -169,6 +274,18 @@ class StaticMediaFailureView(View):
         })
 
 
+class SlowRequestsAdminView(View):
+    """
+    Admin view for reviewing the profiles of recent slow requests handled by this process.
+    """
+    def get(self, request):
+        return render(request, 'admin/slow_requests.html', {
+            'profiling_enabled': settings.PROFILING_ENABLED,
+            'threshold': settings.PROFILING_SLOW_REQUEST_THRESHOLD,
+            'profiles': list(slow_requests),
+        })
+
+
 @requires_csrf_token
 def server_error(request, template_name=ERROR_500_TEMPLATE_NAME):
     """
@@ -1,22 +1,28 @@
 import logging
 import re
 from copy import deepcopy
+from functools import partial
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist, ValidationError
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist, PermissionDenied, ValidationError
 from django.db import transaction, IntegrityError
 from django.db.models import ManyToManyField, ProtectedError
 from django.forms import Form, ModelMultipleChoiceField, MultipleHiddenInput, Textarea
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.html import escape
 from django.utils.http import is_safe_url
 from django.utils.safestring import mark_safe
 from django.views.generic import View
+from django_rq import job
 from django_tables2 import RequestConfig
 
-from extras.models import CustomField, ExportTemplate
+from extras.choices import JobResultStatusChoices
+from extras.context_managers import change_logging
+from extras.models import CustomField, ExportTemplate, JobResult
+from utilities.csv_import import CSVImporter
 from utilities.error_handlers import handle_protectederror
 from utilities.exceptions import AbortTransaction
 from utilities.forms import (
@@ -24,9 +30,16 @@ from utilities.forms import (
 )
 from utilities.paginator import EnhancedPaginator, get_paginate_count
 from utilities.permissions import get_permission_for_model
-from utilities.utils import csv_format, normalize_querydict, prepare_cloned_fields
+from utilities.querysets import iterate_queryset, select_accessed_relations
+from utilities.utils import copy_safe_request, csv_format, join_chunks, normalize_querydict, prepare_cloned_fields
 from utilities.views import GetReturnURLMixin, ObjectPermissionRequiredMixin
 
+# Number of lines of an export written to a streaming response at a time
+EXPORT_CHUNK_SIZE = 1000
+
+# Number of objects updated or deleted within each transaction of a background bulk job
+BULK_JOB_CHUNK_SIZE = 500
+
 
 class ObjectView(ObjectPermissionRequiredMixin, View):
     """
@@ -94,17 +107,16 @@ class ObjectListView(ObjectPermissionRequiredMixin, View):
 
     def queryset_to_yaml(self):
         """
-        Export the queryset of objects as concatenated YAML documents.
+        Export the queryset of objects as YAML documents, yielding one document at a time.
         """
-        yaml_data = [obj.to_yaml() for obj in self.queryset]
-
-        return '---\n'.join(yaml_data)
+        for obj in iterate_queryset(self.queryset):
+            yield obj.to_yaml()
 
     def queryset_to_csv(self):
         """
-        Export the queryset of objects as comma-separated value (CSV), using the model's to_csv() method.
+        Export the queryset of objects as comma-separated value (CSV), using the model's to_csv() method. Lines are
+        yielded one at a time, starting with the column headers.
         """
-        csv_data = []
         custom_fields = []
 
         # Start with the column headers
@@ -116,18 +128,30 @@ class ObjectListView(ObjectPermissionRequiredMixin, View):
                 headers.append(custom_field.name)
                 custom_fields.append(custom_field.name)
 
-        csv_data.append(','.join(headers))
+        yield ','.join(headers)
 
-        # Iterate through the queryset appending each object
-        for obj in self.queryset:
+        # Retrieve the related objects represented by to_csv() along with each object
+        queryset = select_accessed_relations(self.queryset, lambda obj: obj.to_csv())
+
+        # Iterate through the queryset yielding each object
+        for obj in iterate_queryset(queryset):
             data = obj.to_csv()
 
             for custom_field in custom_fields:
                 data += (obj.cf.get(custom_field, ''),)
 
-            csv_data.append(csv_format(data))
+            yield csv_format(data)
 
-        return '\n'.join(csv_data)
+    def stream_export(self, lines, separator='\n'):
+        """
+        Join the lines (or documents) of an export with the given separator, yielding the output in chunks suitable
+        for a StreamingHttpResponse.
+        """
+        if isinstance(lines, str):
+            yield lines
+            return
+        lines = (separator + line if i else line for i, line in enumerate(lines))
+        yield from join_chunks(lines, EXPORT_CHUNK_SIZE)
 
     def get(self, request):
 
@@ -152,14 +176,16 @@ class ObjectListView(ObjectPermissionRequiredMixin, View):
 
         # Check for YAML export support
         elif 'export' in request.GET and hasattr(model, 'to_yaml'):
-            response = HttpResponse(self.queryset_to_yaml(), content_type='text/yaml')
+            response = StreamingHttpResponse(
+                self.stream_export(self.queryset_to_yaml(), '---\n'), content_type='text/yaml'
+            )
             filename = 'netbox_{}.yaml'.format(self.queryset.model._meta.verbose_name_plural)
             response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
             return response
 
         # Fall back to built-in CSV formatting if export requested but no template specified
         elif 'export' in request.GET and hasattr(model, 'to_csv'):
-            response = HttpResponse(self.queryset_to_csv(), content_type='text/csv')
+            response = StreamingHttpResponse(self.stream_export(self.queryset_to_csv()), content_type='text/csv')
             filename = 'netbox_{}.csv'.format(self.queryset.model._meta.verbose_name_plural)
             response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
             return response
@@ -451,7 +477,7 @@ class BulkCreateView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
                             raise IntegrityError()
 
                     # Enforce object-level permissions
-                    if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                    if len(self.get_permitted_objects(new_objs)) != len(new_objs):
                         raise ObjectDoesNotExist
 
                     # If we make it to this point, validation has succeeded on all new objects.
@@ -646,6 +672,17 @@ class BulkImportView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
         """
         return obj_form.save()
 
+    def get_importer(self, headers, request, **kwargs):
+        """
+        Return a CSVImporter for the given CSV column headers. Objects are saved individually only if the view
+        customizes how they are saved.
+        """
+        save_obj = None
+        if type(self)._save_obj is not BulkImportView._save_obj:
+            save_obj = partial(self._save_obj, request=request)
+
+        return CSVImporter(self.model_form, headers, request.user, save_obj=save_obj, **kwargs)
+
     def get_required_permission(self):
         return get_permission_for_model(self.queryset.model, 'add')
 
@@ -667,23 +704,13 @@ class BulkImportView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
             logger.debug("Form validation was successful")
 
             try:
-                # Iterate through CSV data and bind each row to a new model form instance.
+                # Validate the CSV data and create the objects in bulk
                 with transaction.atomic():
                     headers, records = form.cleaned_data['csv']
-                    for row, data in enumerate(records, start=1):
-                        obj_form = self.model_form(data, headers=headers)
-                        restrict_form_fields(obj_form, request.user)
-
-                        if obj_form.is_valid():
-                            obj = self._save_obj(obj_form, request)
-                            new_objs.append(obj)
-                        else:
-                            for field, err in obj_form.errors.items():
-                                form.add_error('csv', "Row {} {}: {}".format(row, field, err[0]))
-                            raise ValidationError("")
+                    new_objs = self.get_importer(headers, request).run(records)
 
                     # Enforce object-level permissions
-                    if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                    if len(self.get_permitted_objects(new_objs)) != len(new_objs):
                         raise ObjectDoesNotExist
 
                 # Compile a table containing the imported objects
@@ -699,8 +726,9 @@ class BulkImportView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
                         'return_url': self.get_return_url(request),
                     })
 
-            except ValidationError:
-                pass
+            except ValidationError as e:
+                for message in e.messages:
+                    form.add_error('csv', message)
 
             except ObjectDoesNotExist:
                 msg = "Object import failed due to object-level permissions violation"
@@ -718,7 +746,117 @@ class BulkImportView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
         })
 
 
-class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
+# Bulk jobs are not subject to RQ_DEFAULT_TIMEOUT: their duration grows with the number of objects, and each chunk is
+# committed as it is processed, so a job killed partway would leave the operation incomplete
+@job('default', timeout=-1)
+def run_bulk_job(job_result, view_class, request, view_kwargs, pk_list, return_url, **kwargs):
+    """
+    Perform a bulk operation enqueued by a BulkJobMixin view. The view is set up for the original request, so that the
+    requesting user's permissions are enforced and changes are logged as they would be by the view itself.
+    """
+    logger = logging.getLogger('netbox.views.BulkJob')
+    view = view_class()
+    view.setup(request, **view_kwargs)
+
+    job_result.status = JobResultStatusChoices.STATUS_RUNNING
+    job_result.data = {
+        'total': len(pk_list),
+        'processed': 0,
+        'message': None,
+        'errors': [],
+        'return_url': return_url,
+    }
+    job_result.save()
+
+    try:
+        if not view.has_permission():
+            raise PermissionDenied
+        view.run_job(job_result, pk_list, **kwargs)
+        job_result.set_status(JobResultStatusChoices.STATUS_COMPLETED)
+
+    except PermissionDenied:
+        job_result.data['errors'].append("Operation failed due to object-level permissions violation")
+        job_result.set_status(JobResultStatusChoices.STATUS_FAILED)
+
+    except ValidationError as e:
+        job_result.data['errors'].extend(e.messages)
+        job_result.set_status(JobResultStatusChoices.STATUS_FAILED)
+
+    except Exception as e:
+        logger.exception(f"Exception raised during {job_result.name}")
+        job_result.data['errors'].append(f"An exception occurred: {type(e).__name__}: {e}")
+        job_result.set_status(JobResultStatusChoices.STATUS_ERRORED)
+
+    finally:
+        job_result.save()
+
+    logger.info(f"{job_result.name} completed in {job_result.duration}")
+
+
+class BulkJobMixin:
+    """
+    Perform bulk operations on large numbers of objects as background jobs, rather than within the request (see the
+    BULK_JOB_THRESHOLD configuration parameter). Each job processes its objects in chunks, committing each chunk in its
+    own transaction, and records its progress in a JobResult.
+
+    job_name: The name of the operation, used to name its JobResult (e.g. "Bulk edit")
+    job_verb: The past tense of the operation, used to report the number of objects processed (e.g. "Updated")
+    """
+    job_name = None
+    job_verb = None
+
+    def use_job(self, count):
+        """
+        Return True if an operation on the given number of objects should be run as a background job.
+        """
+        return settings.BULK_JOB_THRESHOLD is not None and count >= settings.BULK_JOB_THRESHOLD
+
+    def enqueue_job(self, request, pk_list, **kwargs):
+        """
+        Enqueue a background job processing the objects with the given PKs, and redirect to the page which reports its
+        result. Any additional keyword arguments are passed to process_chunk().
+        """
+        model = self.queryset.model
+        job_result = JobResult.enqueue_job(
+            run_bulk_job,
+            f'{self.job_name} {model._meta.verbose_name_plural}',
+            ContentType.objects.get_for_model(model),
+            request.user,
+            view_class=self.__class__,
+            request=copy_safe_request(request),
+            view_kwargs=self.kwargs,
+            pk_list=list(pk_list),
+            return_url=self.get_return_url(request),
+            **kwargs
+        )
+        return redirect('extras:jobresult', pk=job_result.pk)
+
+    def run_job(self, job_result, pk_list, **kwargs):
+        """
+        Process the given objects in chunks, recording the progress of the job after each chunk has been committed. If
+        a chunk fails, the job stops; the chunks processed before it are not rolled back.
+
+        The changes made by each chunk are logged (and their webhooks enqueued) as soon as it has been committed.
+        """
+        model = self.queryset.model
+        count = 0
+        for i in range(0, len(pk_list), BULK_JOB_CHUNK_SIZE):
+            chunk = pk_list[i:i + BULK_JOB_CHUNK_SIZE]
+            with change_logging(self.request), transaction.atomic():
+                count += self.process_chunk(chunk, **kwargs)
+            job_result.data['processed'] += len(chunk)
+            job_result.data['message'] = f'{self.job_verb} {count} {model._meta.verbose_name_plural}'
+            job_result.save()
+
+    def process_chunk(self, pk_list, **kwargs):
+        """
+        Perform the operation on the objects with the given PKs within a transaction, returning the number of objects
+        affected.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} must implement process_chunk()")
+
+
+class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, BulkJobMixin, View):
     """
     Edit objects in bulk.
 
@@ -733,6 +871,8 @@ class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
     table = None
     form = None
     template_name = 'generic/object_bulk_edit.html'
+    job_name = 'Bulk edit'
+    job_verb = 'Updated'
 
     def get_required_permission(self):
         return get_permission_for_model(self.queryset.model, 'change')
@@ -740,6 +880,85 @@ class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
     def get(self, request):
         return redirect(self.get_return_url(request))
 
+    def _update_objects(self, form, data, nullified_fields, queryset):
+        """
+        Apply the changes specified by a bulk edit form's cleaned data to each of the objects in the queryset, and
+        return the updated objects.
+        """
+        logger = logging.getLogger('netbox.views.BulkEditView')
+        model = self.queryset.model
+
+        custom_fields = form.custom_fields if hasattr(form, 'custom_fields') else []
+        standard_fields = [
+            field for field in form.fields if field not in custom_fields + ['pk']
+        ]
+
+        # Prefetch any tags for change logging
+        if hasattr(model, 'tags'):
+            queryset = queryset.prefetch_related('tags')
+
+        updated_objects = []
+        for obj in queryset:
+
+            # Update standard fields. If a field is listed in _nullify, delete its value.
+            for name in standard_fields:
+
+                try:
+                    model_field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    # This form field is used to modify a field rather than set its value directly
+                    model_field = None
+
+                # Handle nullification
+                if name in form.nullable_fields and name in nullified_fields:
+                    if isinstance(model_field, ManyToManyField):
+                        getattr(obj, name).set([])
+                    else:
+                        setattr(obj, name, None if model_field.null else '')
+
+                # ManyToManyFields
+                elif isinstance(model_field, ManyToManyField):
+                    if data[name]:
+                        getattr(obj, name).set(data[name])
+                # Normal fields
+                elif data[name] not in (None, '', []):
+                    setattr(obj, name, data[name])
+
+            # Update custom fields
+            for name in custom_fields:
+                if name in form.nullable_fields and name in nullified_fields:
+                    obj.custom_field_data[name] = None
+                elif data.get(name) not in (None, ''):
+                    obj.custom_field_data[name] = data[name]
+
+            try:
+                obj.full_clean()
+            except ValidationError as e:
+                raise ValidationError("{} failed validation: {}".format(obj, e))
+            obj.save()
+            updated_objects.append(obj)
+            logger.debug(f"Saved {obj} (PK: {obj.pk})")
+
+            # Add/remove tags
+            if data.get('add_tags', None):
+                obj.tags.add(*data['add_tags'])
+            if data.get('remove_tags', None):
+                obj.tags.remove(*data['remove_tags'])
+
+        return updated_objects
+
+    def process_chunk(self, pk_list, data, nullified_fields):
+        form = self.form(self.queryset.model)
+        updated_objects = self._update_objects(
+            form, data, nullified_fields, self.queryset.filter(pk__in=pk_list)
+        )
+
+        # Enforce object-level permissions
+        if len(self.get_permitted_objects(updated_objects)) != len(updated_objects):
+            raise PermissionDenied
+
+        return len(updated_objects)
+
     def post(self, request, **kwargs):
         logger = logging.getLogger('netbox.views.BulkEditView')
         model = self.queryset.model
@@ -758,63 +977,29 @@ class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
 
             if form.is_valid():
                 logger.debug("Form validation was successful")
-                custom_fields = form.custom_fields if hasattr(form, 'custom_fields') else []
-                standard_fields = [
-                    field for field in form.fields if field not in custom_fields + ['pk']
-                ]
                 nullified_fields = request.POST.getlist('_nullify')
 
+                # Edit large numbers of objects in the background
+                if self.use_job(len(form.cleaned_data['pk'])):
+                    logger.info(f"Enqueuing bulk edit of {len(form.cleaned_data['pk'])} objects")
+                    data = {name: value for name, value in form.cleaned_data.items() if name != 'pk'}
+                    return self.enqueue_job(
+                        request,
+                        [obj.pk for obj in form.cleaned_data['pk']],
+                        data=data,
+                        nullified_fields=nullified_fields
+                    )
+
                 try:
 
                     with transaction.atomic():
-
-                        updated_objects = []
-                        for obj in self.queryset.filter(pk__in=form.cleaned_data['pk']):
-
-                            # Update standard fields. If a field is listed in _nullify, delete its value.
-                            for name in standard_fields:
-
-                                try:
-                                    model_field = model._meta.get_field(name)
-                                except FieldDoesNotExist:
-                                    # This form field is used to modify a field rather than set its value directly
-                                    model_field = None
-
-                                # Handle nullification
-                                if name in form.nullable_fields and name in nullified_fields:
-                                    if isinstance(model_field, ManyToManyField):
-                                        getattr(obj, name).set([])
-                                    else:
-                                        setattr(obj, name, None if model_field.null else '')
-
-                                # ManyToManyFields
-                                elif isinstance(model_field, ManyToManyField):
-                                    if form.cleaned_data[name]:
-                                        getattr(obj, name).set(form.cleaned_data[name])
-                                # Normal fields
-                                elif form.cleaned_data[name] not in (None, '', []):
-                                    setattr(obj, name, form.cleaned_data[name])
-
-                            # Update custom fields
-                            for name in custom_fields:
-                                if name in form.nullable_fields and name in nullified_fields:
-                                    obj.custom_field_data[name] = None
-                                elif form.cleaned_data.get(name) not in (None, ''):
-                                    obj.custom_field_data[name] = form.cleaned_data[name]
-
-                            obj.full_clean()
-                            obj.save()
-                            updated_objects.append(obj)
-                            logger.debug(f"Saved {obj} (PK: {obj.pk})")
-
-                            # Add/remove tags
-                            if form.cleaned_data.get('add_tags', None):
-                                obj.tags.add(*form.cleaned_data['add_tags'])
-                            if form.cleaned_data.get('remove_tags', None):
-                                obj.tags.remove(*form.cleaned_data['remove_tags'])
+                        updated_objects = self._update_objects(
+                            form, form.cleaned_data, nullified_fields,
+                            self.queryset.filter(pk__in=form.cleaned_data['pk'])
+                        )
 
                         # Enforce object-level permissions
-                        if self.queryset.filter(pk__in=[obj.pk for obj in updated_objects]).count() != len(updated_objects):
+                        if len(self.get_permitted_objects(updated_objects)) != len(updated_objects):
                             raise ObjectDoesNotExist
 
                     if updated_objects:
@@ -825,7 +1010,7 @@ class BulkEditView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
                     return redirect(self.get_return_url(request))
 
                 except ValidationError as e:
-                    messages.error(self.request, "{} failed validation: {}".format(obj, e))
+                    messages.error(self.request, e.message)
 
                 except ObjectDoesNotExist:
                     msg = "Object update failed due to object-level permissions violation"
@@ -896,7 +1081,6 @@ class BulkRenameView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
             if form.is_valid():
                 try:
                     with transaction.atomic():
-                        renamed_pks = []
                         for obj in selected_objects:
                             find = form.cleaned_data['find']
                             replace = form.cleaned_data['replace']
@@ -908,7 +1092,6 @@ class BulkRenameView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
                                     obj.new_name = obj.name
                             else:
                                 obj.new_name = obj.name.replace(find, replace)
-                            renamed_pks.append(obj.pk)
 
                         if '_apply' in request.POST:
                             for obj in selected_objects:
@@ -916,7 +1099,7 @@ class BulkRenameView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
                                 obj.save()
 
                             # Enforce constrained permissions
-                            if self.queryset.filter(pk__in=renamed_pks).count() != len(selected_objects):
+                            if len(self.get_permitted_objects(selected_objects)) != len(selected_objects):
                                 raise ObjectDoesNotExist
 
                             messages.success(request, "Renamed {} {}".format(
@@ -942,7 +1125,7 @@ class BulkRenameView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
         })
 
 
-class BulkDeleteView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
+class BulkDeleteView(GetReturnURLMixin, ObjectPermissionRequiredMixin, BulkJobMixin, View):
     """
     Delete objects in bulk.
 
@@ -957,6 +1140,8 @@ class BulkDeleteView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
     table = None
     form = None
     template_name = 'generic/object_bulk_delete.html'
+    job_name = 'Bulk delete'
+    job_verb = 'Deleted'
 
     def get_required_permission(self):
         return get_permission_for_model(self.queryset.model, 'delete')
@@ -964,6 +1149,22 @@ class BulkDeleteView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
     def get(self, request):
         return redirect(self.get_return_url(request))
 
+    def process_chunk(self, pk_list):
+        model = self.queryset.model
+
+        # Delete objects (prefetching any tags for change logging)
+        queryset = self.queryset.filter(pk__in=pk_list)
+        if hasattr(model, 'tags'):
+            queryset = queryset.prefetch_related('tags')
+        try:
+            return queryset.delete()[1].get(model._meta.label, 0)
+        except ProtectedError as e:
+            protected_objects = list(e.protected_objects)
+            raise ValidationError(
+                f"Unable to delete {len(pk_list)} {model._meta.verbose_name_plural}. Dependent objects were found: "
+                f"{', '.join(str(obj) for obj in protected_objects[:50])}"
+            )
+
     def post(self, request, **kwargs):
         logger = logging.getLogger('netbox.views.BulkDeleteView')
         model = self.queryset.model
@@ -984,8 +1185,15 @@ class BulkDeleteView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View):
             if form.is_valid():
                 logger.debug("Form validation was successful")
 
-                # Delete objects
+                # Delete large numbers of objects in the background
+                if self.use_job(len(pk_list)):
+                    logger.info(f"Enqueuing bulk deletion of {len(pk_list)} objects")
+                    return self.enqueue_job(request, pk_list)
+
+                # Delete objects (prefetching any tags for change logging)
                 queryset = self.queryset.filter(pk__in=pk_list)
+                if hasattr(model, 'tags'):
+                    queryset = queryset.prefetch_related('tags')
                 try:
                     deleted_count = queryset.delete()[1][model._meta.label]
                 except ProtectedError as e:
@@ -1105,7 +1313,7 @@ class ComponentCreateView(GetReturnURLMixin, ObjectPermissionRequiredMixin, View
                             new_objs.append(obj)
 
                         # Enforce object-level permissions
-                        if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                        if len(self.get_permitted_objects(new_objs)) != len(new_objs):
                             raise ObjectDoesNotExist
 
                     messages.success(request, "Added {} {}".format(
@@ -1197,7 +1405,7 @@ class BulkComponentCreateView(GetReturnURLMixin, ObjectPermissionRequiredMixin,
                                             form.add_error(field, '{} {}: {}'.format(obj, name, ', '.join(e)))
 
                         # Enforce object-level permissions
-                        if self.queryset.filter(pk__in=[obj.pk for obj in new_components]).count() != len(new_components):
+                        if len(self.get_permitted_objects(new_components)) != len(new_components):
                             raise ObjectDoesNotExist
 
                 except IntegrityError:
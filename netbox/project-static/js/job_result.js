@@ -31,6 +31,9 @@ $(document).ready(function(){
                 context: this,
                 success: function(data) {
                     updatePendingStatusLabel(data.status);
+                    if (typeof jobUpdatedAction === 'function'){
+                        jobUpdatedAction(data);
+                    }
                     if (data.status.value === 'completed' || data.status.value === 'failed' || data.status.value === 'errored'){
                         jobTerminatedAction()
                     } else {
@@ -7,10 +7,11 @@ from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MinLengthValidator
 from django.db import models
 from django.db.models import Q
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from utilities.permissions import invalidate_object_permissions
 from utilities.querysets import RestrictedQuerySet
 from utilities.utils import flatten_dict
 
@@ -293,3 +294,22 @@ class ObjectPermission(models.Model):
         if type(self.constraints) is not list:
             return [self.constraints]
         return self.constraints
+
+
+@receiver(post_save, sender=ObjectPermission)
+@receiver(post_delete, sender=ObjectPermission)
+@receiver(m2m_changed, sender=ObjectPermission.object_types.through)
+@receiver(m2m_changed, sender=ObjectPermission.groups.through)
+@receiver(m2m_changed, sender=ObjectPermission.users.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=AdminUser)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=AdminGroup)
+def invalidate_permissions_cache(**kwargs):
+    """
+    Invalidate the cached permissions of all users when an ObjectPermission, or the membership of a group, changes.
+    """
+    if kwargs.get('action', '').startswith('pre_'):
+        return
+    invalidate_object_permissions()
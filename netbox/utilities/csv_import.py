@@ -0,0 +1,233 @@
+from collections import defaultdict
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import models, router
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_save
+from django.forms import ModelForm
+
+from .forms import CSVModelChoiceField
+from .querysets import RestrictedQuerySet
+
+CSV_IMPORT_BATCH_SIZE = 500
+
+# The maximum number of objects matched by each query checking the uniqueness of a set of fields
+UNIQUE_CHECK_CHUNK_SIZE = 500
+
+
+def can_bulk_create(model):
+    """
+    Return True if objects of the given model can be created using bulk_create(). Every class which overrides the
+    model's save() method must also define presave(), which performs all of the work save() does for a new object
+    prior to saving it, and the model must not override validate_unique().
+    """
+    if model.validate_unique is not models.Model.validate_unique:
+        return False
+    for cls in model.__mro__:
+        if cls is models.Model:
+            break
+        if 'save' in vars(cls) and 'presave' not in vars(cls):
+            return False
+    return True
+
+
+class CSVImporter:
+    """
+    Validate and save the objects represented by a set of CSV records in bulk.
+
+    The related objects referenced by each column are resolved using one query per column, rather than one query per
+    record. Where possible, each batch of records is validated and then created using bulk_create(), with the
+    uniqueness of the new objects validated using one query per unique set of fields. The pre_save and post_save
+    signals are sent for each object, so change logging and any other receivers work as they would for save().
+
+    Objects are saved individually (using `save_obj`, if given) if the model form or the model customizes how objects
+    are saved; see can_bulk_create().
+
+    :param model_form: The CSVModelForm used to validate each record
+    :param headers: The CSV column headers (as returned by CSVDataField)
+    :param user: The user importing the objects; related objects are restricted to those the user may view
+    :param save_obj: A function which saves a valid model form and returns the saved object (optional)
+    :param batch_size: The number of records validated and saved at a time
+    :param progress: A function called with the number of records processed and the total number of records, after
+        each batch has been saved (optional)
+    """
+    def __init__(self, model_form, headers, user, save_obj=None, batch_size=CSV_IMPORT_BATCH_SIZE, progress=None):
+        self.model_form = model_form
+        self.model = model_form._meta.model
+        self.headers = headers
+        self.user = user
+        self.save_obj = save_obj
+        self.batch_size = batch_size
+        self.progress = progress
+        self.using = router.db_for_write(self.model)
+        self.bulk_create = save_obj is None and model_form.save is ModelForm.save and can_bulk_create(self.model)
+
+    def resolve_related_objects(self, records):
+        """
+        Look up the related objects referenced by all records at once. Returns a dictionary mapping field names to the
+        objects matched by each value, and the names of fields which reference objects of the model being imported.
+        Objects created by earlier records may be referenced by those fields, so their values are not resolved.
+        """
+        related_objects = {}
+        self_references = []
+
+        form = self.model_form(headers=self.headers)
+        for name in self.headers:
+            field = form.fields[name]
+            if not isinstance(field, CSVModelChoiceField):
+                continue
+            if field.queryset.model is self.model:
+                self_references.append(name)
+                continue
+
+            values = {record[name] for record in records if record.get(name) not in field.empty_values}
+            if isinstance(field.queryset, RestrictedQuerySet):
+                field.queryset = field.queryset.restrict(self.user, 'view')
+            objects = field.resolve_values(values)
+            if objects is not None:
+                related_objects[name] = objects
+
+        return related_objects, self_references
+
+    def run(self, records):
+        """
+        Import the given records (as returned by CSVDataField), returning the list of objects created. Raises a
+        ValidationError listing the errors found in a batch of records if any are invalid.
+
+        Each batch is saved before the next is validated, so this should be called within a transaction.
+        """
+        related_objects, self_references = self.resolve_related_objects(records)
+        created = []
+        pending = []
+        errors = []
+
+        for row, data in enumerate(records, start=1):
+
+            # Objects created by earlier records may be referenced by this one, so must be created first
+            if pending and any(data.get(name) for name in self_references):
+                created.extend(self._save_pending(pending, errors))
+                pending = []
+
+            obj_form = self.model_form(data, headers=self.headers, related_objects=related_objects)
+            self._restrict_form_fields(obj_form)
+            obj_form.defer_unique_validation = self.bulk_create
+
+            if not obj_form.is_valid():
+                for field, err in obj_form.errors.items():
+                    errors.append((row, f"Row {row} {field}: {err[0]}"))
+            elif self.bulk_create:
+                pending.append((row, obj_form))
+            elif not errors:
+                created.append(self.save_obj(obj_form) if self.save_obj else obj_form.save())
+
+            if row % self.batch_size == 0 or row == len(records):
+                created.extend(self._save_pending(pending, errors))
+                pending = []
+                if self.progress:
+                    self.progress(row, len(records))
+
+        return created
+
+    def _save_pending(self, pending, errors):
+        """
+        Validate the uniqueness of the pending objects and create them, unless any errors have been found.
+        """
+        if pending:
+            errors.extend(self._validate_unique(pending))
+        if errors:
+            raise ValidationError([error for row, error in sorted(errors)])
+        return self._create(pending) if pending else []
+
+    def _restrict_form_fields(self, obj_form):
+        # Related objects which were resolved in advance have been restricted already
+        for field in obj_form.fields.values():
+            if getattr(field, 'related_objects', None) is not None:
+                continue
+            if isinstance(getattr(field, 'queryset', None), RestrictedQuerySet):
+                field.queryset = field.queryset.restrict(self.user, 'view')
+
+    def _validate_unique(self, pending):
+        """
+        Validate the uniqueness of the pending objects, among themselves and against existing objects, and return a
+        list of (row, error) pairs.
+        """
+        # Map each unique set of fields to the values of each object
+        unique_values = defaultdict(list)
+        for row, obj_form in pending:
+            for model_class, unique_check in obj_form.get_unique_checks():
+                values = tuple(
+                    getattr(obj_form.instance, model_class._meta.get_field(name).attname) for name in unique_check
+                )
+                # As in Model.validate_unique(), null values are not compared
+                if None not in values:
+                    unique_values[(model_class, unique_check)].append((row, obj_form, values))
+
+        errors = []
+        for (model_class, unique_check), objects in unique_values.items():
+            seen = self._get_existing_values(model_class, unique_check, [values for _, _, values in objects])
+            for row, obj_form, values in objects:
+                if values in seen:
+                    error = obj_form.instance.unique_error_message(model_class, unique_check)
+                    field = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+                    errors.append((row, f"Row {row} {field}: {error.messages[0]}"))
+                seen.add(values)
+
+        # Models which enforce uniqueness in clean() (e.g. IP space) only find duplicates among existing objects, so
+        # check for duplicates among the pending objects too
+        if hasattr(self.model, 'get_duplicate_key'):
+            pending_objects = defaultdict(list)
+            for row, obj_form in pending:
+                instance = obj_form.instance
+                key = instance.get_duplicate_key()
+                if key is None:
+                    continue
+                try:
+                    instance.validate_duplicates(pending_objects[key])
+                except ValidationError as e:
+                    for field, messages in e.message_dict.items():
+                        errors.append((row, f"Row {row} {field}: {messages[0]}"))
+                pending_objects[key].append(instance)
+
+        return errors
+
+    def _get_existing_values(self, model_class, unique_check, values):
+        """
+        Return the set of the given values of the unique fields which belong to existing objects.
+        """
+        queryset = model_class._default_manager.using(self.using)
+        if len(unique_check) == 1:
+            return set(queryset.filter(**{f'{unique_check[0]}__in': [v[0] for v in values]}).values_list(*unique_check))
+
+        existing = set()
+        for i in range(0, len(values), UNIQUE_CHECK_CHUNK_SIZE):
+            conditions = Q()
+            for chunk_values in values[i:i + UNIQUE_CHECK_CHUNK_SIZE]:
+                conditions |= Q(**dict(zip(unique_check, chunk_values)))
+            existing.update(queryset.filter(conditions).values_list(*unique_check))
+        return existing
+
+    def _create(self, pending):
+        """
+        Create the objects of the given valid forms using bulk_create(), sending the pre_save and post_save signals
+        for each. The model may define a bulk_created() classmethod to process the new objects together, before
+        post_save is sent.
+        """
+        forms = [obj_form for row, obj_form in pending]
+        instances = [obj_form.save(commit=False) for obj_form in forms]
+
+        for instance in instances:
+            if hasattr(instance, 'presave'):
+                instance.presave()
+            pre_save.send(sender=self.model, instance=instance, raw=False, using=self.using, update_fields=None)
+
+        self.model._default_manager.using(self.using).bulk_create(instances)
+        if hasattr(self.model, 'bulk_created'):
+            self.model.bulk_created(instances)
+
+        for obj_form, instance in zip(forms, instances):
+            obj_form.save_m2m()
+            post_save.send(
+                sender=self.model, instance=instance, created=True, raw=False, using=self.using, update_fields=None
+            )
+
+        return instances
@@ -1,13 +1,14 @@
 import csv
 import json
 import re
+from collections import defaultdict
 from io import StringIO
 
 import django_filters
 from django import forms
 from django.conf import settings
 from django.forms.fields import JSONField as _JSONField, InvalidJSONInput
-from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.core.exceptions import FieldDoesNotExist, MultipleObjectsReturned, ObjectDoesNotExist, ValidationError
 from django.db.models import Count
 from django.forms import BoundField
 from django.urls import reverse
@@ -128,13 +129,58 @@ class CSVChoiceField(forms.ChoiceField):
 class CSVModelChoiceField(forms.ModelChoiceField):
     """
     Provides additional validation for model choices entered as CSV data.
+
+    `related_objects` may be set to a dictionary mapping CSV values to the objects they match (as returned by
+    resolve_values()), in which case those values are not looked up individually. It is discarded if the field's
+    queryset is subsequently changed.
     """
     default_error_messages = {
         'invalid_choice': 'Object not found.',
     }
 
+    def _set_queryset(self, queryset):
+        super()._set_queryset(queryset)
+        # Objects resolved using the previous queryset may not belong to the new one
+        self.related_objects = None
+
+    queryset = property(forms.ModelChoiceField._get_queryset, _set_queryset)
+
+    def resolve_values(self, values):
+        """
+        Look up the objects matching each of the given CSV values using a single query. Returns a dictionary mapping
+        each value to the list of objects it matches, or None if the values cannot be resolved in bulk.
+        """
+        key = self.to_field_name or 'pk'
+        try:
+            model_field = self.queryset.model._meta.get_field(key) if key != 'pk' else self.queryset.model._meta.pk
+        except FieldDoesNotExist:
+            return None
+
+        # Convert each value as the database lookup would, discarding those which are invalid
+        lookup_values = {}
+        for value in values:
+            try:
+                lookup_values[value] = model_field.to_python(value)
+            except ValidationError:
+                pass
+
+        matches = defaultdict(list)
+        for obj in self.queryset.filter(**{f'{key}__in': set(lookup_values.values())}):
+            matches[getattr(obj, model_field.attname)].append(obj)
+
+        return {
+            value: matches.get(lookup_values[value], []) if value in lookup_values else [] for value in values
+        }
+
     def to_python(self, value):
         try:
+            if self.related_objects is not None and isinstance(value, str) and value in self.related_objects:
+                objects = self.related_objects[value]
+                if len(objects) > 1:
+                    raise MultipleObjectsReturned
+                if not objects:
+                    raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+                return objects[0]
             return super().to_python(value)
         except MultipleObjectsReturned:
             raise forms.ValidationError(
@@ -151,6 +197,10 @@ class CSVContentTypeField(CSVModelChoiceField):
     def prepare_value(self, value):
         return f'{value.app_label}.{value.model}'
 
+    def resolve_values(self, values):
+        # ContentTypes are cached
+        return None
+
     def to_python(self, value):
         try:
             app_label, model = value.split('.')
@@ -3,6 +3,8 @@ import re
 
 import yaml
 from django import forms
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import ForeignKey
 
 
 __all__ = (
@@ -97,8 +99,16 @@ class BulkRenameForm(forms.Form):
 class CSVModelForm(forms.ModelForm):
     """
     ModelForm used for the import of objects in CSV format.
+
+    :param headers: The CSV column headers, mapping field names to the attribute by which they reference a related
+        object (see CSVDataField)
+    :param related_objects: A dictionary mapping field names to the related objects matched by each CSV value, which
+        have been resolved in advance (see CSVModelChoiceField)
     """
-    def __init__(self, *args, headers=None, **kwargs):
+    # Set when the uniqueness of many imported objects is validated at once (see CSVImporter)
+    defer_unique_validation = False
+
+    def __init__(self, *args, headers=None, related_objects=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Modify the model form to accommodate any customized to_field_name properties
@@ -107,6 +117,43 @@ class CSVModelForm(forms.ModelForm):
                 if to_field is not None:
                     self.fields[field].to_field_name = to_field
 
+        if related_objects:
+            for field, objects in related_objects.items():
+                self.fields[field].related_objects = objects
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+
+        # Related objects resolved in advance are known to exist, so the model need not query for each of them again
+        for name, field in self.fields.items():
+            if getattr(field, 'related_objects', None) is None or self.cleaned_data.get(name) is None:
+                continue
+            try:
+                model_field = self.instance._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if isinstance(model_field, ForeignKey) and not model_field.remote_field.limit_choices_to:
+                exclude.append(name)
+
+        return exclude
+
+    def validate_unique(self):
+        if self.defer_unique_validation:
+            return
+        # Fields excluded from the model's validation above must still be included in its unique checks
+        try:
+            self.instance.validate_unique(exclude=super()._get_validation_exclusions())
+        except ValidationError as e:
+            self._update_errors(e)
+
+    def get_unique_checks(self):
+        """
+        Return the (model, fields) pairs identifying each set of fields which must be unique for the form's instance,
+        excluding any fields which are not validated by the form.
+        """
+        unique_checks, date_checks = self.instance._get_unique_checks(exclude=super()._get_validation_exclusions())
+        return unique_checks
+
 
 class ImportForm(BootstrapMixin, forms.Form):
     """
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 INTERFACE_NAME_REGEX = r'(^(?P<type>[^\d\.:]+)?)' \
                        r'((?P<slot>\d+)/)?' \
@@ -9,6 +10,12 @@ INTERFACE_NAME_REGEX = r'(^(?P<type>[^\d\.:]+)?)' \
                        r'(:(?P<channel>\d+))?' \
                        r'(\.(?P<vc>\d+))?' \
                        r'(?P<remainder>.*)$'
+INTERFACE_NAME_PATTERN = re.compile(INTERFACE_NAME_REGEX)
+INTEGER_PATTERN = re.compile(r'(\d+)')
+
+# The number of recently naturalized values remembered by each naturalization function. Many objects share the same
+# names (e.g. the interfaces of devices of the same type), so these are frequently naturalized repeatedly.
+NATURALIZE_CACHE_SIZE = 16384
 
 
 def naturalize(value, max_length, integer_places=8):
@@ -32,8 +39,13 @@ def naturalize(value, max_length, integer_places=8):
     """
     if not value:
         return value
+    return _naturalize(value, max_length, integer_places)
+
+
+@lru_cache(maxsize=NATURALIZE_CACHE_SIZE)
+def _naturalize(value, max_length, integer_places):
     output = []
-    for segment in re.split(r'(\d+)', value):
+    for segment in INTEGER_PATTERN.split(value):
         if segment.isdigit():
             output.append(segment.rjust(integer_places, '0'))
         elif segment:
@@ -51,8 +63,13 @@ def naturalize_interface(value, max_length):
     :param value: The value to be naturalized
     :param max_length: The maximum length of the returned string. Characters beyond this length will be stripped.
     """
+    return _naturalize_interface(value, max_length)
+
+
+@lru_cache(maxsize=NATURALIZE_CACHE_SIZE)
+def _naturalize_interface(value, max_length):
     output = ''
-    match = re.search(INTERFACE_NAME_REGEX, value)
+    match = INTERFACE_NAME_PATTERN.search(value)
     if match is None:
         return value
 
@@ -1,5 +1,17 @@
+import logging
+import time
+
+from cacheops.redis import redis_client
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import Q
+from redis.exceptions import RedisError
+
+# Redis key holding the version of all ObjectPermissions, incremented whenever the permissions granted to any user
+# may have changed
+PERMISSIONS_VERSION_KEY = 'netbox:permissions:version'
 
 
 def get_permission_for_model(model, action):
@@ -72,3 +84,152 @@ def permission_is_exempt(name):
             return True
 
     return False
+
+
+def compile_constraints(constraint_sets):
+    """
+    Compile a list of ObjectPermission constraint sets into a single Q object matching any of them. An empty Q object
+    (matching all objects) is returned if any constraint set is null.
+
+    :param constraint_sets: A list of dictionaries (or lists of dictionaries) of ORM query parameters
+    """
+    constraints = Q()
+    for constraint_set in constraint_sets:
+        if type(constraint_set) is list:
+            for c in constraint_set:
+                constraints |= Q(**c)
+        elif constraint_set:
+            constraints |= Q(**constraint_set)
+        else:
+            # Found ObjectPermission with null constraints; allow model-level access
+            return Q()
+
+    return constraints
+
+
+def get_permissions_version():
+    """
+    Return the current version of all ObjectPermissions, initializing it if necessary. The version is initialized
+    to a timestamp rather than zero, so that it never repeats a previous value should the key be lost.
+    """
+    version = redis_client.get(PERMISSIONS_VERSION_KEY)
+    if version is None:
+        redis_client.set(PERMISSIONS_VERSION_KEY, int(time.time() * 1000), nx=True)
+        version = redis_client.get(PERMISSIONS_VERSION_KEY)
+    return version
+
+
+def _increment_permissions_version():
+    try:
+        redis_client.incr(PERMISSIONS_VERSION_KEY)
+    except RedisError as e:
+        logging.getLogger('netbox.permissions').warning(f"Unable to update permissions version: {e}")
+
+
+def invalidate_object_permissions():
+    """
+    Invalidate the cached permissions of all users. The version is incremented both immediately and once the current
+    transaction (if any) has been committed, so that permissions cached in the meantime are not retained.
+    """
+    if not settings.CACHEOPS_ENABLED:
+        return
+    _increment_permissions_version()
+    transaction.on_commit(_increment_permissions_version)
+
+
+def _compile_predicate(model, constraints):
+    """
+    Compile a Q object comprising only exact and "in" lookups on concrete local fields of the given model into a
+    function which evaluates whether a model instance matches it. Returns None if the Q object cannot be evaluated in
+    Python.
+    """
+    if constraints.negated:
+        return None
+
+    predicates = []
+    for child in constraints.children:
+        if isinstance(child, Q):
+            predicate = _compile_predicate(model, child)
+        else:
+            predicate = _compile_lookup(model, *child)
+        if predicate is None:
+            return None
+        predicates.append(predicate)
+
+    if constraints.connector == Q.OR:
+        return lambda obj: any(predicate(obj) for predicate in predicates)
+    return lambda obj: all(predicate(obj) for predicate in predicates)
+
+
+def _compile_lookup(model, lookup, value):
+    # Lookups which traverse a relationship are never evaluated in Python, as related objects may have been modified
+    # since they were cached on the instance
+    field_name, _, lookup_type = lookup.partition('__')
+    if lookup_type not in ('', 'exact', 'in'):
+        return None
+
+    try:
+        field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.many_to_many:
+        return None
+
+    # Convert the lookup value(s) to the field's Python type, using the target field for a foreign key. Only Django's
+    # own field types are supported: the Python values of custom fields may not compare as the database does (for
+    # example, netaddr considers 192.0.2.1/24 and 192.0.2.2/24 to be equal).
+    target_field = field.target_field if field.is_relation else field
+    if not type(target_field).__module__.startswith('django.'):
+        return None
+    try:
+        if lookup_type == 'in':
+            values = {target_field.to_python(v) for v in value}
+            return lambda obj: getattr(obj, field.attname) in values
+        value = None if value is None else target_field.to_python(value)
+    except (TypeError, ValidationError):
+        return None
+
+    return lambda obj: getattr(obj, field.attname) == value
+
+
+def get_permitted_objects(user, action, objects, queryset=None):
+    """
+    Return the subset of the given objects on which the user has been granted the specified action. Where possible,
+    the user's permission constraints are evaluated against the objects' attributes without querying the database;
+    otherwise, the permitted objects are identified using a single query.
+
+    :param user: User instance
+    :param action: The action which must be permitted (e.g. "change" for "dcim.change_site")
+    :param objects: A list of model instances, or of primary keys (in which case `queryset` must be specified)
+    :param queryset: The base QuerySet to which permitted objects must also belong (optional)
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+    if queryset is None:
+        queryset = objects[0]._meta.model._default_manager.all()
+    model = queryset.model
+
+    # Resolve the constraints which a permitted object must satisfy
+    permission_required = f'{model._meta.app_label}.{action}_{model._meta.model_name}'
+    if user.is_superuser or permission_is_exempt(permission_required):
+        constraints = Q()
+    elif not user.is_authenticated or permission_required not in user.get_all_permissions():
+        return []
+    else:
+        # Compiled by ObjectPermissionBackend
+        constraints = user._object_perm_cache[permission_required]
+
+    instances = isinstance(objects[0], model)
+    if not queryset.query.has_filters():
+        if not constraints:
+            return objects
+
+        # Evaluate the constraints in Python if the objects are instances and the constraints are simple
+        predicate = _compile_predicate(model, constraints) if instances else None
+        if predicate is not None:
+            return [obj for obj in objects if predicate(obj)]
+
+    pks = [obj.pk if instances else model._meta.pk.to_python(obj) for obj in objects]
+    permitted_pks = set(queryset.filter(constraints, pk__in=pks).values_list('pk', flat=True))
+    return [obj for obj, pk in zip(objects, pks) if pk in permitted_pks]
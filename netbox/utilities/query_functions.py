@@ -1,4 +1,4 @@
-from django.contrib.postgres.aggregates import JSONBAgg
+from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
 from django.contrib.postgres.aggregates.mixins import OrderableAggMixin
 from django.db.models import F, Func
 
@@ -27,3 +27,10 @@ class EmptyGroupByJSONBAgg(OrderableJSONBAgg):
     TODO in Django 3.2 ordering is supported natively on JSONBAgg so we only need to inherit from JSONBAgg.
     """
     contains_aggregate = False
+
+
+class EmptyGroupByArrayAgg(ArrayAgg):
+    """
+    An ArrayAgg which omits the GROUP BY clause, for use in subquery annotations (see EmptyGroupByJSONBAgg).
+    """
+    contains_aggregate = False
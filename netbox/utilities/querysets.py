@@ -1,7 +1,13 @@
-from django.db.models import Q, QuerySet
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet, prefetch_related_objects
 
 from utilities.permissions import permission_is_exempt
 
+# Default number of objects retrieved at a time when iterating over a queryset using a server-side cursor
+ITERATOR_CHUNK_SIZE = 2000
+
 
 class RestrictedQuerySet(QuerySet):
 
@@ -26,19 +32,84 @@ class RestrictedQuerySet(QuerySet):
         elif not user.is_authenticated or permission_required not in user.get_all_permissions():
             qs = self.none()
 
-        # Filter the queryset to include only objects with allowed attributes
+        # Filter the queryset to include only objects with allowed attributes (compiled by ObjectPermissionBackend)
         else:
-            attrs = Q()
-            for perm_attrs in user._object_perm_cache[permission_required]:
-                if type(perm_attrs) is list:
-                    for p in perm_attrs:
-                        attrs |= Q(**p)
-                elif perm_attrs:
-                    attrs |= Q(**perm_attrs)
-                else:
-                    # Any permission with null constraints grants access to _all_ instances
-                    attrs = Q()
-                    break
-            qs = self.filter(attrs)
+            qs = self.filter(user._object_perm_cache[permission_required])
 
         return qs
+
+
+def iterate_queryset(queryset, chunk_size=ITERATOR_CHUNK_SIZE):
+    """
+    Iterate over a queryset using a server-side cursor, retrieving chunk_size objects at a time so that memory use is
+    bounded regardless of the number of objects. Unlike QuerySet.iterator(), any prefetch_related() lookups are
+    applied to each chunk.
+    """
+    lookups = queryset._prefetch_related_lookups
+    iterator = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield from chunk
+
+
+def get_cached_relations(instance, prefix=''):
+    """
+    Return the lookups (e.g. "rack__group") of all forward relations which have been retrieved for a model instance,
+    including those of the related objects.
+    """
+    lookups = []
+    for name, related in instance._state.fields_cache.items():
+        try:
+            field = instance._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        # Generic foreign keys and reverse relations cannot be followed by select_related()
+        if not field.concrete or not (field.many_to_one or field.one_to_one):
+            continue
+        lookups.append(f'{prefix}{name}')
+        if related is not None:
+            lookups.extend(get_cached_relations(related, f'{prefix}{name}__'))
+
+    return lookups
+
+
+def select_accessed_relations(queryset, func, sample_size=10):
+    """
+    Apply select_related() to a queryset for each forward relation accessed by func() when called on a sample of its
+    objects. For example, this determines the related objects used to represent objects in CSV format using to_csv().
+    """
+    lookups = set()
+    for obj in queryset[:sample_size]:
+        func(obj)
+        lookups.update(get_cached_relations(obj))
+
+    return queryset.select_related(*lookups) if lookups else queryset
+
+
+class StreamingQuerySet:
+    """
+    A proxy for a QuerySet which iterates over the queryset using a server-side cursor (see iterate_queryset()), for
+    use where a large queryset is rendered by a template. All other attributes are those of the QuerySet.
+    """
+    def __init__(self, queryset, chunk_size=ITERATOR_CHUNK_SIZE):
+        self.queryset = queryset
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return iterate_queryset(self.queryset, self.chunk_size)
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __bool__(self):
+        return self.queryset.exists()
+
+    def __getitem__(self, k):
+        return self.queryset[k]
+
+    def __getattr__(self, name):
+        return getattr(self.queryset, name)
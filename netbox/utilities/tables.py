@@ -1,12 +1,22 @@
+from functools import lru_cache
+
 import django_tables2 as tables
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.exceptions import FieldDoesNotExist
 from django.db.models.fields.related import RelatedField
+from django.template import Context, Template
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django_tables2.data import TableQuerysetData
 
+from .permissions import get_permitted_objects
+
+
+@lru_cache(maxsize=None)
+def _compile_template(template_code):
+    return Template(template_code)
+
 
 class BaseTable(tables.Table):
     """
@@ -136,7 +146,8 @@ class BooleanColumn(tables.Column):
 
 class ButtonsColumn(tables.TemplateColumn):
     """
-    Render edit, delete, and changelog buttons for an object.
+    Render edit, delete, and changelog buttons for an object. The edit and delete buttons are shown only for objects on
+    which the user has been granted the respective permission, as determined for all rows of the table at once.
 
     :param model: Model class to use for calculating URL view names
     :param prepend_content: Additional template content to render in the column (optional)
@@ -151,12 +162,12 @@ class ButtonsColumn(tables.TemplateColumn):
             <i class="mdi mdi-history"></i>
         </a>
     {{% endif %}}
-    {{% if "edit" in buttons and perms.{app_label}.change_{model_name} %}}
+    {{% if "edit" in buttons and perms.{app_label}.change_{model_name} and can_change %}}
         <a href="{{% url '{app_label}:{model_name}_edit' {pk_field}=record.{pk_field} %}}?return_url={{{{ request.path }}}}{{{{ return_url_extra }}}}" class="btn btn-xs btn-warning" title="Edit">
             <i class="mdi mdi-pencil"></i>
         </a>
     {{% endif %}}
-    {{% if "delete" in buttons and perms.{app_label}.delete_{model_name} %}}
+    {{% if "delete" in buttons and perms.{app_label}.delete_{model_name} and can_delete %}}
         <a href="{{% url '{app_label}:{model_name}_delete' {pk_field}=record.{pk_field} %}}?return_url={{{{ request.path }}}}{{{{ return_url_extra }}}}" class="btn btn-xs btn-danger" title="Delete">
             <i class="mdi mdi-trash-can-outline"></i>
         </a>
@@ -187,6 +198,38 @@ class ButtonsColumn(tables.TemplateColumn):
     def header(self):
         return ''
 
+    @staticmethod
+    def get_permitted_objects(table, user, action):
+        """
+        Return the IDs of the records in the table (or its current page) on which the user has been granted the
+        specified action. These are determined once per table.
+        """
+        if not hasattr(table, '_permitted_objects'):
+            table._permitted_objects = {}
+        if action not in table._permitted_objects:
+            rows = table.page.object_list if hasattr(table, 'page') else table.rows
+            records = [row.record for row in rows]
+            table._permitted_objects[action] = {id(obj) for obj in get_permitted_objects(user, action, records)}
+        return table._permitted_objects[action]
+
+    def render(self, record, table, value, bound_column, **kwargs):
+        context = getattr(table, 'context', Context())
+        user = getattr(context.get('request'), 'user', None)
+
+        additional_context = {
+            'default': bound_column.default,
+            'column': bound_column,
+            'record': record,
+            'value': value,
+            'row_counter': kwargs['bound_row'].row_counter,
+            # Without a request, rely solely on the model-level permissions available in the template context
+            'can_change': user is None or id(record) in self.get_permitted_objects(table, user, 'change'),
+            'can_delete': user is None or id(record) in self.get_permitted_objects(table, user, 'delete'),
+        }
+        additional_context.update(self.extra_context)
+        with context.update(additional_context):
+            return _compile_template(self.template_code).render(context)
+
 
 class ChoiceFieldColumn(tables.Column):
     """
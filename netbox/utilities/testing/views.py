@@ -572,6 +572,8 @@ class ViewTestCases:
                 response = self.client.get('{}?export'.format(self._get_url('list')))
                 self.assertHttpStatus(response, 200)
                 self.assertEqual(response.get('Content-Type'), 'text/csv')
+                content = b''.join(response.streaming_content).decode('utf-8')
+                self.assertTrue(content.startswith(','.join(self.model.csv_headers)))
 
         @override_settings(EXEMPT_VIEW_PERMISSIONS=[])
         def test_list_objects_with_constrained_permission(self):
@@ -0,0 +1,233 @@
+import uuid
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from dcim.choices import InterfaceTypeChoices
+from dcim.forms import DeviceCSVForm, InterfaceCSVForm, SiteCSVForm
+from dcim.models import Device, DeviceRole, DeviceType, Interface, Manufacturer, Site
+from extras.context_managers import change_logging
+from extras.models import ObjectChange
+from ipam.forms import IPAddressCSVForm, PrefixCSVForm
+from ipam.models import IPAddress, Prefix
+from users.models import ObjectPermission
+from utilities.csv_import import CSVImporter, can_bulk_create
+from utilities.forms import CSVDataField
+from utilities.utils import NetBoxFakeRequest
+from virtualization.models import VirtualMachine
+
+
+def parse_csv(model_form, data):
+    return CSVDataField(from_form=model_form).clean(data)
+
+
+@override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
+class CSVImporterTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', is_superuser=True)
+
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        device_role = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        self.sites = (
+            Site.objects.create(name='Site 1', slug='site-1'),
+            Site.objects.create(name='Site 2', slug='site-2'),
+        )
+        self.devices = (
+            Device.objects.create(name='Device 1', device_type=device_type, device_role=device_role, site=self.sites[0]),
+            Device.objects.create(name='Device 2', device_type=device_type, device_role=device_role, site=self.sites[1]),
+        )
+
+    def run_import(self, model_form, data, **kwargs):
+        headers, records = parse_csv(model_form, data)
+        return CSVImporter(model_form, headers, self.user, **kwargs).run(records)
+
+    def test_can_bulk_create(self):
+        self.assertTrue(can_bulk_create(Site))
+        self.assertTrue(can_bulk_create(Interface))
+        self.assertTrue(can_bulk_create(IPAddress))
+        # Devices create their components when saved
+        self.assertFalse(can_bulk_create(Device))
+        # Virtual machines validate their uniqueness specially
+        self.assertFalse(can_bulk_create(VirtualMachine))
+
+    def test_import_objects(self):
+        data = "device,name,type\n" + "".join(
+            f"Device {i % 2 + 1},Interface {i},{InterfaceTypeChoices.TYPE_1GE_FIXED}\n" for i in range(10)
+        )
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        progress = []
+        with connection.execute_wrapper(count_query):
+            interfaces = self.run_import(
+                InterfaceCSVForm, data, batch_size=4, progress=lambda count, total: progress.append((count, total))
+            )
+
+        self.assertEqual([interface.name for interface in interfaces], [f'Interface {i}' for i in range(10)])
+        self.assertEqual(Interface.objects.filter(device=self.devices[1]).count(), 5)
+        self.assertEqual(progress, [(4, 10), (8, 10), (10, 10)])
+
+        # Devices are retrieved using a single query, and interfaces are created up to four at a time
+        self.assertEqual(len([sql for sql in queries if 'FROM "dcim_device"' in sql]), 1)
+        self.assertEqual(len([sql for sql in queries if sql.startswith('INSERT INTO "dcim_interface"')]), 3)
+
+    def test_import_self_reference(self):
+        data = (
+            "device,name,type,lag\n"
+            f"Device 1,LAG 1,{InterfaceTypeChoices.TYPE_LAG},\n"
+            f"Device 1,Interface 1,{InterfaceTypeChoices.TYPE_1GE_FIXED},LAG 1\n"
+        )
+        self.run_import(InterfaceCSVForm, data)
+
+        interface = Interface.objects.get(name='Interface 1')
+        self.assertEqual(interface.lag, Interface.objects.get(name='LAG 1'))
+
+    def test_import_errors(self):
+        Site.objects.create(name='Site 3', slug='site-3')
+        data = (
+            "name,slug,tenant\n"
+            "Site 3,site-4,\n"
+            "Site 5,site-5,\n"
+            "Site 6,site-5,\n"
+            "Site 7,site-7,Tenant 1\n"
+        )
+
+        with self.assertRaises(ValidationError) as cm:
+            self.run_import(SiteCSVForm, data)
+
+        self.assertEqual(cm.exception.messages, [
+            'Row 1 name: Site with this Name already exists.',
+            'Row 3 slug: Site with this Slug already exists.',
+            'Row 4 tenant: Object not found.',
+        ])
+        self.assertFalse(Site.objects.filter(slug='site-5').exists())
+
+    @override_settings(ENFORCE_GLOBAL_UNIQUE=True)
+    def test_import_duplicate_ip_space(self):
+        data = (
+            "prefix,status\n"
+            "10.0.0.0/24,active\n"
+            "10.0.1.0/24,active\n"
+            "10.0.0.0/24,active\n"
+        )
+        with self.assertRaises(ValidationError) as cm:
+            self.run_import(PrefixCSVForm, data)
+        self.assertEqual(cm.exception.messages, [
+            'Row 3 prefix: Duplicate prefix found in global table: 10.0.0.0/24',
+        ])
+        self.assertFalse(Prefix.objects.exists())
+
+        data = (
+            "address,status,role\n"
+            "10.0.0.1/24,active,\n"
+            "10.0.0.1/25,active,\n"
+            "10.0.0.2/24,active,vip\n"
+            "10.0.0.2/24,active,vip\n"
+        )
+        with self.assertRaises(ValidationError) as cm:
+            self.run_import(IPAddressCSVForm, data)
+        self.assertEqual(cm.exception.messages, [
+            'Row 2 address: Duplicate IP address found in global table: 10.0.0.1/24',
+        ])
+        self.assertFalse(IPAddress.objects.exists())
+
+    def test_import_nested_prefixes(self):
+        data = (
+            "prefix,status\n"
+            "10.0.0.0/16,active\n"
+            "10.0.1.0/24,active\n"
+            "10.0.1.0/25,active\n"
+        )
+        self.run_import(PrefixCSVForm, data)
+
+        prefixes = {str(p.prefix): p for p in Prefix.objects.all()}
+        self.assertEqual(prefixes['10.0.0.0/16']._depth, 0)
+        self.assertEqual(prefixes['10.0.0.0/16']._children, 2)
+        self.assertEqual(prefixes['10.0.1.0/24']._depth, 1)
+        self.assertEqual(prefixes['10.0.1.0/24']._children, 1)
+        self.assertEqual(prefixes['10.0.1.0/25']._depth, 2)
+        self.assertEqual(prefixes['10.0.1.0/25']._children, 0)
+
+    def test_import_ambiguous_object(self):
+        Device.objects.create(
+            name='Device 1', device_type=self.devices[0].device_type, device_role=self.devices[0].device_role,
+            site=self.sites[1]
+        )
+        data = f"device,name,type\nDevice 1,Interface 1,{InterfaceTypeChoices.TYPE_1GE_FIXED}\n"
+
+        with self.assertRaises(ValidationError) as cm:
+            self.run_import(InterfaceCSVForm, data)
+
+        self.assertEqual(cm.exception.messages, [
+            'Row 1 device: "Device 1" is not a unique value for this field; multiple objects were found'
+        ])
+
+    def test_import_restricted_objects(self):
+        user = User.objects.create_user(username='testuser2')
+        obj_perm = ObjectPermission(name='Test permission', constraints={'name': 'Device 2'}, actions=['view'])
+        obj_perm.save()
+        obj_perm.users.add(user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(Device))
+        self.user = User.objects.get(pk=user.pk)
+
+        data = (
+            "device,name,type\n"
+            f"Device 1,Interface 1,{InterfaceTypeChoices.TYPE_1GE_FIXED}\n"
+            f"Device 2,Interface 1,{InterfaceTypeChoices.TYPE_1GE_FIXED}\n"
+        )
+        with override_settings(EXEMPT_VIEW_PERMISSIONS=[]), self.assertRaises(ValidationError) as cm:
+            self.run_import(InterfaceCSVForm, data)
+
+        self.assertEqual(cm.exception.messages, ['Row 1 device: Object not found.'])
+
+    def test_import_primary_ip(self):
+        Interface.objects.create(device=self.devices[0], name='Interface 1')
+        data = (
+            "address,status,device,interface,is_primary\n"
+            "192.0.2.1/24,active,Device 1,Interface 1,true\n"
+        )
+        ip_address, = self.run_import(IPAddressCSVForm, data)
+
+        self.assertEqual(ip_address.assigned_object, Interface.objects.get(name='Interface 1'))
+        self.assertEqual(Device.objects.get(pk=self.devices[0].pk).primary_ip4, ip_address)
+
+    def test_import_saved_individually(self):
+        data = (
+            "name,device_role,manufacturer,device_type,status,site\n"
+            "Device 3,Device Role 1,Manufacturer 1,Device Type 1,active,Site 1\n"
+        )
+        device, = self.run_import(DeviceCSVForm, data)
+
+        self.assertEqual(device.site, self.sites[0])
+        self.assertTrue(Device.objects.filter(name='Device 3').exists())
+
+    def test_change_logging(self):
+        request = NetBoxFakeRequest({
+            'id': uuid.uuid4(),
+            'user': self.user,
+        })
+        with change_logging(request):
+            sites = self.run_import(SiteCSVForm, "name,slug\nSite 3,site-3\nSite 4,site-4\n")
+
+        objectchanges = ObjectChange.objects.filter(request_id=request.id)
+        self.assertEqual(sorted(oc.changed_object_id for oc in objectchanges), sorted(site.pk for site in sites))
+
+    def test_import_csv_command(self):
+        data = f"device,name,type\nDevice 2,Interface 1,{InterfaceTypeChoices.TYPE_1GE_FIXED}\n"
+        stdout = StringIO()
+        call_command('import_csv', 'dcim.interface', '-', user='testuser', stdin=StringIO(data), stdout=stdout)
+
+        self.assertTrue(Interface.objects.filter(device=self.devices[1], name='Interface 1').exists())
+        self.assertIn('Imported 1 interfaces', stdout.getvalue())
+        self.assertEqual(ObjectChange.objects.filter(changed_object_type__model='interface').count(), 1)
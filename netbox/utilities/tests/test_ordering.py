@@ -1,5 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
+from dcim.models import Device, DeviceRole, DeviceType, Interface, Manufacturer, Site
 from utilities.ordering import naturalize, naturalize_interface
 
 
@@ -63,3 +67,31 @@ class NaturalizationTestCase(TestCase):
 
     def test_naturalize_interface_max_length(self):
         self.assertEqual(naturalize_interface('Gi1/2/3', max_length=20), '0001000299999999Gi00')
+
+
+class RenaturalizeTestCase(TestCase):
+
+    def setUp(self):
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        device = Device.objects.create(
+            name='Device 1',
+            device_type=DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1'),
+            device_role=DeviceRole.objects.create(name='Device Role 1', slug='device-role-1'),
+            site=Site.objects.create(name='Site 1', slug='site-1')
+        )
+        Interface.objects.bulk_create([
+            Interface(device=device, name=name)
+            for name in ('Gi1/0/1', 'Gi1/0/2', 'Gi1/0/10', 'Te1/1', 'eth0')
+        ])
+
+    def test_renaturalize(self):
+        for processes in (1, 2):
+            Interface.objects.filter(name__in=('Gi1/0/1', 'eth0')).update(_name='stale')
+            stdout = StringIO()
+            call_command('renaturalize', 'dcim.Interface', batch_size=2, processes=processes, stdout=stdout)
+
+            for interface in Interface.objects.all():
+                self.assertEqual(interface._name, naturalize_interface(interface.name, max_length=100))
+
+            # Only the interfaces whose naturalized names have changed are updated
+            self.assertIn('2 interfaces updated (5 processed', stdout.getvalue())
@@ -0,0 +1,115 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+
+from dcim.models import Region, Site
+from ipam.models import IPAddress
+from users.models import ObjectPermission
+from utilities.permissions import get_permitted_objects
+
+
+@override_settings(EXEMPT_VIEW_PERMISSIONS=[])
+class GetPermittedObjectsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.regions = (
+            Region(name='Region 1', slug='region-1'),
+            Region(name='Region 2', slug='region-2'),
+        )
+        for region in cls.regions:
+            region.save()
+
+        cls.sites = (
+            Site(name='Site 1', slug='site-1', region=cls.regions[0], status='active'),
+            Site(name='Site 2', slug='site-2', region=cls.regions[0], status='planned'),
+            Site(name='Site 3', slug='site-3', region=cls.regions[1], status='active'),
+            Site(name='Site 4', slug='site-4', status='active'),
+        )
+        Site.objects.bulk_create(cls.sites)
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+
+    def add_permission(self, constraints, model=Site):
+        obj_perm = ObjectPermission(name='Test permission', constraints=constraints, actions=['view'])
+        obj_perm.save()
+        obj_perm.users.add(self.user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(model))
+
+    def get_user(self):
+        # Retrieve a new instance of the user and load its permissions
+        user = User.objects.get(pk=self.user.pk)
+        user.get_all_permissions()
+        return user
+
+    def test_no_permission(self):
+        user = self.get_user()
+        self.assertEqual(get_permitted_objects(user, 'view', self.sites), [])
+
+    def test_superuser(self):
+        self.user.is_superuser = True
+        self.user.save()
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permitted_objects(user, 'view', self.sites), list(self.sites))
+
+    def test_unconstrained_permission(self):
+        self.add_permission(None)
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permitted_objects(user, 'view', self.sites), list(self.sites))
+
+    def test_simple_constraints(self):
+        # Equality and "in" lookups on concrete fields are evaluated without querying the database
+        self.add_permission([
+            {'region': self.regions[0].pk, 'status': 'active'},
+            {'region_id__in': [self.regions[1].pk]},
+        ])
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permitted_objects(user, 'view', self.sites), [self.sites[0], self.sites[2]])
+
+    def test_complex_constraints(self):
+        # Lookups spanning relationships are evaluated using a single query
+        self.add_permission({'region__name': 'Region 1'})
+        user = self.get_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_permitted_objects(user, 'view', self.sites), [self.sites[0], self.sites[1]])
+
+    def test_modified_related_object(self):
+        # Constraints spanning relationships are evaluated against the database, not related objects cached on the
+        # instances
+        self.add_permission({'region__name': 'Region 1'})
+        sites = list(Site.objects.select_related('region').order_by('pk'))
+        Region.objects.filter(pk=self.regions[0].pk).update(name='Region 3')
+        user = self.get_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_permitted_objects(user, 'view', sites), [])
+
+    def test_custom_field_type(self):
+        # Fields whose Python values compare differently from the database are evaluated using a query
+        self.add_permission({'address': '192.0.2.1/24'}, model=IPAddress)
+        ip_addresses = (
+            IPAddress(address='192.0.2.1/24'),
+            IPAddress(address='192.0.2.2/24'),
+        )
+        IPAddress.objects.bulk_create(ip_addresses)
+        user = self.get_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_permitted_objects(user, 'view', ip_addresses), [ip_addresses[0]])
+
+    def test_primary_keys(self):
+        self.add_permission({'status': 'active'})
+        pks = [str(site.pk) for site in self.sites]
+        user = self.get_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_permitted_objects(user, 'view', pks, queryset=Site.objects.all()), [pks[0], pks[2], pks[3]])
+
+    def test_filtered_queryset(self):
+        # Objects must also belong to a filtered base queryset
+        self.add_permission({'status': 'active'})
+        queryset = Site.objects.filter(region__isnull=False)
+        user = self.get_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_permitted_objects(user, 'view', self.sites, queryset=queryset), [self.sites[0], self.sites[2]])
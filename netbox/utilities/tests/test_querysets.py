@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from dcim.models import Region, Site
+from utilities.querysets import StreamingQuerySet, iterate_queryset, select_accessed_relations
+
+
+class QuerySetIterationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        parent = Region.objects.create(name='Region 1', slug='region-1')
+        region = Region.objects.create(name='Region 2', slug='region-2', parent=parent)
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}', region=region if i % 2 else None) for i in range(5)
+        ])
+
+    def test_iterate_queryset(self):
+        queryset = Site.objects.order_by('name').prefetch_related('region')
+
+        # The prefetch_related() lookups are applied to each of the three chunks of objects
+        with self.assertNumQueries(4):
+            sites = list(iterate_queryset(queryset, chunk_size=2))
+        self.assertEqual([site.name for site in sites], [f'Site {i}' for i in range(5)])
+        with self.assertNumQueries(0):
+            self.assertEqual(sites[1].region.name, 'Region 2')
+
+    def test_select_accessed_relations(self):
+        queryset = select_accessed_relations(
+            Site.objects.order_by('name'), lambda site: site.region.parent if site.region else None
+        )
+        self.assertEqual(queryset.query.select_related, {'region': {'parent': {}}})
+
+        with self.assertNumQueries(1):
+            self.assertEqual([site.region.parent.name for site in queryset if site.region], ['Region 1', 'Region 1'])
+
+    def test_streaming_queryset(self):
+        queryset = StreamingQuerySet(Site.objects.order_by('name'))
+
+        self.assertEqual(len(queryset), 5)
+        self.assertTrue(queryset)
+        self.assertEqual(queryset[0].name, 'Site 0')
+        self.assertEqual(queryset.filter(region__isnull=True).count(), 3)
+        self.assertEqual([site.name for site in queryset], [f'Site {i}' for i in range(5)])
@@ -1,7 +1,19 @@
+import datetime
+import json
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers import serialize
 from django.http import QueryDict
 from django.test import TestCase
 
-from utilities.utils import deepmerge, dict_to_filter_params, normalize_querydict
+from circuits.models import Circuit, CircuitType, Provider
+from dcim.choices import InterfaceModeChoices, InterfaceTypeChoices
+from dcim.models import Cable, Device, DeviceRole, DeviceType, Interface, Manufacturer, Region, Site
+from extras.choices import CustomFieldTypeChoices
+from extras.models import CustomField, Tag
+from ipam.models import IPAddress, Service, VLAN
+from utilities.utils import deepmerge, dict_to_filter_params, normalize_querydict, serialize_object
 
 
 class DictToFilterParamsTest(TestCase):
@@ -128,3 +140,100 @@ class DeepMergeTest(TestCase):
             deepmerge(dict1, dict2),
             merged
         )
+
+
+class SerializeObjectTest(TestCase):
+    """
+    Validate that serialize_object() produces the same representation as Django's built-in JSON serializer.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cf = CustomField.objects.create(type=CustomFieldTypeChoices.TYPE_DATE, name='cf1')
+        cf.content_types.set([ContentType.objects.get_for_model(Site), ContentType.objects.get_for_model(Device)])
+        tags = (
+            Tag(name='Tag 2', slug='tag-2'),
+            Tag(name='Tag 1', slug='tag-1'),
+        )
+        Tag.objects.bulk_create(tags)
+
+        region = Region.objects.create(name='Region 1', slug='region-1')
+        site = Site.objects.create(
+            name='Site 1',
+            slug='site-1',
+            region=region,
+            time_zone='Europe/Berlin',
+            latitude=Decimal('52.516667'),
+            custom_field_data={'cf1': '2020-01-01'}
+        )
+        site.tags.set(*tags)
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        devicetype = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        devicerole = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        device = Device.objects.create(
+            name='Device 1',
+            site=site,
+            device_type=devicetype,
+            device_role=devicerole,
+            local_context_data={'foo': [1, 2.5, {'bar': None}]},
+            custom_field_data={'cf1': None}
+        )
+        vlans = (
+            VLAN(vid=100, name='VLAN 100'),
+            VLAN(vid=200, name='VLAN 200'),
+        )
+        VLAN.objects.bulk_create(vlans)
+        interfaces = (
+            Interface(
+                device=device,
+                name='eth0',
+                type=InterfaceTypeChoices.TYPE_1GE_FIXED,
+                mac_address='00:01:02:03:04:05',
+                mode=InterfaceModeChoices.MODE_TAGGED
+            ),
+            Interface(device=device, name='eth1', type=InterfaceTypeChoices.TYPE_1GE_FIXED),
+        )
+        Interface.objects.bulk_create(interfaces)
+        interfaces[0].tagged_vlans.set(vlans)
+        interfaces[0].tags.set(tags[0])
+        Cable.objects.create(termination_a=interfaces[0], termination_b=interfaces[1], length=Decimal('2.50'))
+        IPAddress.objects.create(address='192.0.2.1/24', assigned_object=interfaces[0])
+        Service.objects.create(device=device, name='Service 1', protocol='tcp', ports=[22, 80])
+        provider = Provider.objects.create(name='Provider 1', slug='provider-1')
+        circuittype = CircuitType.objects.create(name='Circuit Type 1', slug='circuit-type-1')
+        Circuit.objects.create(
+            cid='Circuit 1', provider=provider, type=circuittype, install_date=datetime.date(2020, 1, 1)
+        )
+
+    def assertSerializedEqual(self, obj, **kwargs):
+        data = json.loads(serialize('json', [obj]))[0]['fields']
+        if hasattr(obj, 'custom_field_data'):
+            data['custom_fields'] = data.pop('custom_field_data')
+        if hasattr(obj, 'tags'):
+            data['tags'] = [tag.name for tag in obj.tags.all()]
+        data = {
+            key: value for key, value in data.items()
+            if not key.startswith('_') and key not in kwargs.get('exclude', [])
+        }
+
+        # Compare the encoded data to ensure that key order and value types are identical
+        self.assertEqual(json.dumps(serialize_object(obj, **kwargs)), json.dumps(data))
+
+    def test_serialize_object(self):
+        self.assertSerializedEqual(Region.objects.get(), exclude=['level', 'lft', 'rght', 'tree_id'])
+        for model in (Site, Device, Interface, VLAN, Cable, IPAddress, Service, Circuit):
+            for obj in model.objects.all():
+                self.assertSerializedEqual(obj)
+
+    def test_serialize_object_prefetched(self):
+        interfaces = Interface.objects.prefetch_related('tags', 'tagged_vlans')
+        data = [serialize_object(interface) for interface in Interface.objects.all()]
+        with self.assertNumQueries(3):
+            self.assertEqual([serialize_object(interface) for interface in interfaces], data)
+
+    def test_serialize_object_extra(self):
+        site = Site.objects.get()
+        data = serialize_object(site, extra={'foo': 1, '_bar': 2}, exclude=['name', 'tags'])
+        self.assertEqual(data['foo'], 1)
+        self.assertNotIn('_bar', data)
+        self.assertNotIn('name', data)
+        self.assertNotIn('tags', data)
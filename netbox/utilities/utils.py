@@ -1,11 +1,12 @@
 import datetime
 import json
 from collections import OrderedDict
-from itertools import count, groupby
+from itertools import count, groupby, islice
 
-from django.core.serializers import serialize
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Count, OuterRef, Subquery
 from django.db.models.functions import Coalesce
+from django.utils.encoding import is_protected_type
 from jinja2 import Environment
 
 from dcim.choices import CableLengthUnitChoices
@@ -83,23 +84,90 @@ def count_related(model, field):
     return Coalesce(subquery, 0)
 
 
-def serialize_object(obj, extra=None, exclude=None):
+# Model -> serialization plan (see _get_serialization_plan())
+_serialization_plans = {}
+
+
+def _get_serialization_plan(model):
+    """
+    Return the fields of a model which are included in its serialized representation, in the same order as Django's
+    built-in serializer, as a tuple of (field, is_m2m) tuples. Private fields (prefaced with an underscore) and the
+    custom_field_data field are omitted. The plan is computed once for each model.
     """
-    Return a generic JSON representation of an object using Django's built-in serializer. (This is used for things like
-    change logging, not the REST API.) Optionally include a dictionary to supplement the object data. A list of keys
-    can be provided to exclude them from the returned dictionary. Private fields (prefaced with an underscore) are
-    implicitly excluded.
+    try:
+        return _serialization_plans[model]
+    except KeyError:
+        pass
+
+    opts = model._meta.concrete_model._meta
+    plan = [
+        (field, False) for field in opts.local_fields if field.serialize
+    ] + [
+        (field, True) for field in opts.local_many_to_many
+        if field.serialize and field.remote_field.through._meta.auto_created
+    ]
+    plan = tuple(
+        (field, is_m2m) for field, is_m2m in plan
+        if not field.name.startswith('_') and field.name != 'custom_field_data'
+    )
+    _serialization_plans[model] = plan
+
+    return plan
+
+
+def _serialize_value(obj, field):
+    """
+    Return the value of a field on an object as it would be represented by serialize('json').
+    """
+    value = getattr(obj, field.attname)
+
+    # Strings, numbers, booleans and None are represented as-is
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+
+    if not is_protected_type(value):
+        value = field.value_to_string(obj)
+        if type(value) is str:
+            return value
+
+    # Encode anything else (dates, decimals, JSON data, etc.) exactly as Django's JSON serializer would
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def serialize_object(obj, extra=None, exclude=None):
     """
-    json_str = serialize('json', [obj])
-    data = json.loads(json_str)[0]['fields']
+    Return a generic JSON representation of an object, equivalent to that produced by Django's built-in serializer.
+    (This is used for things like change logging, not the REST API.) Optionally include a dictionary to supplement the
+    object data. A list of keys can be provided to exclude them from the returned dictionary. Private fields (prefaced
+    with an underscore) are implicitly excluded.
+
+    Tags are taken from the object's `_tags` attribute, if set, or else from its (optionally prefetched) tags manager.
+    Use prefetch_related('tags') to serialize many objects without querying the tags of each individually.
+    """
+    data = {}
+    for field, is_m2m in _get_serialization_plan(type(obj)):
+        if not is_m2m:
+            data[field.name] = _serialize_value(obj, field)
+        elif field.name in getattr(obj, '_prefetched_objects_cache', {}):
+            data[field.name] = [
+                _serialize_value(related, related._meta.pk)
+                for related in obj._prefetched_objects_cache[field.name]
+            ]
+        else:
+            data[field.name] = [
+                _serialize_value(related, related._meta.pk)
+                for related in getattr(obj, field.name).only('pk').iterator()
+            ]
 
     # Include custom_field_data as "custom_fields"
     if hasattr(obj, 'custom_field_data'):
-        data['custom_fields'] = data.pop('custom_field_data')
+        data['custom_fields'] = _serialize_value(obj, obj._meta.get_field('custom_field_data'))
 
     # Include any tags. Check for tags cached on the instance; fall back to using the manager.
     if is_taggable(obj):
-        tags = getattr(obj, '_tags', obj.tags.all())
+        tags = getattr(obj, '_tags', None)
+        if tags is None:
+            tags = obj.tags.all()
         data['tags'] = [tag.name for tag in tags]
 
     # Append any extra data
@@ -107,14 +175,15 @@ def serialize_object(obj, extra=None, exclude=None):
         data.update(extra)
 
     # Copy keys to list to avoid 'dictionary changed size during iteration' exception
-    for key in list(data):
-        # Private fields shouldn't be logged in the object change
-        if isinstance(key, str) and key.startswith('_'):
-            data.pop(key)
+    if extra is not None or exclude is not None:
+        for key in list(data):
+            # Private fields shouldn't be logged in the object change
+            if isinstance(key, str) and key.startswith('_'):
+                data.pop(key)
 
-        # Explicitly excluded keys
-        if isinstance(exclude, (list, tuple)) and key in exclude:
-            data.pop(key)
+            # Explicitly excluded keys
+            elif isinstance(exclude, (list, tuple)) and key in exclude:
+                data.pop(key)
 
     return data
 
@@ -214,6 +283,29 @@ def render_jinja2(template_code, context):
     return Environment().from_string(source=template_code).render(**context)
 
 
+def stream_jinja2(template_code, context, buffer_size=100):
+    """
+    Render a Jinja2 template with the provided context. Return a generator which yields the rendered content in
+    chunks, each combining the output of up to buffer_size template events.
+    """
+    stream = Environment().from_string(source=template_code).stream(**context)
+    stream.enable_buffering(buffer_size)
+    return iter(stream)
+
+
+def join_chunks(strings, size):
+    """
+    Concatenate consecutive strings from an iterable, yielding one string for every `size` strings. Used to reduce the
+    number of writes made for a streaming response.
+    """
+    strings = iter(strings)
+    while True:
+        chunk = list(islice(strings, size))
+        if not chunk:
+            return
+        yield ''.join(chunk)
+
+
 def prepare_cloned_fields(instance):
     """
     Compile an object's `clone_fields` list into a string of URL query parameters. Tags are automatically cloned where
@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.urls.exceptions import NoReverseMatch
 from django.utils.http import is_safe_url
 
-from .permissions import resolve_permission
+from .permissions import get_permitted_objects, resolve_permission
 
 
 #
@@ -70,13 +70,21 @@ class ObjectPermissionRequiredMixin(AccessMixin):
         if user.has_perms((permission_required, *self.additional_permissions)):
 
             # Update the view's QuerySet to filter only the permitted objects
-            action = resolve_permission(permission_required)[1]
-            self.queryset = self.queryset.restrict(user, action)
+            self.permission_action = resolve_permission(permission_required)[1]
+            self.base_queryset = self.queryset
+            self.queryset = self.queryset.restrict(user, self.permission_action)
 
             return True
 
         return False
 
+    def get_permitted_objects(self, objects):
+        """
+        Return the subset of the given objects (or primary keys) which are matched by the view's restricted QuerySet,
+        querying the database at most once.
+        """
+        return get_permitted_objects(self.request.user, self.permission_action, objects, queryset=self.base_queryset)
+
     def dispatch(self, request, *args, **kwargs):
 
         if not hasattr(self, 'queryset'):
@@ -1,3 +1,5 @@
+import json
+
 from django.urls import reverse
 from rest_framework import status
 
@@ -190,6 +192,21 @@ class VirtualMachineTest(APIViewTestCases.APIViewTestCase):
         response = self.client.get(url, **self.header)
         self.assertFalse('config_context' in response.data['results'][0])
 
+    def test_config_contexts_streamed(self):
+        """
+        Check that the rendered config contexts of all virtual machines are streamed as newline-delimited JSON.
+        """
+        url = reverse('virtualization-api:virtualmachine-config-contexts')
+        self.add_permissions('virtualization.view_virtualmachine')
+
+        response = self.client.get(url, **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{str(vm.pk): vm.local_context_data or {}} for vm in VirtualMachine.objects.all()]
+        )
+
     def test_unique_name_per_cluster_constraint(self):
         """
         Check that creating a virtual machine with a duplicate name fails.